@@ -0,0 +1,72 @@
+"""Flag benchmark regressions between two results files
+
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.25]
+
+Exits 1 when any benchmark's median slowed down by more than the threshold
+(and by more than MIN_DELTA seconds, so sub-millisecond noise is ignored).
+"""
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA = 0.002
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta=MIN_DELTA):
+    """One entry per (size, benchmark) present in both results, slowest change first"""
+    comparison = []
+    for size, result in current['results'].items():
+        base_benchmarks = baseline['results'].get(size, {}).get('benchmarks', {})
+        for name, timings in result['benchmarks'].items():
+            if name not in base_benchmarks:
+                continue
+            before, after = base_benchmarks[name]['median'], timings['median']
+            ratio = after / before if before else float('inf')
+            comparison.append({
+                'size': size,
+                'name': name,
+                'baseline': before,
+                'current': after,
+                'ratio': ratio,
+                'regression': ratio > 1 + threshold and after - before > min_delta,
+                'improvement': ratio < 1 / (1 + threshold) and before - after > min_delta,
+            })
+    return sorted(comparison, key=lambda entry: entry['ratio'], reverse=True)
+
+def format_comparison(comparison):
+    """Plain-text table of a comparison"""
+    lines = [f"{'size':>6} {'benchmark':<22} {'baseline ms':>12} {'current ms':>12} {'change':>8}"]
+    for entry in comparison:
+        status = 'REGRESSION' if entry['regression'] else 'faster' if entry['improvement'] else ''
+        lines.append(
+            f"{entry['size']:>6} {entry['name']:<22} {entry['baseline'] * 1000:12.1f} "
+            f"{entry['current'] * 1000:12.1f} {entry['ratio']:7.2f}x {status}"
+        )
+    regressions = sum(entry['regression'] for entry in comparison)
+    lines.append(f"{regressions} regression(s) in {len(comparison)} benchmark(s)")
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline', help="stored results JSON")
+    parser.add_argument('current', help="new results JSON")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio counted as a regression (default: %(default)s)")
+    parser.add_argument('--json', action='store_true', help="print the comparison as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    comparison = compare_results(baseline, current, args.threshold)
+    if args.json:
+        json.dump(comparison, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_comparison(comparison))
+    return 1 if any(entry['regression'] for entry in comparison) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
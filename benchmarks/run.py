@@ -0,0 +1,266 @@
+"""Time the data pipeline hot paths on synthetic data
+
+Run from the repository root:
+
+    python -m benchmarks.run                           # 30k and 300k rows, JSON to stdout
+    python -m benchmarks.run --sizes 30k 300k 3m --output bench.json
+    python -m benchmarks.run --baseline bench.json     # run, then flag regressions
+
+Every benchmark is timed on a fresh copy of its input; the JSON records the
+median, min and max wall time of each. See benchmarks.compare for the
+regression check.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from benchmarks.compare import DEFAULT_THRESHOLD, compare_results, format_comparison
+from benchmarks.soda_server import SodaServer
+from benchmarks.synthetic import SIZES, generate_inspection_rows, parse_size
+
+DEFAULT_SIZES = ['30k', '300k']
+DEFAULT_REPEAT = 5
+# Stop repeating a benchmark once it has used this much time (it always runs once)
+TIME_BUDGET = 10.0
+
+# Rows per request when timing the ingest against the local SODA stand-in
+INGEST_PAGE_SIZE = 50_000
+
+# Queries in the shapes users type: a common name, a street, filters, a typo
+SEARCH_QUERIES = {
+    'name': 'pizza',
+    'address': 'flatbush',
+    'fields': 'cuisine:thai boro:queens',
+    'fuzzy': 'goldn dragn',
+    # The first keystroke of a search
+    'short': 'p',
+}
+
+def time_call(func, setup=None, repeat=DEFAULT_REPEAT, budget=TIME_BUDGET):
+    """Wall times of func(*setup()), setup excluded, for up to `repeat` runs"""
+    timings = []
+    spent = 0.0
+    while len(timings) < repeat and (not timings or spent < budget):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        spent += elapsed
+    return {
+        'median': float(np.median(timings)),
+        'min': min(timings),
+        'max': max(timings),
+        'runs': len(timings),
+    }
+
+def pipeline_benchmarks(raw, cache_dir, url=None):
+    """(name, func, setup) for every hot path, in pipeline order
+
+    Inputs for later stages are built once, untimed, from the earlier ones.
+    With the url of a SODA stand-in serving raw, the ingest is timed too.
+    """
+    # Imported here so `--help` works without streamlit installed
+    import utils.cache_manager as cache_manager
+    import utils.snapshots as snapshots
+    from components.maps import build_heatmap_payload, render_map_view
+    from utils.aggregates import AggregateCache, local_pest_counts, pest_queries
+    from utils.data_loader import clean_inspection_rows, search_restaurants
+    from utils.ingest import probe_dataset, run_ingest
+    from utils.history import InspectionHistory
+    from utils.map_utils import aggregate_heatmap_cells, create_heatmap
+    from utils.metrics import ALL_AREAS, MetricsCube, violation_days
+    from utils.search_index import SearchEngine
+    from streamlit import config as streamlit_config
+    from streamlit.logger import set_log_level
+
+    # Streamlit warns on every st.* call made outside `streamlit run`. Parsing
+    # its config resets the log level, so parse it first, then quiet it
+    streamlit_config.get_config_options()
+    set_log_level('error')
+
+    # Point the cache at a scratch directory; the module reads these at call time
+    cache_manager.CACHE_DIR = cache_dir
+    cache_manager.CACHE_FILE = os.path.join(cache_dir, 'restaurant_data.csv')
+    cache_manager.PARQUET_CACHE_FILE = os.path.join(cache_dir, 'restaurant_data.parquet')
+    cache_manager.CACHE_META_FILE = os.path.join(cache_dir, 'cache_metadata.json')
+    cache_manager.LOCK_FILE = os.path.join(cache_dir, 'refresh.lock')
+    cache_manager.REFRESH_STATUS_FILE = os.path.join(cache_dir, 'refresh_status.json')
+    snapshots.SNAPSHOT_DIR = os.path.join(cache_dir, 'snapshots')
+    snapshots.CURRENT_FILE = os.path.join(snapshots.SNAPSHOT_DIR, 'CURRENT')
+
+    # Later stages see the compact schema the app loads from a published snapshot
+    rows = cache_manager.apply_cache_dtypes(clean_inspection_rows(raw.copy()))
+    history = InspectionHistory(rows)
+    df = history.latest()
+    engine = SearchEngine(df)
+    metrics = MetricsCube(df, version=0)
+    days = violation_days(rows)
+    last_year = df['year'].max()
+
+    def save(cache_format):
+        # Only for this save; later benchmarks write and read the configured format
+        configured = cache_manager.CACHE_FORMAT
+        cache_manager.CACHE_FORMAT = cache_format
+        try:
+            cache_manager.save_to_cache(rows)
+        finally:
+            cache_manager.CACHE_FORMAT = configured
+
+    def saved(cache_format):
+        # Loads read the format in the metadata, so write that format first if needed
+        metadata = cache_manager.get_cache_metadata() or {}
+        if metadata.get('format') != cache_format:
+            save(cache_format)
+        return ()
+
+    def main_metrics():
+        # The figures main.py reads for the citywide view and each borough
+        for area in [ALL_AREAS] + metrics.boroughs:
+            metrics.active_restaurants(area)
+            metrics.grade_percent('A', area)
+            metrics.recent_inspections(days=30, name=area)
+            metrics.average_score(area)
+            metrics.grade_distribution(area)
+            metrics.violation_counts(days=365, name=area)
+
+    def local_pests():
+        # The pest panel's fallback for every area, from the snapshot summary
+        for area in [ALL_AREAS] + metrics.boroughs:
+            local_pest_counts(days, area)
+
+    benchmarks = [
+        ('clean.rows', clean_inspection_rows, lambda: (raw.copy(),)),
+        ('clean.compact', cache_manager.apply_cache_dtypes, lambda: (clean_inspection_rows(raw.copy()),)),
+        ('clean.history', InspectionHistory, lambda: (rows,)),
+        ('clean.latest', history.latest, None),
+    ]
+    for cache_format in ('parquet', 'csv'):
+        benchmarks += [
+            (f'cache.save.{cache_format}', save, lambda cache_format=cache_format: (cache_format,)),
+            (f'cache.load.{cache_format}', cache_manager.load_from_cache, lambda cache_format=cache_format: saved(cache_format)),
+        ]
+    benchmarks += [
+        ('search.build', SearchEngine, lambda: (df,)),
+    ]
+    for kind, query in SEARCH_QUERIES.items():
+        benchmarks.append((f'search.{kind}', search_restaurants, lambda query=query: (df, query, engine)))
+    benchmarks += [
+        ('search.scan', search_restaurants, lambda: (df, SEARCH_QUERIES['name'])),
+        ('metrics.build', MetricsCube, lambda: (df, 0)),
+        ('metrics.main', main_metrics, None),
+        ('summary.violations', violation_days, lambda: (rows,)),
+        ('heatmap.cells', aggregate_heatmap_cells, lambda: (df, 10, 4000)),
+        ('heatmap.figure', create_heatmap, lambda: (df,)),
+        ('heatmap.payload', build_heatmap_payload, lambda: (df, last_year)),
+        ('map_view.render', render_map_view, lambda: (df,)),
+        ('aggregate.pests.local', local_pests, None),
+    ]
+    if url is not None:
+        validators = probe_dataset(url)[1]
+        aggregates = AggregateCache(url, directory=os.path.join(cache_dir, 'aggregates'))
+
+        def published():
+            # The load benchmarks need a snapshot even when run on their own
+            if snapshots.read_manifest() is None:
+                run_ingest(url, True, INGEST_PAGE_SIZE, 8, False)
+            return ()
+
+        def fetch_pests():
+            # What a TTL expiry costs: one grouped query per pest category
+            for category, params in pest_queries().items():
+                aggregates.refresh(category, params)
+
+        benchmarks += [
+            ('ingest.full', run_ingest, lambda: (url, True, INGEST_PAGE_SIZE, 8, False, None, False)),
+            ('ingest.export', run_ingest, lambda: (url, True, INGEST_PAGE_SIZE, 8, False, None, True)),
+            ('ingest.revalidate', probe_dataset, lambda: (url, validators)),
+            ('aggregate.pests.api', fetch_pests, None),
+            # First paint reads the summary; the rows wait for a search
+            ('snapshot.load.summary', snapshots.load_summary, published),
+            ('snapshot.load.rows', snapshots.load_snapshot, published),
+        ]
+    return benchmarks
+
+def run_size(size, repeat=DEFAULT_REPEAT, seed=0, only=None, log=sys.stderr):
+    """Results for one dataset size: {'rows': n, 'benchmarks': {name: timings}}"""
+    rows = parse_size(size)
+    raw = generate_inspection_rows(rows, seed=seed)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='nyc-bench-') as cache_dir, SodaServer(raw) as soda:
+        for name, func, setup in pipeline_benchmarks(raw, cache_dir, soda.url):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = time_call(func, setup, repeat)
+            print(f"{size:>6} {name:<22} {results[name]['median'] * 1000:10.1f} ms", file=log)
+    return {'rows': rows, 'benchmarks': results}
+
+def environment():
+    """Versions and machine details stored with the results"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    versions = {'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__}
+    try:
+        import pyarrow
+        versions['pyarrow'] = pyarrow.__version__
+    except ImportError:
+        pass
+
+    return {
+        'created': datetime.now().isoformat(),
+        'commit': commit,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpus': os.cpu_count(),
+        'versions': versions,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES,
+                        help=f"row counts or presets ({', '.join(SIZES)}); default: {' '.join(DEFAULT_SIZES)}")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="runs per benchmark (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic data seed (default: %(default)s)")
+    parser.add_argument('--only', nargs='+', metavar='PREFIX', help="run only benchmarks starting with these names")
+    parser.add_argument('--output', help="write results JSON here instead of stdout")
+    parser.add_argument('--baseline', help="results JSON to compare against; exits 1 on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown ratio counted as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = {
+        'environment': environment(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': {size: run_size(size, args.repeat, args.seed, args.only) for size in args.sizes},
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare_results(baseline, report, args.threshold)
+        print(format_comparison(comparison), file=sys.stderr)
+        return 1 if any(entry['regression'] for entry in comparison) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
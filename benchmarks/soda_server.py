@@ -0,0 +1,312 @@
+"""Local stand-in for the SODA endpoint, serving synthetic inspection rows
+
+    python -m benchmarks.soda_server --rows 300k --port 8000 --delay 0.05 --error-rate 0.1
+    python -m utils.ingest --url http://127.0.0.1:8000/resource/43nn-pn8j.csv
+
+Understands the slice of SoQL the app sends: $select as a column list or
+count(*), $group with count(*) AS alias, $where with column IS NOT NULL, inspection_date >=
+and lower(column) like '%text%' alternatives, $order on columns and :id, $limit, $offset. Rows tied
+under an $order are returned in a random order on every request, as the real
+API is free to do; :id is the row's index label. Gzips responses for clients that
+accept it, and answers conditional requests with 304 while the data is
+unchanged. The bulk export (rows.csv?accessType=DOWNLOAD) streams every row
+with the portal's display headers and MM/DD/YYYY dates, chunked and gzipped
+as it goes. Requests can be slowed down and a share of them failed, to see how
+the transport's retries and backoff hold up.
+"""
+import argparse
+import gzip
+import re
+import zlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import SIZES, generate_inspection_rows, parse_size
+
+RESOURCE_PATH = '/resource/43nn-pn8j.csv'
+EXPORT_PATH = '/api/views/43nn-pn8j/rows.csv'
+# Rows rendered per chunk of a streamed export
+EXPORT_CHUNK_ROWS = 10_000
+NOT_NULL = re.compile(r"(\w+)\s+IS\s+NOT\s+NULL", re.IGNORECASE)
+SINCE = re.compile(r"inspection_date\s*>=\s*'([^']+)'")
+LIKE = re.compile(r"lower\((\w+)\)\s+like\s+'((?:[^']|'')*)'")
+COUNT = re.compile(r"^count\(\*\)(?:\s+AS\s+(\w+))?$", re.IGNORECASE)
+ORDER_TERM = re.compile(r"^(:id|\w+)(?:\s+(ASC|DESC))?$", re.IGNORECASE)
+# The order rows are stored in, so queries asking for it need no sort
+STORED_ORDER = [('inspection_date', False), (':id', True)]
+
+class SodaServer:
+    """Threaded HTTP server for one dataset; use as a context manager or start()/stop()
+
+    delay: seconds added to every response. bandwidth: bytes per second for
+    response bodies (None for unlimited). error_rate: share of requests that
+    fail, with a status from error_statuses or, for status 0, a dropped
+    connection. Injected 429s ask for Retry-After: 1.
+    """
+
+    def __init__(self, rows, host='127.0.0.1', port=0, delay=0.0, bandwidth=None,
+                 error_rate=0.0, error_statuses=(503,), seed=0):
+        self.delay = delay
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.requests = []
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self.update(rows)
+
+        handler = type('Handler', (SodaHandler,), {'soda': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}{RESOURCE_PATH}'
+
+    def update(self, rows):
+        """Serve new rows; clients holding the old validators get a full response again"""
+        # The index labels serve as :id, so they must be unique
+        rows = rows if rows.index.is_unique else rows.reset_index(drop=True)
+        rows = rows.sort_index(kind='stable').sort_values('inspection_date', ascending=False, kind='stable')
+        with self._lock:
+            self.rows = rows
+            self.dates = pd.to_datetime(rows['inspection_date'], errors='coerce')
+            self.modified = datetime.now(timezone.utc).replace(microsecond=0)
+            self.etag = f'"{len(rows)}-{int(self.modified.timestamp() * 1000)}"'
+
+    def fail_next(self):
+        """Status to fail this request with, 0 to drop the connection, or None"""
+        with self._lock:
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return int(self._rng.choice(self.error_statuses))
+        return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+class SodaHandler(BaseHTTPRequestHandler):
+    soda = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        soda = self.soda
+        url = urlparse(self.path)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if soda.delay:
+            time.sleep(soda.delay)
+
+        failure = soda.fail_next()
+        soda.requests.append({'path': url.path, 'query': query, 'failure': failure})
+        if failure == 0:
+            # Drop the connection without a response
+            self.close_connection = True
+            return
+        if failure is not None:
+            self.send_body(failure, f'injected {failure}\n'.encode(), {'Retry-After': '1'} if failure == 429 else None)
+            return
+        if url.path == EXPORT_PATH:
+            with soda._lock:
+                rows, dates = soda.rows, soda.dates
+            self.send_export(rows, dates)
+            return
+        if url.path != RESOURCE_PATH:
+            self.send_body(404, b'not found\n')
+            return
+
+        with soda._lock:
+            rows, dates, etag, modified = soda.rows, soda.dates, soda.etag, soda.modified
+        headers = {'ETag': etag, 'Last-Modified': format_datetime(modified, usegmt=True)}
+        if self.not_modified(etag, modified):
+            self.send_body(304, b'', headers)
+            return
+
+        try:
+            rows = filter_rows(rows, dates, query.get('$where', ''))
+            rows = order_rows(rows, dates[rows.index], query.get('$order', ''))
+            body = select(rows, query).to_csv(index=False).encode()
+        except (KeyError, ValueError) as e:
+            self.send_body(400, f'bad query: {e}\n'.encode())
+            return
+        self.send_body(200, body, headers)
+
+    def not_modified(self, etag, modified):
+        if 'If-None-Match' in self.headers:
+            return self.headers['If-None-Match'] == etag
+        if 'If-Modified-Since' in self.headers:
+            try:
+                return parsedate_to_datetime(self.headers['If-Modified-Since']) >= modified
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def send_body(self, status, body, headers=None):
+        if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            headers = {**(headers or {}), 'Content-Encoding': 'gzip'}
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.write_throttled(body)
+
+    def send_export(self, rows, dates):
+        """Stream every row as the bulk export, one chunked-encoding chunk per slice of rows"""
+        compressor = None
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressor = zlib.compressobj(1, zlib.DEFLATED, 31)
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+
+        export = rows.rename(columns=export_header)
+        export['INSPECTION DATE'] = dates.dt.strftime('%m/%d/%Y').to_numpy()
+        try:
+            for start in range(0, len(export), EXPORT_CHUNK_ROWS):
+                data = export.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(index=False, header=start == 0).encode()
+                self.write_chunk(compressor.compress(data) if compressor else data)
+            if compressor:
+                self.write_chunk(compressor.flush())
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading mid-export
+            self.close_connection = True
+
+    def write_chunk(self, data):
+        if data:
+            self.wfile.write(f'{len(data):X}\r\n'.encode())
+            self.write_throttled(data)
+            self.wfile.write(b'\r\n')
+
+    def write_throttled(self, body, chunk_size=64 * 1024):
+        bandwidth = self.soda.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), chunk_size):
+            chunk = body[start:start + chunk_size]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+def export_header(column):
+    """Display name the portal's export uses for an API field, e.g. cuisine_description -> CUISINE DESCRIPTION"""
+    return column.title() if column in ('latitude', 'longitude') else column.replace('_', ' ').upper()
+
+def filter_rows(rows, dates, where):
+    """Rows matching the IS NOT NULL and date conditions and any lower(column) like alternatives in where"""
+    mask = np.ones(len(rows), dtype=bool)
+    for column in NOT_NULL.findall(where):
+        # Dates are compared parsed, so unparseable ones count as missing
+        mask &= (dates if column == 'inspection_date' else rows[column]).notna().to_numpy()
+    match = SINCE.search(where)
+    if match:
+        mask &= (dates >= pd.Timestamp(match.group(1))).to_numpy()
+    # The app only sends like clauses as one OR group
+    likes = LIKE.findall(where)
+    if likes:
+        found = np.zeros(len(rows), dtype=bool)
+        for column, pattern in likes:
+            text = pattern.replace("''", "'").strip('%')
+            found |= rows[column].fillna('').str.lower().str.contains(text, regex=False).to_numpy()
+        mask &= found
+    return rows[mask]
+
+def order_rows(rows, dates, order):
+    """Rows sorted by an $order value, ties shuffled"""
+    terms = []
+    for term in order.split(','):
+        if not term.strip():
+            continue
+        match = ORDER_TERM.match(term.strip())
+        if match is None:
+            raise ValueError(f"unsupported $order term {term.strip()!r}")
+        terms.append((match.group(1).lower(), (match.group(2) or 'ASC').upper() == 'ASC'))
+    if not terms or terms == STORED_ORDER:
+        return rows
+
+    keys = {'tie': np.random.default_rng().random(len(rows))}
+    for position, (column, ascending) in enumerate(terms):
+        if column == ':id':
+            values = rows.index.to_numpy()
+        elif column == 'inspection_date':
+            values = dates.to_numpy()
+        else:
+            values = rows[column].to_numpy()
+        keys[position] = values
+    # The random key goes last, so it only decides between rows the order leaves tied
+    frame = pd.DataFrame(keys).sort_values(
+        list(range(len(terms))) + ['tie'], ascending=[ascending for _, ascending in terms] + [True], kind='stable'
+    )
+    return rows.iloc[frame.index.to_numpy()]
+
+def select(rows, query):
+    """Apply $select/$group, then $limit/$offset, to the filtered rows"""
+    fields = [field.strip() for field in query.get('$select', '').split(',') if field.strip()]
+    counts = [COUNT.match(field) for field in fields]
+    count = next((match for match in counts if match), None)
+    if count:
+        alias = count.group(1) or 'count'
+        group = [field.strip() for field in query.get('$group', '').split(',') if field.strip()]
+        if not group:
+            return pd.DataFrame({alias: [len(rows)]})
+        result = rows.groupby(group, dropna=False).size().reset_index(name=alias)
+    else:
+        result = rows[fields] if fields else rows
+    offset, limit = int(query.get('$offset', 0)), int(query.get('$limit', 1000))
+    return result.iloc[offset:offset + limit]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='30k', help=f"row count or preset ({', '.join(SIZES)}); default: %(default)s")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic data seed (default: %(default)s)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--delay', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--bandwidth', type=float, help="response bytes per second")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument('--error-status', type=int, nargs='+', default=[503],
+                        help="statuses to fail with; 0 drops the connection (default: 503)")
+    args = parser.parse_args(argv)
+
+    rows = generate_inspection_rows(parse_size(args.rows), seed=args.seed, end=pd.Timestamp.now().normalize())
+    server = SodaServer(
+        rows, args.host, args.port, delay=args.delay, bandwidth=args.bandwidth,
+        error_rate=args.error_rate, error_statuses=args.error_status, seed=args.seed,
+    )
+    print(f"Serving {len(rows)} rows at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,176 @@
+"""Check the app's cold start against a time budget
+
+Run from the repository root:
+
+    python -m benchmarks.startup                   # 5 cold starts, JSON to stdout, exits 1 if over budget
+    python -m benchmarks.startup --runs 10 --rows 300k --output startup.json
+
+Every run is a fresh interpreter. 'import' is the wall time of importing what
+main.py imports before its first element; 'first_render' is the time from
+process start to the end of one run of main.py under AppTest, against a
+published snapshot and pre-fetched aggregates so no network is touched. The
+medians are compared with BUDGETS.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.run import environment
+from benchmarks.soda_server import SodaServer
+from benchmarks.synthetic import SIZES, generate_inspection_rows, parse_size
+
+# Repository root, where the startup modules import from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What main.py imports before its first element is sent
+STARTUP_MODULES = [
+    'streamlit',
+    'components.debug',
+    'components.header',
+    'components.search',
+    'utils.aggregates',
+    'utils.data_loader',
+    'utils.data_store',
+    'utils.snapshots',
+]
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+DEFAULT_RUNS = 5
+# Seconds; measured medians on the reference machine plus headroom for noise
+BUDGETS = {
+    'import': 1.5,
+    'first_render': 2.5,
+}
+
+# Runs main.py once in this interpreter and reports the startup figures it recorded
+RENDER_SCRIPT = """
+import json
+from streamlit.testing.v1 import AppTest
+from utils import startup
+app = AppTest.from_file('main.py', default_timeout=60)
+app.run()
+print(json.dumps({**startup.startup_stats(), 'exceptions': [e.value for e in app.exception]}))
+"""
+
+def prepare_cache(cache_dir, rows, seed=0):
+    """Publish a synthetic snapshot and fetch the pest aggregates into cache_dir"""
+    from utils.aggregates import AggregateCache, pest_queries
+    from utils.ingest import read_page
+
+    raw = generate_inspection_rows(parse_size(rows), seed=seed)
+    with SodaServer(raw) as soda:
+        subprocess.run(
+            [sys.executable, '-m', 'utils.ingest', '--url', soda.url, '--full', '--force'],
+            cwd=ROOT, env=app_environment(cache_dir), check=True, capture_output=True,
+        )
+        # Stored under the real API URL, so the app serves them without refetching
+        aggregates = AggregateCache(
+            directory=os.path.join(cache_dir, 'aggregates'), fetch=lambda url, params: read_page(soda.url, params)
+        )
+        for category, params in pest_queries().items():
+            aggregates.refresh(f"pests-{category}", params)
+
+def profile_imports(modules=STARTUP_MODULES, python=sys.executable, cwd=ROOT):
+    """Import modules in a fresh interpreter under -X importtime
+
+    Returns one dict per module imported (module, self_ms, cumulative_ms,
+    depth) in import order, plus the wall time of the whole run.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=cwd, check=True,
+    )
+    wall = time.perf_counter() - started
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                'module': module,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': len(indent) // 2,
+            })
+    return imports, wall
+
+def import_breakdown(imports):
+    """Self time per top-level package, largest first, as (package, ms) pairs"""
+    totals = {}
+    for entry in imports:
+        package = entry['module'].split('.')[0]
+        totals[package] = totals.get(package, 0.0) + entry['self_ms']
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def app_environment(cache_dir):
+    return {**os.environ, 'NYC_CACHE_DIR': cache_dir, 'NYC_INGEST_IN_APP': '0'}
+
+def cold_render(cache_dir):
+    """Startup figures from one cold run of main.py"""
+    result = subprocess.run(
+        [sys.executable, '-c', RENDER_SCRIPT],
+        cwd=ROOT, env=app_environment(cache_dir), check=True, capture_output=True, text=True,
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    if stats['exceptions']:
+        raise RuntimeError(f"main.py raised: {stats['exceptions']}")
+    return stats
+
+def measure(cache_dir, runs):
+    """Median, min and max seconds per startup figure over runs cold starts"""
+    timings = {'import': [], 'first_render': []}
+    for _ in range(runs):
+        timings['import'].append(profile_imports()[1])
+        timings['first_render'].append(cold_render(cache_dir)['to_first_render'])
+    return {
+        name: {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+        for name, values in timings.items()
+    }
+
+def over_budget(results, budgets=BUDGETS):
+    """Names of the figures whose median exceeds their budget"""
+    return [name for name, budget in budgets.items() if results[name]['median'] > budget]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="cold starts to time (default: %(default)s)")
+    parser.add_argument('--rows', default='30k', help=f"snapshot size, rows or preset ({', '.join(SIZES)}); default: %(default)s")
+    parser.add_argument('--seed', type=int, default=0, help="synthetic data seed (default: %(default)s)")
+    parser.add_argument('--output', help="write results JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='nyc-startup-') as cache_dir:
+        prepare_cache(cache_dir, args.rows, args.seed)
+        results = measure(cache_dir, args.runs)
+        breakdown = import_breakdown(profile_imports()[0])
+
+    report = {
+        'environment': environment(),
+        'rows': parse_size(args.rows),
+        'runs': args.runs,
+        'budgets': BUDGETS,
+        'results': results,
+        'imports_ms': dict(breakdown[:15]),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    exceeded = over_budget(results)
+    for name in exceeded:
+        print(f"{name}: median {results[name]['median']:.2f}s over the {BUDGETS[name]:.2f}s budget", file=sys.stderr)
+    return 1 if exceeded else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
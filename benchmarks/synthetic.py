@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+# Preset dataset sizes; the live dataset is roughly the 300k preset
+SIZES = {
+    '30k': 30_000,
+    '300k': 300_000,
+    '3m': 3_000_000,
+}
+
+# The live data averages about ten rows (violations) per restaurant
+ROWS_PER_RESTAURANT = 10
+ROWS_PER_INSPECTION = 3
+
+# Borough -> (share of restaurants, center latitude, center longitude, spread in degrees)
+BOROUGHS = {
+    'Manhattan': (0.38, 40.7686, -73.9754, 0.035),
+    'Brooklyn': (0.27, 40.6612, -73.9488, 0.045),
+    'Queens': (0.24, 40.7282, -73.8317, 0.055),
+    'Bronx': (0.08, 40.8448, -73.8648, 0.035),
+    'Staten Island': (0.03, 40.5795, -74.1502, 0.045),
+}
+
+CUISINES = [
+    'American', 'Chinese', 'Coffee/Tea', 'Pizza', 'Italian', 'Mexican', 'Caribbean',
+    'Japanese', 'Bakery Products/Desserts', 'Latin American', 'Spanish', 'Chicken',
+    'Donuts', 'Indian', 'Thai', 'Korean', 'Jewish/Kosher', 'Hamburgers', 'Café',
+    'Sandwiches', 'Juice, Smoothies, Fruit Salads', 'Mediterranean', 'Middle Eastern',
+]
+
+NAME_PREFIXES = [
+    "JOE'S", "MARIO'S", 'GOLDEN', 'LUCKY', 'NEW', 'LITTLE', 'BIG APPLE', 'ROYAL',
+    'EMPIRE', 'BROOKLYN', 'CAFÉ', 'LA', 'EL', 'THE', "TONY'S", 'HAPPY', 'SUNNY',
+    'DOS', 'CRÊPE', "PAPA JOHN'S",
+]
+NAME_NOUNS = [
+    'PIZZA', 'DRAGON', 'GARDEN', 'DELI', 'BAGELS', 'KITCHEN', 'TAQUERIA', 'SUSHI',
+    'BISTRO', 'DINER', 'BAKERY', 'GRILL', 'NOODLE HOUSE', 'TAVERN', 'CAFE & BAR',
+    'BURGER', 'RAMEN', 'CHICKEN', 'COFFEE', 'PALACE',
+]
+STREETS = [
+    'BROADWAY', '5 AVENUE', 'FLATBUSH AVENUE', 'ROOSEVELT AVENUE', 'GRAND CONCOURSE',
+    'BEDFORD AVENUE', 'AMSTERDAM AVENUE', 'ATLANTIC AVENUE', 'MAIN STREET', 'VICTORY BOULEVARD',
+    'NOSTRAND AVENUE', 'LEXINGTON AVENUE', 'QUEENS BOULEVARD', 'FORDHAM ROAD', 'CANAL STREET',
+]
+
+# (code, description, critical); the last entry is an inspection with no violation
+VIOLATIONS = [
+    ('04L', 'Evidence of mice or live mice in establishment\'s food or non-food areas.', 'Critical'),
+    ('04K', 'Evidence of rats or live rats in establishment\'s food or non-food areas.', 'Critical'),
+    ('04M', 'Live roaches in facility\'s food or non-food area.', 'Critical'),
+    ('04N', 'Filth flies or food/refuse/sewage associated with (FRSA) flies or other nuisance pests in establishment.', 'Critical'),
+    ('08A', 'Establishment is not free of harborage or conditions conducive to rodents, insects or other pests.', 'Not Critical'),
+    ('06D', 'Food contact surface not properly washed, rinsed and sanitized after each use.', 'Critical'),
+    ('02G', 'Cold TCS food item held above 41 °F; smoked or processed fish held above 38 °F.', 'Critical'),
+    ('02B', 'Hot TCS food item not held at or above 140 °F.', 'Critical'),
+    ('10F', 'Non-food contact surface or equipment made of unacceptable material.', 'Not Critical'),
+    ('10B', 'Anti-siphonage or back-flow prevention device not provided where required.', 'Not Critical'),
+    ('06C', 'Food, supplies, or equipment not protected from potential source of contamination.', 'Critical'),
+    (None, None, None),
+]
+VIOLATION_WEIGHTS = [4, 2, 4, 3, 8, 10, 9, 6, 12, 8, 10, 4]
+
+INSPECTION_TYPES = [
+    'Cycle Inspection / Initial Inspection',
+    'Cycle Inspection / Re-inspection',
+    'Pre-permit (Operational) / Initial Inspection',
+    'Pre-permit (Operational) / Re-inspection',
+]
+# Action by score band: A and B range scores are cited, C range ones may close
+ACTIONS = [
+    'Violations were cited in the following area(s).',
+    'Violations were cited in the following area(s).',
+    'Establishment Closed by DOHMH. Violations were cited in the following area(s) and those requiring immediate action were addressed.',
+]
+
+def parse_size(size):
+    """Row count for a preset name ('300k') or a plain integer"""
+    if size in SIZES:
+        return SIZES[size]
+    return int(size)
+
+def generate_inspection_rows(rows, seed=0, end=None, years=5):
+    """Raw SODA-shaped rows, typed the way pd.read_csv returns an API page
+
+    Rows are grouped into inspections (several violations share a date, score
+    and grade) and inspections into restaurants, with about ten rows per
+    restaurant. Dates are strings, missing text is NaN and about 1% of rows
+    lack coordinates, so the cleaning steps have real work to do.
+    """
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp('2025-01-01') if end is None else pd.Timestamp(end)
+
+    restaurants = max(1, rows // ROWS_PER_RESTAURANT)
+    inspections = max(1, rows // ROWS_PER_INSPECTION)
+
+    # Restaurant attributes
+    camis = 40_000_000 + rng.choice(10 * restaurants, size=restaurants, replace=False)
+    shares = np.array([share for share, _, _, _ in BOROUGHS.values()])
+    boro_codes = rng.choice(len(BOROUGHS), size=restaurants, p=shares / shares.sum())
+    centers = np.array([(lat, lon, spread) for _, lat, lon, spread in BOROUGHS.values()])
+    lat = centers[boro_codes, 0] + rng.normal(0, 1, restaurants) * centers[boro_codes, 2]
+    lon = centers[boro_codes, 1] + rng.normal(0, 1, restaurants) * centers[boro_codes, 2]
+    names = (
+        pd.Series(np.array(NAME_PREFIXES, dtype=object)[rng.integers(0, len(NAME_PREFIXES), restaurants)])
+        + ' '
+        + pd.Series(np.array(NAME_NOUNS, dtype=object)[rng.integers(0, len(NAME_NOUNS), restaurants)])
+    )
+    # Chains share a name; everyone else gets a branch number to stay distinct
+    branch = rng.random(restaurants) < 0.7
+    names[branch] = names[branch] + ' #' + pd.Series(np.arange(restaurants)[branch]).astype(str).to_numpy()
+    phones = (2120000000 + camis % 10_000_000).astype(str).astype(object)
+
+    # Inspection attributes: which restaurant, when, and the resulting score and grade
+    owner = np.sort(rng.integers(0, restaurants, inspections))
+    days = rng.integers(0, 365 * years, inspections)
+    date_values = pd.date_range(end - pd.Timedelta(days=365 * years - 1), end, freq='D')
+    date_strings = np.asarray(date_values.strftime('%Y-%m-%dT00:00:00.000'), dtype=object)
+    score = np.round(rng.gamma(2.0, 7.0, inspections))
+    grade = np.where(score <= 13, 'A', np.where(score <= 27, 'B', 'C')).astype(object)
+    # Many inspections are ungraded, and a few have no score yet
+    grade[rng.random(inspections) < 0.45] = np.nan
+    score[rng.random(inspections) < 0.03] = np.nan
+
+    # Violation rows: each inspection gets at least one
+    inspection = np.sort(np.r_[np.arange(inspections), rng.integers(0, inspections, max(0, rows - inspections))])[:rows]
+    restaurant = owner[inspection]
+    weights = np.array(VIOLATION_WEIGHTS, dtype=np.float64)
+    violation = rng.choice(len(VIOLATIONS), size=len(inspection), p=weights / weights.sum())
+    codes, descriptions, critical = (np.array(column, dtype=object) for column in zip(*VIOLATIONS))
+
+    df = pd.DataFrame({
+        'camis': camis[restaurant],
+        'dba': names.to_numpy()[restaurant],
+        'boro': np.array(list(BOROUGHS), dtype=object)[boro_codes[restaurant]],
+        'building': (np.arange(1, 2000).astype(str).astype(object))[camis[restaurant] % 1999],
+        'street': np.array(STREETS, dtype=object)[camis[restaurant] % len(STREETS)],
+        'zipcode': (10001 + (camis[restaurant] % 400)).astype(np.float64),
+        'phone': phones[restaurant],
+        'cuisine_description': np.array(CUISINES, dtype=object)[camis[restaurant] % len(CUISINES)],
+        'inspection_date': date_strings[days[inspection]],
+        'action': np.array(ACTIONS, dtype=object)[np.searchsorted([13, 27], np.nan_to_num(score[inspection]))],
+        'violation_code': codes[violation],
+        'violation_description': descriptions[violation],
+        'critical_flag': critical[violation],
+        'score': score[inspection],
+        'grade': grade[inspection],
+        'inspection_type': np.array(INSPECTION_TYPES, dtype=object)[inspection % len(INSPECTION_TYPES)],
+        'latitude': lat[restaurant],
+        'longitude': lon[restaurant],
+    })
+
+    # A few rows arrive without coordinates and are dropped by cleaning
+    missing = rng.random(len(df)) < 0.01
+    df.loc[missing, ['latitude', 'longitude']] = np.nan
+
+    # API pages come back newest first
+    return df.sort_values('inspection_date', ascending=False, kind='stable').reset_index(drop=True)
@@ -0,0 +1,66 @@
+import os
+import streamlit as st
+import pandas as pd
+from utils import instrumentation, startup
+from utils.aggregates import get_aggregate_cache
+from utils.cache_manager import memory_report
+from utils.frame_cache import get_frame_cache
+
+# The panel can switch process-wide instrumentation on and off, so it is only
+# offered (with ?debug=1) on deployments that opt in with NYC_DEBUG_PANEL=1
+DEBUG_PANEL = os.environ.get("NYC_DEBUG_PANEL", "0") != "0"
+
+def stage_table(stages):
+    """Per-stage totals as a frame, slowest total first"""
+    if not stages:
+        return pd.DataFrame()
+    table = pd.DataFrame.from_dict(stages, orient='index')
+    table['mean_ms'] = table['seconds'] / table['calls'] * 1000
+    table['max_ms'] = table['max_seconds'] * 1000
+    table['peak_rss_mb'] = table['peak_rss_bytes'] / 2**20
+    table = table[['calls', 'errors', 'mean_ms', 'max_ms', 'rows', 'peak_rss_mb']]
+    return table.rename_axis('stage').sort_values('mean_ms', ascending=False)
+
+def render_debug_panel(store):
+    """Dataset, frame cache and per-stage timing figures, shown with ?debug=1 when DEBUG_PANEL is set"""
+    with st.expander("🔧 Debug", expanded=True):
+        st.json({
+            'store': store.stats(),
+            'frame_cache': get_frame_cache().stats(),
+            'aggregates': get_aggregate_cache().stats(),
+            'startup': startup.startup_stats(),
+        })
+
+        # Only once a session has needed the rows; the debug panel doesn't load them itself
+        history = store.snapshot().history if store.rows_loaded else None
+        if history is not None:
+            st.caption("Memory by column of the shared inspection history")
+            st.dataframe(memory_report(history.rows), use_container_width=True)
+
+        # Recording is process-wide: every session's reruns are timed while it is on
+        enabled = st.toggle("Record stage timings", value=instrumentation.ENABLED, key="debug_instrumentation")
+        if enabled != instrumentation.ENABLED:
+            instrumentation.enable() if enabled else instrumentation.disable()
+
+        snapshot = instrumentation.RECORDER.snapshot()
+        table = stage_table(snapshot['stages'])
+        if table.empty:
+            st.caption("No stages recorded yet. Turn recording on and rerun, or start with NYC_INSTRUMENT=1.")
+            return
+
+        st.dataframe(table, use_container_width=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button(
+                "Download JSON", instrumentation.RECORDER.to_json(indent=2),
+                file_name="stages.json", mime="application/json"
+            )
+        with col2:
+            st.download_button(
+                "Download Prometheus", instrumentation.RECORDER.to_prometheus(),
+                file_name="stages.prom", mime="text/plain"
+            )
+        with col3:
+            if st.button("Reset"):
+                instrumentation.RECORDER.reset()
+                st.rerun()
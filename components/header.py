@@ -1,5 +1,16 @@
+import os
 import streamlit as st
 
+@st.cache_data(show_spinner=False)
+def load_stylesheet(path, modified):
+    """The stylesheet as a <style> block; re-read only when its modification time changes"""
+    with open(path) as f:
+        return f'<style>{f.read()}</style>'
+
+def render_styles(path='styles/custom.css'):
+    """Inject the app stylesheet, read from disk once per process rather than on every rerun"""
+    st.markdown(load_stylesheet(path, os.path.getmtime(path)), unsafe_allow_html=True)
+
 def render_header():
     """Render the app header with search functionality"""
     # Initialize search state if not present
@@ -27,7 +38,7 @@ def render_header():
         value=st.session_state.search_query,
         placeholder="🔍 Search any restaurant in NYC...",
         key="search_input",
-        help="Enter restaurant name, address, or borough"
+        help="Enter restaurant name, address, or borough. Narrow it down with filters like cuisine:thai boro:queens zip:11201"
     )
 
     # Close the header div after the search
@@ -1,10 +1,23 @@
 import streamlit as st
-from utils.map_utils import create_heatmap
+from utils.frame_cache import get_frame_cache
+from utils.map_utils import DEFAULT_ZOOM, create_heatmap, fit_view
 import plotly.express as px
+import plotly.io as pio
 import pandas as pd
 
-def render_map_view(df):
-    """Render the main map view with controls and insights"""
+def build_heatmap_payload(neighborhood_data, year, view=(None, DEFAULT_ZOOM)):
+    """Heatmap figure JSON for one year of one neighborhood, at view=(bounds, zoom) from fit_view"""
+    return heatmap_figure(neighborhood_data, year, view).to_json()
+
+def heatmap_figure(neighborhood_data, year, view=(None, DEFAULT_ZOOM)):
+    bounds, zoom = view
+    return create_heatmap(neighborhood_data[neighborhood_data['year'] == year], zoom=zoom, bounds=bounds)
+
+def render_map_view(df, version=None):
+    """Render the main map view with controls and insights
+
+    Pass the data version to cache heatmap frames per (version, neighborhood, year).
+    """
     st.subheader("🗺️ Restaurant Safety Explorer")
 
     # Neighborhood selector
@@ -52,6 +65,7 @@ def render_map_view(df):
     # Grade distribution
     st.markdown("### Grade Distribution")
     grade_dist = neighborhood_data['grade'].value_counts()
+    grade_dist = grade_dist[grade_dist > 0]  # grade is categorical, so unused grades count as 0
     fig_grades = px.pie(
         values=grade_dist.values,
         names=grade_dist.index,
@@ -68,9 +82,10 @@ def render_map_view(df):
 
     with col1:
         # Day of week analysis
-        neighborhood_data['day_of_week'] = pd.to_datetime(neighborhood_data['inspection_date']).dt.day_name()
+        # Derived locally: neighborhood_data may be the shared, read-only frame
+        day_of_week = pd.to_datetime(neighborhood_data['inspection_date']).dt.day_name()
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        daily_counts = neighborhood_data['day_of_week'].value_counts().reindex(day_order)
+        daily_counts = day_of_week.value_counts().reindex(day_order)
 
         fig_daily = px.bar(
             x=daily_counts.index,
@@ -85,10 +100,10 @@ def render_map_view(df):
 
     with col2:
         # Monthly analysis
-        neighborhood_data['month'] = pd.to_datetime(neighborhood_data['inspection_date']).dt.strftime('%B')
+        month = pd.to_datetime(neighborhood_data['inspection_date']).dt.strftime('%B')
         month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
                       'July', 'August', 'September', 'October', 'November', 'December']
-        monthly_counts = neighborhood_data['month'].value_counts().reindex(month_order)
+        monthly_counts = month.value_counts().reindex(month_order)
 
         fig_monthly = px.bar(
             x=monthly_counts.index,
@@ -101,27 +116,46 @@ def render_map_view(df):
         fig_monthly.update_layout(showlegend=False)
         st.plotly_chart(fig_monthly, use_container_width=True)
 
-    # Year selector for time-lapse
-    years = sorted(df['year'].unique())
+    # Year selector for time-lapse; the year list only changes with the data
+    frame_cache = get_frame_cache() if version is not None else None
+    if frame_cache is not None:
+        years = frame_cache.get_or_build((version, 'years'), lambda: sorted(df['year'].dropna().unique().tolist()))
+    else:
+        years = sorted(df['year'].unique())
     selected_year = st.select_slider(
         "Select Year",
         options=years,
         value=years[-1]
     )
 
-    # Filter data for selected year and neighborhood
-    year_data = neighborhood_data[neighborhood_data['year'] == selected_year]
-
-    # Create and display heatmap
+    # Create and display heatmap. Every year of the area is drawn at the view
+    # fitting the whole area, so frames line up and cells suit that zoom
     st.markdown("### Safety Score Heatmap")
-    fig = create_heatmap(year_data)
+    view = fit_view(neighborhood_data)
+    if frame_cache is not None:
+        key = (version, selected_neighborhood, selected_year)
+        payload = frame_cache.get_or_build(key, lambda: build_heatmap_payload(neighborhood_data, selected_year, view))
+
+        # Warm the neighbouring years so scrubbing the slider hits the cache
+        position = years.index(selected_year)
+        for neighbor in years[max(0, position - 1):position + 2]:
+            if neighbor != selected_year:
+                frame_cache.prefetch(
+                    (version, selected_neighborhood, neighbor),
+                    lambda year=neighbor: build_heatmap_payload(neighborhood_data, year, view)
+                )
+        fig = pio.from_json(payload)
+    else:
+        fig = heatmap_figure(neighborhood_data, selected_year, view)
     st.plotly_chart(fig, use_container_width=True)
 
     # Common violations table
     if selected_neighborhood != "All Neighborhoods":
         st.markdown("### Common Violations")
-        violations = neighborhood_data.groupby('violation_code')['violation_description'].first().reset_index()
-        violations['count'] = neighborhood_data.groupby('violation_code').size().values
+        # observed=True: codes are categorical, and unseen ones would show up with a count of 0
+        by_code = neighborhood_data.groupby('violation_code', observed=True)
+        violations = by_code['violation_description'].first().reset_index()
+        violations['count'] = by_code.size().values
         violations = violations.sort_values('count', ascending=False).head(5)
 
         st.dataframe(
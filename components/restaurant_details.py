@@ -33,7 +33,11 @@ def get_rating_class_and_message(score):
             'message': "Odie wouldn't even eat here... and that's saying something!"
         }
 
-def render_restaurant_details(row):
+# Radius and count for the "nearby" markers on the location map
+NEARBY_METERS = 500
+NEARBY_LIMIT = 25
+
+def render_restaurant_details(row, df=None, spatial_index=None):
     """Render detailed view for a single restaurant"""
     # Get rating information
     rating_info = get_rating_class_and_message(row['score'] if pd.notna(row['score']) else 100)
@@ -106,6 +110,14 @@ def render_restaurant_details(row):
             unsafe_allow_html=True
         )
 
-    # Add map
+    # Add map, with places nearby when a spatial index over df is available
+    nearby = None
+    if df is not None and spatial_index is not None and spatial_index.size == len(df):
+        positions = spatial_index.radius(row['latitude'], row['longitude'], NEARBY_METERS)
+        nearby = df.iloc[positions]
+        nearby = nearby[nearby['camis'] != row['camis']].head(NEARBY_LIMIT)
+
     st.markdown("### 📍 Location")
-    st.plotly_chart(create_restaurant_map(row), use_container_width=True)
\ No newline at end of file
+    if nearby is not None and not nearby.empty:
+        st.caption(f"Grey markers show {len(nearby)} other places within {NEARBY_METERS} m")
+    st.plotly_chart(create_restaurant_map(row, nearby), use_container_width=True)
\ No newline at end of file
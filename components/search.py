@@ -1,9 +1,92 @@
+import html
 import streamlit as st
 import pandas as pd
 from utils.data_loader import search_restaurants
 
-def render_search_section(df):
-    """Render the search section with a clean, minimal structure"""
+RESULTS_PAGE_SIZE = 20
+
+def result_labels(page):
+    """One-line summaries for a page of results, built column-wise"""
+    grade = page['grade'].astype(object).fillna('').astype(str).replace('', 'Grade N/A')
+    score = page['score'].map(lambda value: str(int(value)) if pd.notna(value) else 'N/A')
+    return "🏪 " + page['dba'].astype(str) + " - " + grade + " (Score: " + score + ")"
+
+def result_list_html(page):
+    """The whole page of results as one HTML block"""
+    address = (
+        page['building'].astype(str) + " " + page['street'].astype(str) + ", " + page['boro'].astype(str)
+    ).map(html.escape)
+    items = (
+        "<div class='restaurant-result'><h4>" + result_labels(page).map(html.escape) + "</h4>"
+        + "<p>📍 " + address + "</p></div>"
+    )
+    return "<div class='search-results'>" + "".join(items) + "</div>"
+
+def result_detail_html(row):
+    """Detail card for a single result"""
+    return f"""
+    <div class='restaurant-result'>
+        <p>📍 {row['building']} {row['street']}, {row['boro']}</p>
+        <p>📅 Inspected: {row['inspection_date'].strftime('%B %d, %Y')}</p>
+        {f"<p class='violation'>❗ {row['violation_description']}</p>" if pd.notna(row['violation_description']) else ""}
+        <div class='restaurant-details'>
+            <span>🍽️ {row['cuisine_description'] if pd.notna(row['cuisine_description']) else 'N/A'}</span>
+            {f"<span class='critical'>⚠️ {row['critical_flag']}</span>" if pd.notna(row['critical_flag']) else ""}
+        </div>
+    </div>
+    """
+
+def render_search_results(results, query, key="search_results", page_size=RESULTS_PAGE_SIZE):
+    """Render one page of results; work depends on page_size, not on the number of matches"""
+    page_key = f"{key}_page"
+    query_key = f"{key}_query"
+
+    # A new query starts again from the first page
+    if st.session_state.get(query_key) != query:
+        st.session_state[query_key] = query
+        st.session_state[page_key] = 1
+
+    page_count = max(1, -(-len(results) // page_size))
+    page_number = min(st.session_state.get(page_key, 1), page_count)
+    page = results.iloc[(page_number - 1) * page_size:page_number * page_size]
+
+    st.markdown(result_list_html(page), unsafe_allow_html=True)
+
+    # Details are built for the one restaurant picked, not for every row
+    labels = result_labels(page).tolist()
+    choice = st.selectbox(
+        "Show details for",
+        options=range(len(labels)),
+        index=None,
+        format_func=lambda position: labels[position],
+        placeholder="Pick a restaurant for inspection details",
+        key=f"{key}_detail_{page_number}",
+    )
+    if choice is not None:
+        st.markdown(result_detail_html(page.iloc[choice]), unsafe_allow_html=True)
+
+    if page_count > 1:
+        cols = st.columns([1, 2, 1])
+        with cols[0]:
+            if st.button("← Previous", key=f"{key}_prev", disabled=page_number <= 1):
+                st.session_state[page_key] = page_number - 1
+                st.rerun()
+        with cols[1]:
+            st.markdown(
+                f"<p style='text-align: center;'>Page {page_number} of {page_count}</p>",
+                unsafe_allow_html=True
+            )
+        with cols[2]:
+            if st.button("Next →", key=f"{key}_next", disabled=page_number >= page_count):
+                st.session_state[page_key] = page_number + 1
+                st.rerun()
+
+def render_search_section(df, index=None):
+    """Render the search section with a clean, minimal structure
+
+    index is the SearchEngine built for df (the DataStore snapshot's
+    search_index); without it every query rebuilds one or scans df.
+    """
     # Search input with minimal wrapping
     search_query = st.text_input(
         label="Search restaurants",
@@ -33,7 +116,7 @@ def render_search_section(df):
     # Display results if there's a search query
     if search_query.strip():
         try:
-            results = search_restaurants(df, search_query)
+            results = search_restaurants(df, search_query, index=index)
 
             if results is None or results.empty:
                 st.warning("No restaurants found matching your search.")
@@ -43,26 +126,7 @@ def render_search_section(df):
                     unsafe_allow_html=True
                 )
 
-                for idx, row in results.iterrows():
-                    with st.expander(
-                        f"🏪 {row['dba']} - "
-                        f"{row['grade'] if pd.notna(row['grade']) else 'Grade N/A'} "
-                        f"(Score: {int(row['score']) if pd.notna(row['score']) else 'N/A'})"
-                    ):
-                        st.markdown(
-                            f"""
-                            <div class='restaurant-card'>
-                                <p>📍 {row['building']} {row['street']}, {row['boro']}</p>
-                                <p>📅 Inspected: {row['inspection_date'].strftime('%B %d, %Y')}</p>
-                                {f"<p class='violation'>❗ {row['violation_description']}</p>" if pd.notna(row['violation_description']) else ""}
-                                <div class='restaurant-meta'>
-                                    <span>🍽️ {row['cuisine_description'] if pd.notna(row['cuisine_description']) else 'N/A'}</span>
-                                    {f"<span class='critical-flag {row['critical_flag'].lower().replace(' ','-')}'>{row['critical_flag']}</span>" if pd.notna(row['critical_flag']) else ""}
-                                </div>
-                            </div>
-                            """,
-                            unsafe_allow_html=True
-                        )
+                render_search_results(results, search_query, key="search_results_main")
 
         except Exception as e:
             st.error(f"Error displaying search results: {str(e)}")
\ No newline at end of file
@@ -1,8 +1,19 @@
+# First, so its clock starts before the heavier imports below
+from utils import startup
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from components.header import render_header
-from utils.data_loader import load_nyc_restaurant_data, search_restaurants
+from components.debug import DEBUG_PANEL, render_debug_panel
+from components.header import render_header, render_styles
+from components.search import render_search_results
+from utils.aggregates import local_pest_counts, pest_counts
+from utils.data_loader import search_restaurants
+from utils.data_store import get_data_store
+from utils.instrumentation import span
+from utils.metrics import ALL_AREAS
+from utils.search_index import query_boroughs
+from utils.snapshots import snapshot_state
+
+# How often a page without data checks whether the first snapshot has been published
+DATA_POLL_SECONDS = 5
 
 # Page configuration
 st.set_page_config(
@@ -34,66 +45,55 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load custom CSS
-with open('styles/custom.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-
-# Initialize session state for data loading
-if 'data_loaded' not in st.session_state:
-    st.session_state.data_loaded = False
-
-if 'data' not in st.session_state:
-    st.session_state.data = None
-
-# Load data if not already loaded
-if not st.session_state.data_loaded:
-    try:
-        data = load_nyc_restaurant_data()
-        if not data.empty:
-            st.session_state.data = data
-            st.session_state.data_loaded = True
-        else:
-            st.error("Unable to load restaurant data. Please try refreshing the page.")
-    except Exception as e:
-        st.error(f"Error loading data: {str(e)}")
+render_styles()
+
+# All sessions share one read-only copy of the dataset. The page renders from
+# its small citywide summary; the rows load only once a search needs them
+store = get_data_store()
+summary = None
+try:
+    # None means nothing is published yet; the first ingest runs off-request
+    summary = store.summary()
+except Exception as e:
+    st.error(f"Error loading data: {str(e)}")
 
 # Render content if data is loaded
-if st.session_state.data_loaded and st.session_state.data is not None:
-    df = st.session_state.data
+if summary is not None:
+    # Note which snapshot this session rendered so a background swap is visible
+    if st.session_state.get('data_version') not in (None, summary.version):
+        st.toast("Restaurant data was refreshed")
+    st.session_state.data_version = summary.version
+
+    # Past the hard TTL the data is still shown, but say so
+    if snapshot_state(summary.manifest) == "expired":
+        published = summary.manifest['created'][:10]
+        st.warning(f"Showing restaurant data published on {published}; a refresh is overdue.")
 
     # Render header with integrated search
-    render_header()
+    with span('render.header'):
+        render_header()
 
     # Handle search results if there's a query
-    search_query = st.session_state.get('search_query', '').strip()
-    if search_query:
-        results = search_restaurants(df, search_query)
-        if results is None or results.empty:
-            st.warning("No restaurants found matching your search.")
-        else:
-            st.markdown(f"##### Found {len(results)} matching restaurants:")
-            st.markdown("<div class='search-results'>", unsafe_allow_html=True)
-
-            for idx, row in results.iterrows():
-                expander_label = (
-                    f"🏪 {row['dba']} - "
-                    f"{row['grade'] if pd.notna(row['grade']) else 'Grade N/A'} "
-                    f"(Score: {int(row['score']) if pd.notna(row['score']) else 'N/A'})"
-                )
-
-                with st.expander(expander_label, expanded=False):
-                    st.markdown(f"""
-                    <div class='restaurant-result'>
-                        <p>📍 {row['building']} {row['street']}, {row['boro']}</p>
-                        <p>📅 Inspected: {row['inspection_date'].strftime('%B %d, %Y')}</p>
-                        {f"<p class='violation'>❗ {row['violation_description']}</p>" if pd.notna(row['violation_description']) else ""}
-                        <div class='restaurant-details'>
-                            <span>🍽️ {row['cuisine_description'] if pd.notna(row['cuisine_description']) else 'N/A'}</span>
-                            {f"<span class='critical'>⚠️ {row['critical_flag']}</span>" if pd.notna(row['critical_flag']) else ""}
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-            st.markdown("</div>", unsafe_allow_html=True)
+    with span('render.search'):
+        search_query = st.session_state.get('search_query', '').strip()
+        if search_query:
+            # A search scoped with boro: reads only those boroughs' partitions
+            boroughs = query_boroughs(search_query, summary.metrics.boroughs)
+            if boroughs == []:
+                results = None  # its boro: filter names no borough
+            else:
+                with st.spinner("Loading restaurants..."):
+                    snapshot = store.snapshot() if boroughs is None else store.borough_snapshot(boroughs)
+                if snapshot.data is None or snapshot.data.empty:
+                    st.error("Unable to load restaurant data. Please try refreshing the page.")
+                    results = None
+                else:
+                    results = search_restaurants(snapshot.data, search_query, index=snapshot.search_index)
+            if results is None or results.empty:
+                st.warning("No restaurants found matching your search.")
+            else:
+                st.markdown(f"##### Found {len(results)} matching restaurants:")
+                render_search_results(results, search_query)
 
     # Add spacing between search results and main content
     st.markdown("<div style='margin-top: 1.5rem;'></div>", unsafe_allow_html=True)
@@ -104,73 +104,78 @@ if st.session_state.data_loaded and st.session_state.data is not None:
     # Add container with max-width for better centering
     st.markdown("<div style='max-width: 800px; margin: 0 auto; padding: 0 1rem;'>", unsafe_allow_html=True)
 
-    # Metrics in two rows with padding columns
-    cols = st.columns([0.2, 1, 1, 0.1])  # Increased left padding
-    with cols[1]:
-        st.metric(
-            "Active Restaurants",
-            f"{len(df['camis'].unique()):,}",
-            help="Total number of restaurants currently operating in NYC"
-        )
-        grade_a_percent = (len(df[df['grade'] == 'A']) / len(df) * 100)
-        st.metric(
-            "Grade A Restaurants",
-            f"{grade_a_percent:.1f}%",
-            help="Percentage of restaurants with Grade A rating"
-        )
+    with span('render.metrics'):
+        # Metrics come from the cube built with this data version, not from the full frame
+        metrics = summary.metrics
+
+        # Metrics in two rows with padding columns
+        cols = st.columns([0.2, 1, 1, 0.1])  # Increased left padding
+        with cols[1]:
+            st.metric(
+                "Active Restaurants",
+                f"{metrics.active_restaurants():,}",
+                help="Total number of restaurants currently operating in NYC"
+            )
+            grade_a_percent = metrics.grade_percent('A')
+            st.metric(
+                "Grade A Restaurants",
+                f"{grade_a_percent:.1f}%",
+                help="Percentage of restaurants with Grade A rating"
+            )
+
+        with cols[2]:
+            recent_inspections = metrics.recent_inspections(days=30)
+            st.metric(
+                "Recent Inspections",
+                f"{recent_inspections:,}",
+                help="Inspections conducted in the last 30 days"
+            )
+            avg_score = metrics.average_score()
+            st.metric(
+                "Average Safety Score",
+                f"{avg_score:.1f}",
+                help="Lower score indicates better safety standards"
+            )
+
+        st.markdown("</div>", unsafe_allow_html=True)
 
-    with cols[2]:
-        recent_inspections = len(df[df['inspection_date'] >= (pd.Timestamp.now() - pd.Timedelta(days=30))])
-        st.metric(
-            "Recent Inspections",
-            f"{recent_inspections:,}",
-            help="Inspections conducted in the last 30 days"
-        )
-        avg_score = df['score'].mean()
-        st.metric(
-            "Average Safety Score",
-            f"{avg_score:.1f}",
-            help="Lower score indicates better safety standards"
+    # Neighborhood Toggle Section
+    st.markdown("<h3 style='text-align: center; margin: 2rem 0;'>🏘️ Neighborhood View</h3>", unsafe_allow_html=True)
+
+    with span('render.neighborhood'):
+        # Add "All NYC" as the first option
+        borough_options = [ALL_AREAS] + metrics.boroughs
+        selected_boro = st.selectbox(
+            label="Select a neighborhood to explore",
+            options=borough_options,
+            key="neighborhood_selector",
+            label_visibility="collapsed"
         )
 
-    st.markdown("</div>", unsafe_allow_html=True)
+        # Grade Distribution Chart. plotly.express is imported here, after the
+        # header and metrics above have already been sent to the browser
+        import plotly.express as px
 
-    # Neighborhood Toggle Section
-    st.markdown("<h3 style='text-align: center; margin: 2rem 0;'>🏘️ Neighborhood View</h3>", unsafe_allow_html=True)
+        grade_dist = metrics.grade_distribution(selected_boro)
+        fig_grades = px.pie(
+            values=grade_dist.values,
+            names=grade_dist.index,
+            title=f'Restaurant Grades Distribution in {selected_boro}',
+            color_discrete_sequence=['#2ECC71', '#F1C40F', '#E74C3C']
+        )
 
-    # Add "All NYC" as the first option
-    borough_options = ["All NYC"] + sorted(df['boro'].unique().tolist())
-    selected_boro = st.selectbox(
-        label="Select a neighborhood to explore",
-        options=borough_options,
-        key="neighborhood_selector",
-        label_visibility="collapsed"
-    )
-
-    # Filter data based on selection
-    filtered_df = df if selected_boro == "All NYC" else df[df['boro'] == selected_boro]
-
-    # Grade Distribution Chart
-    grade_dist = filtered_df[filtered_df['grade'].isin(['A', 'B', 'C'])]['grade'].value_counts()
-    fig_grades = px.pie(
-        values=grade_dist.values,
-        names=grade_dist.index,
-        title=f'Restaurant Grades Distribution in {selected_boro}',
-        color_discrete_sequence=['#2ECC71', '#F1C40F', '#E74C3C']
-    )
-
-    # Update layout for transparent background and centered title
-    fig_grades.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(t=80, b=20, l=20, r=20),
-        title=dict(
-            y=0.95,
-            yanchor='top'
+        # Update layout for transparent background and centered title
+        fig_grades.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            margin=dict(t=80, b=20, l=20, r=20),
+            title=dict(
+                y=0.95,
+                yanchor='top'
+            )
         )
-    )
 
-    st.plotly_chart(fig_grades, use_container_width=True)
+        st.plotly_chart(fig_grades, use_container_width=True)
 
     # Pest Violations Section
     st.markdown("""
@@ -181,56 +186,42 @@ if st.session_state.data_loaded and st.session_state.data is not None:
         </p>
     """, unsafe_allow_html=True)
 
-    # Filter for pest-related violations in the past year
-    one_year_ago = pd.Timestamp.now() - pd.Timedelta(days=365)
-    pest_df = filtered_df[
-        (filtered_df['inspection_date'] >= one_year_ago) &
-        (filtered_df['violation_description'].notna())
-    ]
-
-    # Define pest-related keywords
-    pest_keywords = {
-        'rats/mice': ['rat', 'mouse', 'mice', 'rodent'],
-        'cockroaches': ['roach', 'cockroach'],
-        'flies': ['flies', 'flying insects'],
-        'vermin': ['vermin', 'pest']
-    }
-
-    # Calculate statistics for each pest type
-    pest_stats = {}
-    for pest_type, keywords in pest_keywords.items():
-        mask = pest_df['violation_description'].str.lower().str.contains('|'.join(keywords), na=False)
-        pest_stats[pest_type] = len(pest_df[mask])
-
-    # Create centered container and columns for stats
-    st.markdown("<div style='max-width: 800px; margin: 0 auto; padding: 0 1rem;'>", unsafe_allow_html=True)
-    cols = st.columns([0.2, 1, 1, 0.1])  # Increased left padding
-
-    with cols[1]:
-        st.metric(
-            "🐀 Rats/Mice Reports",
-            pest_stats['rats/mice'],
-            help="Number of rat or mice related violations"
-        )
-        st.metric(
-            "🪰 Fly Infestations",
-            pest_stats['flies'],
-            help="Number of fly-related violations"
-        )
-
-    with cols[2]:
-        st.metric(
-            "🪳 Cockroach Reports",
-            pest_stats['cockroaches'],
-            help="Number of cockroach-related violations"
-        )
-        st.metric(
-            "🐜 Other Vermin",
-            pest_stats['vermin'],
-            help="Number of other pest-related violations"
-        )
-
-    st.markdown("</div>", unsafe_allow_html=True)
+    with span('render.pests'):
+        # Counted by the API with one grouped query per category, cached on its own TTL;
+        # until those arrive, the same counts come from the published rows
+        pest_stats = pest_counts(area=selected_boro)
+        if pest_stats is None:
+            pest_stats = local_pest_counts(summary.violation_days, selected_boro)
+
+        # Create centered container and columns for stats
+        st.markdown("<div style='max-width: 800px; margin: 0 auto; padding: 0 1rem;'>", unsafe_allow_html=True)
+        cols = st.columns([0.2, 1, 1, 0.1])  # Increased left padding
+
+        with cols[1]:
+            st.metric(
+                "🐀 Rats/Mice Reports",
+                pest_stats['rats/mice'],
+                help="Number of rat or mice related violations"
+            )
+            st.metric(
+                "🪰 Fly Infestations",
+                pest_stats['flies'],
+                help="Number of fly-related violations"
+            )
+
+        with cols[2]:
+            st.metric(
+                "🪳 Cockroach Reports",
+                pest_stats['cockroaches'],
+                help="Number of cockroach-related violations"
+            )
+            st.metric(
+                "🐜 Other Vermin",
+                pest_stats['vermin'],
+                help="Number of other pest-related violations"
+            )
+
+        st.markdown("</div>", unsafe_allow_html=True)
 
     # Add extra spacing
     st.markdown("<div style='margin: 5rem 0;'></div>", unsafe_allow_html=True)
@@ -261,5 +252,22 @@ if st.session_state.data_loaded and st.session_state.data is not None:
         </div>
     """, unsafe_allow_html=True)
 
+    store.track_session(st.session_state)
+
+    # Shared dataset size, per-session overhead, frame cache counters and stage timings
+    if DEBUG_PANEL and st.query_params.get('debug') == '1':
+        render_debug_panel(store)
+
 else:
-    st.warning("Please wait while we load the data...")
\ No newline at end of file
+    st.warning("Please wait while we load the data...")
+
+    # Poll for the first published snapshot instead of blocking this request on ingest
+    @st.fragment(run_every=DATA_POLL_SECONDS)
+    def wait_for_data():
+        if store.summary() is not None:
+            st.rerun()
+
+    wait_for_data()
+
+# Cold-start figure for the debug panel and benchmarks/startup.py
+startup.mark_first_render()
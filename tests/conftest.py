@@ -0,0 +1,35 @@
+import os
+import pandas as pd
+import pytest
+import utils.cache_manager as cache_manager
+import utils.snapshots as snapshots
+from benchmarks.soda_server import SodaServer
+from benchmarks.synthetic import generate_inspection_rows
+
+# Small enough to ingest in a second, with enough pages to exercise paging
+TEST_ROWS = 20_000
+TEST_PAGE_SIZE = 1000
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the cache and snapshots at a scratch directory; the modules read these at call time"""
+    directory = str(tmp_path / 'cache')
+    monkeypatch.setattr(cache_manager, 'CACHE_DIR', directory)
+    monkeypatch.setattr(cache_manager, 'CACHE_FILE', os.path.join(directory, 'restaurant_data.csv'))
+    monkeypatch.setattr(cache_manager, 'PARQUET_CACHE_FILE', os.path.join(directory, 'restaurant_data.parquet'))
+    monkeypatch.setattr(cache_manager, 'CACHE_META_FILE', os.path.join(directory, 'cache_metadata.json'))
+    monkeypatch.setattr(cache_manager, 'LOCK_FILE', os.path.join(directory, 'refresh.lock'))
+    monkeypatch.setattr(cache_manager, 'REFRESH_STATUS_FILE', os.path.join(directory, 'refresh_status.json'))
+    monkeypatch.setattr(snapshots, 'SNAPSHOT_DIR', os.path.join(directory, 'snapshots'))
+    monkeypatch.setattr(snapshots, 'CURRENT_FILE', os.path.join(directory, 'snapshots', 'CURRENT'))
+    return directory
+
+@pytest.fixture
+def raw_rows():
+    """Synthetic API rows ending today, so trailing-window queries see them"""
+    return generate_inspection_rows(TEST_ROWS, seed=0, end=pd.Timestamp.now().normalize())
+
+@pytest.fixture
+def soda(raw_rows):
+    with SodaServer(raw_rows) as server:
+        yield server
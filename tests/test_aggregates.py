@@ -0,0 +1,26 @@
+from utils.aggregates import AggregateCache, local_pest_counts, pest_counts, pest_queries
+from utils.ingest import DERIVED_COLUMNS, SELECT_COLUMNS, page_params, read_page, refresh_snapshot
+from utils.metrics import ALL_AREAS
+from utils.snapshots import load_snapshot, load_summary
+from tests.conftest import TEST_PAGE_SIZE
+
+def test_pages_carry_only_projected_columns(cache_dir, soda):
+    assert list(read_page(soda.url, page_params(0, 10)).columns) == SELECT_COLUMNS
+
+    refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    assert set(load_snapshot(artifacts=False).rows.columns) == set(SELECT_COLUMNS + DERIVED_COLUMNS)
+
+def test_server_pest_counts_match_local(cache_dir, soda, raw_rows, tmp_path):
+    # Some rows have no coordinates: dropped at ingest, so the API must not count them either
+    assert raw_rows['latitude'].isna().any()
+    refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    summary = load_summary()
+
+    cache = AggregateCache(soda.url, directory=str(tmp_path / 'aggregates'))
+    for category, params in pest_queries().items():
+        cache.refresh(f"pests-{category}", params)
+
+    for area in [ALL_AREAS] + summary.metrics.boroughs:
+        counts = pest_counts(cache, area)
+        assert counts == local_pest_counts(summary.violation_days, area)
+    assert sum(pest_counts(cache).values()) > 0
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+import pytest
+import utils.cache_manager as cache_manager
+from utils.cache_manager import RefreshLock, get_refresh_status, refresh_in_progress, update_refresh_status
+
+# Holds the refresh lock in another process until killed
+HOLDER_SCRIPT = """
+import time
+from utils.cache_manager import RefreshLock
+lock = RefreshLock().__enter__()
+print(lock.acquired, flush=True)
+time.sleep(60)
+"""
+
+@pytest.fixture
+def holder(cache_dir):
+    process = subprocess.Popen(
+        [sys.executable, '-c', HOLDER_SCRIPT], stdout=subprocess.PIPE, text=True,
+        env={**os.environ, 'NYC_CACHE_DIR': cache_dir},
+    )
+    assert process.stdout.readline().strip() == 'True'
+    yield process
+    process.kill()
+    process.wait()
+
+def test_second_holder_is_refused_until_the_first_releases(cache_dir):
+    assert not refresh_in_progress()
+    with RefreshLock() as first:
+        assert first.acquired
+        with RefreshLock() as second:
+            assert not second.acquired
+        assert refresh_in_progress()
+    assert not refresh_in_progress()
+    with RefreshLock() as third:
+        assert third.acquired
+
+def test_probing_never_takes_the_lock(cache_dir, monkeypatch):
+    calls = []
+    flock = cache_manager.fcntl.flock
+    monkeypatch.setattr(cache_manager.fcntl, 'flock', lambda *args: calls.append(args) or flock(*args))
+
+    with RefreshLock():
+        update_refresh_status("refreshing")
+    calls.clear()
+    refresh_in_progress()
+    get_refresh_status()
+    assert calls == []
+
+def test_refresh_status_stays_out_of_the_cache_metadata(cache_dir):
+    with RefreshLock():
+        update_refresh_status("ok", version="v1")
+    assert get_refresh_status()['version'] == "v1"
+    assert not os.path.exists(cache_manager.CACHE_META_FILE)
+
+def test_lock_held_by_another_process(cache_dir, holder):
+    update_refresh_status("refreshing")
+    assert refresh_in_progress()
+    assert get_refresh_status()['status'] == "refreshing"
+    with RefreshLock() as lock:
+        assert not lock.acquired
+
+    # A crashed holder leaves its record, but not its lock
+    holder.kill()
+    holder.wait()
+    assert not refresh_in_progress()
+    assert get_refresh_status()['status'] == "interrupted"
+    with RefreshLock() as lock:
+        assert lock.acquired
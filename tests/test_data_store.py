@@ -0,0 +1,39 @@
+import threading
+import numpy as np
+import pytest
+from utils.data_loader import search_restaurants
+from utils.data_store import DataStore
+from utils.ingest import clean_inspection_rows, publish_history
+from utils.history import InspectionHistory
+
+@pytest.fixture
+def store(cache_dir, raw_rows):
+    publish_history(InspectionHistory(clean_inspection_rows(raw_rows.copy())))
+    return DataStore(ingest_in_app=False)
+
+def test_borough_snapshot_reads_only_its_partition(store):
+    snapshot = store.borough_snapshot(['Queens'])
+
+    assert not store.rows_loaded
+    assert set(snapshot.data['boro'].astype(str)) == {'Queens'}
+    assert store.stats()['partitions_loaded'] == [['Queens']]
+
+def test_borough_search_matches_citywide_search(store):
+    query = 'boro:queens pizza'
+    scoped = store.borough_snapshot(['Queens'])
+    partial = search_restaurants(scoped.data, query, index=scoped.search_index)
+
+    citywide = store.snapshot()
+    full = search_restaurants(citywide.data, query, index=citywide.search_index)
+
+    assert len(partial) and np.array_equal(np.sort(partial['camis']), np.sort(full['camis']))
+    # With the citywide rows loaded, scoped searches use them
+    assert store.borough_snapshot(['Queens']) is store.snapshot()
+    assert store.stats()['partitions_loaded'] == []
+
+def test_summary_does_not_wait_for_a_rows_load(store):
+    done = threading.Event()
+    with store._load_lock:
+        # As while another session's snapshot() loads the rows
+        threading.Thread(target=lambda: store.summary() and done.set(), daemon=True).start()
+        assert done.wait(10)
@@ -0,0 +1,69 @@
+import threading
+from utils.frame_cache import FrameCache
+
+def test_least_recently_used_evicted_past_the_byte_cap():
+    cache = FrameCache(max_bytes=30, max_entries=10)
+    cache.put('a', 'x' * 10)
+    cache.put('b', 'x' * 10)
+    cache.put('c', 'x' * 10)
+    assert cache.get('a') is not None  # now b is the least recently used
+
+    cache.put('d', 'x' * 10)
+    assert cache.get('b') is None
+    assert [cache.get(key) is not None for key in 'acd'] == [True, True, True]
+    assert cache.stats()['bytes'] == 30
+    assert cache.stats()['evictions'] == 1
+
+    # Larger than the whole cache: never stored, nothing evicted for it
+    cache.put('e', 'x' * 31)
+    assert cache.get('e') is None
+    assert cache.stats()['entries'] == 3
+
+def test_entry_cap_and_replacing_a_key():
+    cache = FrameCache(max_bytes=1000, max_entries=2)
+    cache.put('a', 'x' * 10)
+    cache.put('a', 'x' * 20)
+    assert cache.stats()['bytes'] == 20
+
+    cache.put('b', 'x')
+    cache.put('c', 'x')
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 2
+
+def test_hit_and_miss_counters():
+    cache = FrameCache()
+    builds = []
+    for _ in range(3):
+        cache.get_or_build('a', lambda: builds.append(1) or 'payload')
+
+    assert len(builds) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+def test_prefetch_builds_each_key_once_in_the_background():
+    cache = FrameCache()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        release.wait(10)
+        return 'payload'
+
+    cache.prefetch('a', build)
+    cache.prefetch('a', build)  # already queued
+    release.set()
+    cache._pool.shutdown(wait=True)
+
+    assert len(builds) == 1
+    assert cache.stats()['prefetched'] == 1
+    assert cache.get('a') == 'payload'
+
+def test_failed_prefetch_is_not_cached():
+    cache = FrameCache()
+    cache.prefetch('a', lambda: 1 / 0)
+    cache._pool.shutdown(wait=True)
+
+    assert cache.get('a') is None
+    assert cache.stats()['prefetched'] == 0
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.history import InspectionHistory
+from utils.ingest import clean_inspection_rows
+
+@pytest.fixture
+def rows(raw_rows):
+    # Shuffled, so the history has to put every restaurant's rows back in order
+    return clean_inspection_rows(raw_rows.sample(frac=1, random_state=0))
+
+def test_offsets_partition_the_rows_by_restaurant(rows):
+    history = InspectionHistory(rows)
+
+    assert len(history) == len(rows)
+    assert history.restaurant_count == rows['camis'].nunique()
+    assert np.all(np.diff(history.camis) > 0)
+    assert history.offsets[0] == 0 and history.offsets[-1] == len(rows)
+    assert np.array_equal(np.diff(history.offsets), rows.groupby('camis').size().sort_index().to_numpy())
+
+def test_timeline_is_every_row_of_one_restaurant_oldest_first(rows):
+    history = InspectionHistory(rows)
+    for camis in rows['camis'].drop_duplicates().sample(20, random_state=0):
+        timeline = history.timeline(camis)
+        expected = rows[rows['camis'] == camis].sort_values('inspection_date', kind='stable')
+
+        assert (timeline['camis'] == camis).all()
+        assert timeline['inspection_date'].is_monotonic_increasing
+        assert timeline.drop(columns='camis').reset_index(drop=True).equals(
+            expected.drop(columns='camis').reset_index(drop=True)
+        )
+
+    assert history.timeline(-1).empty
+    assert history.timeline(history.camis.max() + 1).empty
+
+def test_latest_is_each_restaurants_newest_row_newest_first(rows):
+    latest = InspectionHistory(rows).latest()
+
+    assert latest['camis'].is_unique and len(latest) == rows['camis'].nunique()
+    assert latest['inspection_date'].is_monotonic_decreasing
+    newest = rows.groupby('camis')['inspection_date'].max()
+    assert (latest.set_index('camis')['inspection_date'] == newest[latest['camis']]).all()
+
+def test_merge_keeps_timelines_in_order(rows):
+    dates = rows['inspection_date']
+    cutoff = dates.quantile(0.8)
+    merged = InspectionHistory(rows[dates < cutoff]).merge(rows[dates >= cutoff])
+    whole = InspectionHistory(rows)
+
+    assert np.array_equal(merged.offsets, whole.offsets)
+    camis = whole.camis[len(whole.camis) // 2]
+    assert merged.timeline(camis)['inspection_date'].tolist() == whole.timeline(camis)['inspection_date'].tolist()
+
+def test_empty_history():
+    history = InspectionHistory(pd.DataFrame({'camis': [], 'inspection_date': pd.to_datetime([])}))
+
+    assert history.restaurant_count == 0
+    assert history.timeline(1).empty
+    assert history.latest().empty
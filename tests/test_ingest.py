@@ -0,0 +1,145 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+import utils.ingest as ingest
+from utils.snapshots import current_version, load_snapshot, read_manifest
+from tests.conftest import TEST_PAGE_SIZE, TEST_ROWS
+
+def fail_from(monkeypatch, offset, page=None):
+    """Make every page at or past offset fail, or come back as page(real_page) instead"""
+    real = ingest.read_page
+
+    def read_page(url, params=None):
+        if int((params or {}).get('$offset', 0)) >= offset:
+            if page is None:
+                raise requests.HTTPError("503 Server Error: injected")
+            return page(real(url, params))
+        return real(url, params)
+    monkeypatch.setattr(ingest, 'read_page', read_page)
+
+def staged(cache_dir):
+    snapshot_dir = os.path.join(cache_dir, 'snapshots')
+    return [name for name in os.listdir(snapshot_dir) if name.startswith('.staging-')]
+
+@pytest.fixture
+def published(cache_dir, soda):
+    manifest, outcome = ingest.refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    assert outcome == 'refreshed'
+    return manifest
+
+@pytest.mark.parametrize('parallel', [True, False])
+def test_failed_page_keeps_previous_snapshot(cache_dir, soda, published, monkeypatch, parallel):
+    fail_from(monkeypatch, 8000)
+    manifest, outcome = ingest.refresh_snapshot(
+        soda.url, parallel=parallel, page_size=TEST_PAGE_SIZE, delta=False, force=True
+    )
+
+    assert outcome == 'failed'
+    assert current_version() == published['version']
+    assert read_manifest()['record_count'] == published['record_count']
+    assert staged(cache_dir) == []
+
+def test_short_fetch_keeps_previous_snapshot(cache_dir, soda, published, monkeypatch):
+    # Pages past the offset come back empty, as if the data ended there
+    fail_from(monkeypatch, 8000, page=lambda page: page.iloc[:0])
+    manifest, outcome = ingest.refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+
+    assert outcome == 'failed'
+    assert current_version() == published['version']
+    assert staged(cache_dir) == []
+
+def test_complete_fetch_publishes(cache_dir, soda, published, raw_rows):
+    assert published['record_count'] == len(raw_rows.dropna(subset=['inspection_date', 'latitude', 'longitude']))
+    assert staged(cache_dir) == []
+
+def canonical(rows):
+    """Rows as comparable text, in a fixed row and column order"""
+    rows = rows[sorted(rows.columns)].astype(str)
+    return rows.sort_values(list(rows.columns)).reset_index(drop=True)
+
+def test_concurrent_pages_match_sequential(soda):
+    concurrent = ingest.fetch_pages_concurrently(soda.url, TEST_PAGE_SIZE, concurrency=4)
+    sequential = ingest.fetch_pages_sequentially(soda.url, TEST_PAGE_SIZE)
+
+    assert len(concurrent) == len(sequential) > 1
+    assert pd.concat(concurrent, ignore_index=True).equals(pd.concat(sequential, ignore_index=True))
+
+def test_pages_tile_the_dataset_exactly(soda):
+    # The stand-in, like the API, breaks ties under a non-unique $order differently on each request
+    whole = {**ingest.page_params(0, TEST_ROWS), '$order': 'inspection_date DESC'}
+    assert not ingest.read_page(soda.url, whole).equals(ingest.read_page(soda.url, whole))
+
+    # So pages need the unique order to neither skip nor repeat rows tied across a boundary
+    pages = ingest.fetch_pages_concurrently(soda.url, TEST_PAGE_SIZE, concurrency=4)
+    everything = ingest.read_page(soda.url, ingest.page_params(0, TEST_ROWS))
+    assert canonical(pd.concat(pages, ignore_index=True)).equals(canonical(everything))
+
+def test_delta_sync_matches_full_fetch(cache_dir, soda, raw_rows):
+    # Publish what the API held a month ago, then sync the newer rows
+    dates = pd.to_datetime(raw_rows['inspection_date'])
+    soda.update(raw_rows[dates < dates.max() - pd.Timedelta(days=30)])
+    ingest.refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    soda.update(raw_rows)
+
+    first = len(soda.requests)
+    synced, outcome = ingest.refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, force=True)
+    assert outcome == 'refreshed'
+    # Only rows past the watermark were paged
+    pages = [request['query'] for request in soda.requests[first:] if '$offset' in request['query']]
+    assert pages and all('inspection_date >=' in query['$where'] for query in pages)
+    delta_rows = load_snapshot(artifacts=False).rows
+
+    full, _ = ingest.refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    full_rows = load_snapshot(artifacts=False).rows
+
+    assert synced['record_count'] == full['record_count']
+    assert canonical(delta_rows).equals(canonical(full_rows))
+
+def test_export_matches_paged_ingest(cache_dir, soda):
+    exported = pd.concat(ingest.iter_export(ingest.export_url(soda.url), chunk_rows=5000), ignore_index=True)
+    assert list(exported.columns) == ingest.SELECT_COLUMNS
+
+    first = len(soda.requests)
+    ingest.run_ingest(soda.url, page_size=TEST_PAGE_SIZE, delta=False, export=True)
+    # The export itself was published, not the paging fallback
+    assert not any('$offset' in request['query'] for request in soda.requests[first:])
+    export_rows = load_snapshot(artifacts=False).rows
+
+    ingest.run_ingest(soda.url, page_size=TEST_PAGE_SIZE, delta=False, export=False)
+    paged_rows = load_snapshot(artifacts=False).rows
+
+    assert canonical(export_rows).equals(canonical(paged_rows))
+
+def test_max_age_decides_freshness(cache_dir, soda, published):
+    args = ['--url', soda.url]
+    first = len(soda.requests)
+    assert ingest.main(args + ['--max-age', '3600']) == 0
+    assert len(soda.requests) == first
+
+    # Older than a zero max age: revalidated with one conditional request instead
+    first = len(soda.requests)
+    assert ingest.main(args + ['--max-age', '0']) == 0
+    assert current_version() == published['version']
+    assert read_manifest()['validated']
+    assert len(soda.requests) == first + 1
+
+def test_missing_scores_fill_from_the_whole_dataset(cache_dir, raw_rows):
+    def pages():
+        return (raw_rows.iloc[start:start + TEST_PAGE_SIZE].copy() for start in range(0, len(raw_rows), TEST_PAGE_SIZE))
+
+    # One global median, as cleaning the whole dataset at once fills with
+    baseline = ingest.clean_inspection_rows(raw_rows.copy())
+    assert raw_rows['score'].isna().any()
+
+    published = []
+    for batch_rows in (5000, len(raw_rows)):
+        manifest = ingest.publish_pages(pages(), batch_rows=batch_rows)
+        published.append(load_snapshot())
+        assert manifest['score_median'] == raw_rows.loc[baseline.index, 'score'].median()
+
+    several, single = published
+    assert canonical(several.rows).equals(canonical(single.rows))
+    assert np.array_equal(np.sort(several.rows['score']), np.sort(baseline['score'].astype('float32')))
+    assert several.artifacts['metrics'].average_score() == single.artifacts['metrics'].average_score()
@@ -0,0 +1,30 @@
+import plotly.io as pio
+from components.maps import build_heatmap_payload
+from utils.ingest import clean_inspection_rows
+from utils.map_utils import DEFAULT_ZOOM, aggregate_heatmap_cells, fit_view
+
+def test_borough_views_zoom_in_and_get_finer_cells(raw_rows):
+    rows = clean_inspection_rows(raw_rows.copy())
+    borough = rows[rows['boro'] == 'Manhattan']
+
+    _, city_zoom = fit_view(rows)
+    bounds, borough_zoom = fit_view(borough)
+    assert city_zoom >= DEFAULT_ZOOM - 1
+    assert borough_zoom > city_zoom
+
+    # Finer cells at the closer zoom: more of them over the same points
+    assert len(aggregate_heatmap_cells(borough, borough_zoom)) > len(aggregate_heatmap_cells(borough, city_zoom))
+
+    year = int(borough['year'].max())
+    figure = pio.from_json(build_heatmap_payload(borough, year, (bounds, borough_zoom)))
+    assert figure.layout.mapbox.zoom == borough_zoom
+
+def test_cell_cap_below_the_borough_count_stops_at_one_cell_each(raw_rows):
+    rows = clean_inspection_rows(raw_rows.copy())
+    cells = aggregate_heatmap_cells(rows, 10, 3)
+
+    assert sorted(cells['boro']) == sorted(rows['boro'].unique())
+    assert cells['count'].sum() == len(rows)
+
+def test_no_points_keeps_the_default_view(raw_rows):
+    assert fit_view(raw_rows.iloc[:0]) == (None, DEFAULT_ZOOM)
@@ -0,0 +1,49 @@
+import pandas as pd
+import pytest
+from utils.history import InspectionHistory
+from utils.ingest import clean_inspection_rows
+from utils.metrics import ALL_AREAS, MetricsCube
+from utils.violations import VIOLATION_CATEGORIES
+
+@pytest.fixture
+def latest(raw_rows):
+    # The frame the original main.py computed its figures from
+    return InspectionHistory(clean_inspection_rows(raw_rows.copy())).latest()
+
+def baseline_figures(df, now):
+    """The Safety at a Glance figures as main.py computed them by filtering the frame"""
+    one_year_ago = now - pd.Timedelta(days=365)
+    pest_df = df[(df['inspection_date'] >= one_year_ago) & (df['violation_description'].notna())]
+    descriptions = pest_df['violation_description'].str.lower()
+    return {
+        'restaurants': len(df['camis'].unique()),
+        'grade_a_percent': len(df[df['grade'] == 'A']) / len(df) * 100,
+        'recent_inspections': len(df[df['inspection_date'] >= (now - pd.Timedelta(days=30))]),
+        'average_score': df['score'].mean(),
+        'grades': df[df['grade'].isin(['A', 'B', 'C'])]['grade'].value_counts().to_dict(),
+        'pests': {
+            category: len(pest_df[descriptions.str.contains('|'.join(keywords), na=False)])
+            for category, keywords in VIOLATION_CATEGORIES.items()
+        },
+    }
+
+def test_cube_matches_the_filtered_frame_in_every_area(latest):
+    now = pd.Timestamp.now()
+    cube = MetricsCube(latest, version='test')
+
+    assert cube.boroughs == sorted(latest['boro'].unique())
+    for area in [ALL_AREAS] + cube.boroughs:
+        df = latest if area == ALL_AREAS else latest[latest['boro'] == area]
+        expected = baseline_figures(df, now)
+
+        assert cube.active_restaurants(area) == expected['restaurants']
+        assert cube.grade_percent('A', area) == pytest.approx(expected['grade_a_percent'])
+        assert cube.recent_inspections(days=30, name=area, now=now) == expected['recent_inspections']
+        assert cube.average_score(area) == pytest.approx(expected['average_score'], rel=1e-6)
+        assert cube.grade_distribution(area).to_dict() == expected['grades']
+        assert cube.violation_counts(days=365, name=area, now=now) == expected['pests']
+        assert sum(expected['pests'].values()) > 0
+
+def test_unknown_area_reads_as_all_nyc(latest):
+    cube = MetricsCube(latest)
+    assert cube.active_restaurants('Atlantis') == cube.active_restaurants(ALL_AREAS)
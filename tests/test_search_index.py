@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.cache_manager import apply_cache_dtypes
+from utils.search_index import SearchEngine, TrigramIndex
+
+def restaurants():
+    return apply_cache_dtypes(pd.DataFrame({
+        'camis': [1, 2, 3],
+        'dba': ['Joe Pizza', 'Thai Town', 'Nan Dumplings'],
+        'building': ['1', '2', '3'],
+        'street': ['Main St', 'Broadway', 'Canal St'],
+        'zipcode': [11201.0, np.nan, 10013.0],
+        'boro': ['Brooklyn', 'Manhattan', 'Manhattan'],
+        'cuisine_description': ['Pizza', 'Thai', 'Chinese'],
+        'inspection_date': pd.to_datetime(['2024-01-01', '2024-02-01', '2024-03-01']),
+    }))
+
+def test_missing_zipcodes_are_not_indexed_as_nan():
+    engine = SearchEngine(restaurants())
+
+    assert engine.search('zip:nan').tolist() == []
+    assert engine.search('zip:11201').tolist() == [0]
+    # Free text 'nan' finds the name, not the row without a zipcode
+    assert engine.search('nan').tolist() == [2]
+
+def test_short_queries_match_word_starts_by_tier():
+    names = pd.Series(['A Pi', 'Spicy', 'Pita', 'Pi'])
+    # Newest first would be the reverse, so only the tiers put 'Pi' ahead
+    index = TrigramIndex(names, order_by=pd.to_datetime(['2024-04-01', '2024-03-01', '2024-02-01', '2024-01-01']))
+
+    assert index.search('pi').tolist() == [3, 2, 0]
+    assert index.search('p', within=np.array([0, 1])).tolist() == [0]
+    assert index.search('ic').tolist() == []
+
+def dated_index(names):
+    # Listed newest first, so recency alone would keep this order
+    dates = pd.date_range('2024-12-31', periods=len(names), freq='-1D')
+    return TrigramIndex(pd.Series(names), order_by=dates)
+
+def test_substring_matches_rank_by_tier_then_recency():
+    index = dated_index([
+        'Best Pizza Co',      # 0 word start
+        'Pizzeria Uno',       # 1 no match, shares a trigram
+        'Slice of Pizza',     # 2 word start, older
+        'Pizza',              # 3 exact
+        'Joespizza',          # 4 anywhere
+        'Pizza Hut',          # 5 prefix
+        'Pizz Azza',          # 6 every trigram of the query, but not the substring
+        'PIZZA PLANET',       # 7 prefix, older
+    ])
+
+    assert index.search('pizza').tolist() == [3, 5, 7, 0, 2, 4]
+    assert index.search('Pizza!').tolist() == index.search('pizza').tolist()
+    assert index.search('pizza', limit=2).tolist() == [3, 5]
+    assert index.search('pizza', within=np.array([0, 4, 6])).tolist() == [0, 4]
+    assert index.search('xyz').tolist() == []
+
+def test_names_are_normalized_before_matching():
+    index = dated_index(["JOE'S PIZZA", 'Café Crêpe', 'Salt & Pepper'])
+
+    assert index.search('joes').tolist() == [0]
+    assert index.search('cafe crepe').tolist() == [1]
+    assert index.search('salt and pepper').tolist() == [2]
+
+def typo_restaurants():
+    names = [
+        "JOE'S PIZZA & PASTA", "MCDONALD'S", 'PIZZA HUT', "JOE'S DELI", "JOE'S PIZZA", 'DONALD DUCK DINER', 'THAI TOWN',
+    ]
+    return apply_cache_dtypes(pd.DataFrame({
+        'camis': range(len(names)),
+        'dba': names,
+        'building': [str(number) for number in range(len(names))],
+        'street': 'BROADWAY',
+        'zipcode': '10001',
+        'boro': 'Manhattan',
+        'cuisine_description': 'American',
+        'inspection_date': pd.date_range('2024-12-31', periods=len(names), freq='-1D'),
+    }))
+
+@pytest.mark.parametrize('query, best', [('joes piza', 4), ('mcdonlds', 1), ('tai town', 6)])
+def test_typos_find_the_closest_name_first(query, best):
+    engine = SearchEngine(typo_restaurants())
+
+    assert engine.search(query, mode='exact').tolist() == []
+    assert engine.search(query).tolist()[0] == best
+    assert engine.search(query, mode='fuzzy').tolist()[0] == best
+
+def test_fuzzy_ranking_prefers_coverage_then_fewer_extra_words():
+    engine = SearchEngine(typo_restaurants())
+
+    # Both contain every trigram of the query; the name without extra words wins despite being older
+    assert engine.search('joes pizza', mode='fuzzy').tolist()[:2] == [4, 0]
+    # Too few shared trigrams to count as a match
+    assert engine.search('burger king', mode='fuzzy').tolist() == []
+    # Substring matches are preferred when there are any
+    assert engine.search('pizza').tolist() == [2, 0, 4]
@@ -0,0 +1,58 @@
+import json
+import numpy as np
+import utils.cache_manager as cache_manager
+from utils.cache_manager import apply_cache_dtypes
+from utils.ingest import build_artifacts, clean_inspection_rows
+from utils.history import InspectionHistory
+from utils.metrics import violation_days
+from utils.snapshots import MANIFEST_FILE, load_snapshot, load_summary, publish_snapshot, snapshot_path
+from utils.violations import VIOLATION_CATEGORIES, category_bits, classify_violations
+
+def publish(raw_rows, categories=VIOLATION_CATEGORIES):
+    """Publish the rows with flags, artifacts and summary made with the given categories"""
+    rows = apply_cache_dtypes(clean_inspection_rows(raw_rows.copy()))
+    rows['violation_flags'] = classify_violations(rows['violation_description'], categories)
+    latest = InspectionHistory(rows).latest()
+    artifacts = build_artifacts(latest, 'test')
+    summary = {'metrics': artifacts['metrics'], 'violation_days': violation_days(rows)}
+    manifest = publish_snapshot(rows, artifacts, summary=summary)
+
+    # As a snapshot written by a build with those categories would record them
+    path = snapshot_path(manifest['version'], MANIFEST_FILE)
+    with open(path) as f:
+        stored = json.load(f)
+    stored['violation_categories'] = category_bits(categories)
+    with open(path, 'w') as f:
+        json.dump(stored, f)
+    return manifest
+
+def test_current_taxonomy_loads_stored_flags_and_artifacts(cache_dir, raw_rows):
+    publish(raw_rows)
+    published = load_snapshot()
+
+    assert published.artifacts is not None
+    assert load_summary() is not None
+
+def test_other_taxonomy_is_reclassified_on_load(cache_dir, raw_rows):
+    # The same categories in another order: every bit means something else
+    reordered = dict(reversed(list(VIOLATION_CATEGORIES.items())))
+    publish(raw_rows, reordered)
+    published = load_snapshot()
+
+    expected = classify_violations(published.rows['violation_description'])
+    assert np.array_equal(published.rows['violation_flags'].to_numpy(), expected.to_numpy())
+    assert published.artifacts is None
+    assert load_summary() is None
+
+def test_csv_snapshot_with_a_sparse_partition_loads(cache_dir, raw_rows, monkeypatch):
+    monkeypatch.setattr(cache_manager, 'CACHE_FORMAT', "csv")
+    rows = raw_rows.iloc[:5000].copy()
+    # A few rows with a numeric borough and no grades, so their CSV reads back with other dtypes
+    rows.loc[rows.index[:3], ['boro', 'grade']] = ['0', None]
+    manifest = publish(rows)
+    assert manifest['format'] == "csv"
+
+    published = load_snapshot()
+    assert len(published.rows) == manifest['record_count']
+    assert (published.rows['boro'].astype(str) == '0').sum() == 3
+    assert load_snapshot(boroughs=['0', 'Queens']).rows['boro'].astype(str).isin(['0', 'Queens']).all()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from utils.spatial_index import METERS_PER_DEGREE_LAT, SpatialIndex
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    lat = rng.normal(40.73, 0.08, 5000)
+    lon = rng.normal(-73.93, 0.1, 5000)
+    # Rows without coordinates are never returned
+    lat[::97] = np.nan
+    return lat, lon
+
+def brute_distances(index, lat, lon):
+    valid = np.flatnonzero(np.isfinite(index.lat) & np.isfinite(index.lon))
+    return valid, index.distances(valid, lat, lon)
+
+@pytest.mark.parametrize('cell_meters', [100, 250, 2000])
+def test_bbox_matches_brute_force(points, cell_meters):
+    lat, lon = points
+    index = SpatialIndex(lat, lon, cell_meters)
+    for box in [(40.70, -73.99, 40.76, -73.90), (40.0, -75.0, 41.5, -73.0), (41.0, -73.0, 41.1, -72.9)]:
+        min_lat, min_lon, max_lat, max_lon = box
+        expected = np.flatnonzero((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon))
+        assert np.array_equal(index.bbox(*box), expected)
+
+def test_radius_matches_brute_force_nearest_first(points):
+    index = SpatialIndex(*points)
+    for meters in [50, 800, 5000]:
+        found = index.radius(40.75, -73.95, meters)
+        valid, distance = brute_distances(index, 40.75, -73.95)
+        assert set(found) == set(valid[distance <= meters])
+        assert np.all(np.diff(index.distances(found, 40.75, -73.95)) >= 0)
+
+@pytest.mark.parametrize('where', [(40.75, -73.95), (40.2, -74.6)])
+def test_nearest_matches_brute_force(points, where):
+    index = SpatialIndex(*points)
+    valid, distance = brute_distances(index, *where)
+    for k in [1, 10, 100]:
+        found = index.nearest(*where, k=k)
+        assert len(found) == k
+        assert np.allclose(index.distances(found, *where), np.sort(distance)[:k])
+
+def test_no_coordinates():
+    index = SpatialIndex([np.nan], [np.nan])
+    assert len(index.bbox(40, -75, 41, -73)) == 0
+    assert len(index.nearest(40.7, -73.9)) == 0
+    assert index.radius(40.7, -73.9, 10 * METERS_PER_DEGREE_LAT).tolist() == []
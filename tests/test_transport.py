@@ -0,0 +1,73 @@
+import time
+import pytest
+import requests
+import utils.cache_manager as cache_manager
+from utils import transport
+from utils.ingest import page_params, probe_dataset, read_page, refresh_snapshot
+from utils.snapshots import read_manifest
+from tests.conftest import TEST_PAGE_SIZE
+
+def fail_first(soda, statuses):
+    """Fail the server's next requests with these statuses, then answer normally"""
+    failures = iter(statuses)
+    soda.fail_next = lambda: next(failures, None)
+
+@pytest.fixture
+def session():
+    # Same retry policy as the app's session, without the waits between attempts
+    return transport.new_session(retries=2, backoff=0, jitter=0)
+
+def test_retries_503_until_success(soda, session):
+    fail_first(soda, [503, 503])
+    response = transport.get(soda.url, page_params(0, 10), session=session)
+
+    assert response.status_code == 200
+    assert [request['failure'] for request in soda.requests] == [503, 503, None]
+
+def test_gives_up_after_retries(soda, session):
+    fail_first(soda, [503, 503, 503])
+    with pytest.raises(requests.HTTPError, match='503'):
+        transport.get(soda.url, page_params(0, 10), session=session)
+    assert len(soda.requests) == 3
+
+def test_429_waits_for_retry_after(soda, session):
+    # Injected 429s ask for Retry-After: 1
+    fail_first(soda, [429])
+    started = time.monotonic()
+    response = transport.get(soda.url, page_params(0, 10), session=session)
+
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 1
+    assert len(soda.requests) == 2
+
+def test_gzip_bodies_are_decoded(soda):
+    response = transport.get(soda.url, page_params(0, 500))
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    page = read_page(soda.url, page_params(0, 500))
+    assert len(page) == 500
+    assert list(page.columns) == page_params(0, 500)['$select'].split(',')
+
+def test_unchanged_dataset_is_revalidated_with_304(cache_dir, soda, monkeypatch):
+    published, outcome = refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    assert outcome == 'refreshed' and published['validators']
+
+    unchanged, validators = probe_dataset(soda.url, published['validators'])
+    assert unchanged and validators == published['validators']
+
+    # Past the soft TTL the next refresh costs one conditional request
+    monkeypatch.setattr(cache_manager, 'SOFT_TTL', 0)
+    requests_before = len(soda.requests)
+    manifest, outcome = refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE)
+
+    assert outcome == 'unchanged'
+    assert manifest['version'] == published['version']
+    assert read_manifest()['validated']
+    assert len(soda.requests) == requests_before + 1
+
+def test_changed_dataset_is_fetched_again(cache_dir, soda, raw_rows):
+    published, _ = refresh_snapshot(soda.url, page_size=TEST_PAGE_SIZE, delta=False, force=True)
+    soda.update(raw_rows.iloc[:-100])
+
+    unchanged, validators = probe_dataset(soda.url, published['validators'])
+    assert not unchanged and validators != published['validators']
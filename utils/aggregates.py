@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+import pandas as pd
+from utils.cache_manager import CACHE_DIR, write_atomic
+from utils.ingest import API_URL, BASE_WHERE, read_page, soql_timestamp
+from utils.metrics import ALL_AREAS, violation_day_counts
+from utils.soql import aggregate_query, contains_any
+from utils.violations import VIOLATION_CATEGORIES
+
+# Count-only panels answered by the API with $group queries: a few hundred
+# bytes per query instead of the rows behind them. Results are kept on disk
+# with their fetch time and refreshed on their own TTL, independent of the
+# snapshot; nothing here may import streamlit.
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_DIR = os.path.join(CACHE_DIR, "aggregates")
+# Seconds a stored aggregate is served before it is refetched in the background
+AGGREGATE_TTL = float(os.environ.get("NYC_AGGREGATE_TTL", 6 * 60 * 60))
+# Minimum gap between attempts for one query, so a failing API isn't hammered
+AGGREGATE_RETRY_INTERVAL = 60
+PEST_WINDOW_DAYS = 365
+# Ingest drops rows without coordinates, so the API counts leave them out too
+# and agree with the counts made from the snapshot
+LOCATED_WHERE = 'latitude IS NOT NULL AND longitude IS NOT NULL'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def window_start(days, now=None):
+    """Start of the trailing window, at midnight so the query is stable for a day"""
+    now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+    return now.normalize() - pd.Timedelta(days=days)
+
+def pest_queries(days=PEST_WINDOW_DAYS, now=None, categories=VIOLATION_CATEGORIES):
+    """Category -> query counting its violation rows per borough over the trailing window"""
+    where = f"{BASE_WHERE} AND {LOCATED_WHERE} AND inspection_date >= '{soql_timestamp(window_start(days, now))}'"
+    return {
+        category: aggregate_query(['boro'], f"{where} AND {contains_any('violation_description', keywords)}")
+        for category, keywords in categories.items()
+    }
+
+def pest_counts(cache=None, area=ALL_AREAS, days=PEST_WINDOW_DAYS, now=None, categories=VIOLATION_CATEGORIES):
+    """Category -> violation rows in area over the window from the API, or None until all are cached"""
+    cache = get_aggregate_cache() if cache is None else cache
+    tables = {
+        category: cache.get(f"pests-{category}", params)
+        for category, params in pest_queries(days, now, categories).items()
+    }
+    if any(table is None for table in tables.values()):
+        return None
+    counts = {}
+    for category, table in tables.items():
+        if table.empty:
+            counts[category] = 0
+            continue
+        rows = table if area == ALL_AREAS else table[table['boro'] == area]
+        counts[category] = int(rows['count'].sum())
+    return counts
+
+def local_pest_counts(table, area=ALL_AREAS, days=PEST_WINDOW_DAYS, now=None, categories=VIOLATION_CATEGORIES):
+    """The same counts as pest_counts, from a snapshot's violation_days table"""
+    return violation_day_counts(table, window_start(days, now), area, categories)
+
+class AggregateCache:
+    """Small API query results on disk, served immediately and refreshed in the background
+
+    get() never waits on the network: it returns whatever is stored, even past
+    the TTL, and queues a refetch when that result is missing, expired or was
+    made with other parameters.
+    """
+
+    def __init__(self, url=API_URL, ttl=AGGREGATE_TTL, directory=AGGREGATE_DIR, fetch=read_page):
+        self.url = url
+        self.ttl = ttl
+        self.directory = directory
+        self._fetch = fetch
+        self._entries = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.errors = 0
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name.replace('/', '-')}.json")
+
+    def get(self, name, params):
+        """Stored result for name as a DataFrame, or None until one has been fetched"""
+        entry = self._entries.get(name) or self._load(name)
+        if entry is None or self._expired(entry, params):
+            self.refresh_in_background(name, params)
+        return None if entry is None else entry['table']
+
+    def _expired(self, entry, params):
+        return entry['params'] != params or entry['url'] != self.url or time.time() - entry['fetched'] > self.ttl
+
+    def _load(self, name):
+        try:
+            with open(self.path(name)) as f:
+                stored = json.load(f)
+            entry = {
+                'url': stored['url'],
+                'params': stored['params'],
+                'fetched': datetime.fromisoformat(stored['fetched']).timestamp(),
+                'table': pd.DataFrame(stored['rows']),
+            }
+        except (OSError, ValueError, KeyError):
+            return None
+        self._entries[name] = entry
+        return entry
+
+    def refresh(self, name, params):
+        """Fetch and store one result now, raising on failure"""
+        table = self._fetch(self.url, params)
+        fetched = datetime.now()
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(self.path(name), json.dumps({
+            'url': self.url,
+            'params': params,
+            'fetched': fetched.isoformat(),
+            'rows': json.loads(table.to_json(orient='records')),
+        }))
+        self._entries[name] = {'url': self.url, 'params': params, 'fetched': fetched.timestamp(), 'table': table}
+        return table
+
+    def refresh_in_background(self, name, params):
+        with self._lock:
+            now = time.monotonic()
+            last = self._attempts.get(name)
+            if last is not None and now - last < AGGREGATE_RETRY_INTERVAL:
+                return
+            self._attempts[name] = now
+        threading.Thread(target=self._refresh, args=(name, params), daemon=True).start()
+
+    def _refresh(self, name, params):
+        try:
+            self.refresh(name, params)
+            self.fetches += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Aggregate %s not refreshed: %s", name, e)
+
+    def stats(self):
+        now = time.time()
+        return {
+            'ttl': self.ttl,
+            'fetches': self.fetches,
+            'errors': self.errors,
+            'ages': {name: now - entry['fetched'] for name, entry in self._entries.items()},
+        }
+
+def get_aggregate_cache():
+    """The process-wide aggregate cache, created on first use"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AggregateCache()
+    return _cache
@@ -1,19 +1,62 @@
 import os
 import json
-from datetime import datetime, timedelta
+import socket
+import tempfile
+from datetime import datetime
+import numpy as np
 import pandas as pd
+from utils.instrumentation import span
 
-CACHE_DIR = "cache"
+try:
+    import pyarrow  # noqa: F401  (parquet engine, installed with streamlit)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Every process pointed at the same directory shares its data, lock and metadata
+CACHE_DIR = os.environ.get("NYC_CACHE_DIR", "cache")
 CACHE_FILE = os.path.join(CACHE_DIR, "restaurant_data.csv")
+PARQUET_CACHE_FILE = os.path.join(CACHE_DIR, "restaurant_data.parquet")
 CACHE_META_FILE = os.path.join(CACHE_DIR, "cache_metadata.json")
+LOCK_FILE = os.path.join(CACHE_DIR, "refresh.lock")
+# Written by whichever process refreshes; kept out of the cache metadata so
+# refreshes never touch files that ship with the repo
+REFRESH_STATUS_FILE = os.path.join(CACHE_DIR, "refresh_status.json")
+
+# Younger than the soft TTL is fresh; up to the hard TTL it is served while
+# one background refresh runs; past the hard TTL it is served flagged as expired
+SOFT_TTL = float(os.environ.get("NYC_CACHE_SOFT_TTL", 24 * 60 * 60))
+HARD_TTL = float(os.environ.get("NYC_CACHE_HARD_TTL", 7 * 24 * 60 * 60))
+
+# "parquet" (typed, columnar) or "csv" (fallback when pyarrow is unavailable)
+CACHE_FORMAT = os.environ.get("NYC_CACHE_FORMAT", "parquet")
+
+# Repetitive text columns stored as categoricals: small integer codes plus one
+# copy of each distinct string. Violations repeat a few hundred long texts, and
+# a restaurant's name and address repeat on every one of its inspection rows.
+CATEGORICAL_COLUMNS = [
+    'boro', 'grade', 'cuisine_description', 'critical_flag', 'action', 'violation_code', 'violation_description',
+    'inspection_type', 'dba', 'building', 'street', 'zipcode', 'phone', 'grade_date', 'record_date'
+]
+
+# Integer columns narrowed when every value fits; years with gaps stay float
+NARROW_INTEGERS = {'camis': 'int32', 'year': 'int16'}
+# Coordinates to ~0.5 m are plenty for maps and radius searches
+NARROW_FLOATS = {'score': 'float32', 'latitude': 'float32', 'longitude': 'float32'}
 
 def ensure_cache_dir():
     """Ensure cache directory exists"""
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
+    # Several processes may create it at once
+    os.makedirs(CACHE_DIR, exist_ok=True)
 
 def is_cache_valid():
-    """Check if cached data is still valid (less than 24 hours old)"""
+    """Check if cached data is still fresh (younger than the soft TTL)"""
     if not os.path.exists(CACHE_META_FILE):
         return False
 
@@ -22,43 +65,395 @@ def is_cache_valid():
             metadata = json.load(f)
 
         last_updated = datetime.fromisoformat(metadata['last_updated'])
-        return datetime.now() - last_updated < timedelta(hours=24)
+        return cache_state((datetime.now() - last_updated).total_seconds()) == "fresh"
     except Exception:
         return False
 
+def cache_state(age, soft_ttl=None, hard_ttl=None):
+    """'fresh', 'stale' (serve and revalidate) or 'expired' for data `age` seconds old"""
+    soft_ttl = SOFT_TTL if soft_ttl is None else soft_ttl
+    hard_ttl = HARD_TTL if hard_ttl is None else hard_ttl
+    if age >= hard_ttl:
+        return "expired"
+    if age >= soft_ttl:
+        return "stale"
+    return "fresh"
+
+class RefreshLock:
+    """Non-blocking exclusive lock shared by every process using the cache directory
+
+    Check .acquired after entering. The OS releases the lock when its holder
+    exits, so a crashed refresh never leaves it stuck. Locks on network
+    filesystems are only as reliable as the filesystem's own locking. The
+    holder writes its host and pid into the lock file, so refresh_in_progress
+    can tell whether it is held without trying to take it.
+    """
+
+    def __init__(self, path=None):
+        self.path = LOCK_FILE if path is None else path
+        self.acquired = False
+        self._file = None
+
+    def __enter__(self):
+        ensure_cache_dir()
+        self._file = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            self.acquired = True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return self
+        self._record_holder({'host': socket.gethostname(), 'pid': os.getpid(), 'acquired': datetime.now().isoformat()})
+        return self
+
+    def _record_holder(self, holder):
+        # Opened for appending, so writes land at the (truncated) end
+        self._file.seek(0)
+        self._file.truncate()
+        if holder is not None:
+            self._file.write(json.dumps(holder))
+        self._file.flush()
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            self._record_holder(None)
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self.acquired = False
+        return False
+
+def refresh_in_progress():
+    """True while some process holds the refresh lock
+
+    Reads the holder recorded in the lock file rather than taking the lock,
+    so polling the refresh status never makes a refresh starting at that
+    moment find the lock busy. A holder on this host that has exited (a
+    crashed refresh leaves its record behind) doesn't count; one on another
+    host can't be checked and is taken at its word.
+    """
+    try:
+        with open(LOCK_FILE) as f:
+            holder = json.loads(f.read() or 'null')
+    except FileNotFoundError:
+        return False
+    except OSError:
+        # Windows locks are mandatory: only a held lock makes the file unreadable
+        return True
+    except ValueError:
+        return False
+    if not isinstance(holder, dict):
+        return False
+    if holder.get('host') != socket.gethostname() or fcntl is None:
+        return True
+    return process_alive(holder.get('pid'))
+
+def process_alive(pid):
+    """Whether a process with this pid exists on this host (POSIX only)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+def write_atomic(path, text):
+    """Replace path with text so readers see the old or new contents, never a mix"""
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+    replace_file(path, write)
+
+def update_refresh_status(status, **fields):
+    """Record the refresh state in the refresh status file
+
+    Only the refresh lock holder calls this, so the read-modify-write is not racy.
+    """
+    ensure_cache_dir()
+    refresh = read_refresh_status()
+    refresh.update(fields, status=status, updated=datetime.now().isoformat(), host=socket.gethostname(), pid=os.getpid())
+    write_atomic(REFRESH_STATUS_FILE, json.dumps(refresh))
+
+def read_refresh_status():
+    """The refresh state as last written, or {} before the first refresh"""
+    try:
+        with open(REFRESH_STATUS_FILE) as f:
+            refresh = json.load(f)
+    except Exception:
+        return {}
+    return refresh if isinstance(refresh, dict) else {}
+
+def get_refresh_status():
+    """The recorded refresh state; a 'refreshing' whose holder has exited reads as 'interrupted'"""
+    refresh = read_refresh_status()
+    if refresh.get('status') == "refreshing" and not refresh_in_progress():
+        refresh['status'] = "interrupted"
+    return refresh
+
+def get_cache_format():
+    """Resolve the configured cache format, falling back to CSV without pyarrow"""
+    if CACHE_FORMAT == "parquet" and HAS_PYARROW:
+        return "parquet"
+    return "csv"
+
+def apply_cache_dtypes(df):
+    """Coerce columns to the compact cache schema (datetime dates, narrow numbers, categoricals)"""
+    if 'inspection_date' in df.columns:
+        df['inspection_date'] = pd.to_datetime(df['inspection_date'], errors='coerce')
+    for column, dtype in NARROW_FLOATS.items():
+        if column in df.columns and df[column].dtype != dtype:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+    for column, dtype in NARROW_INTEGERS.items():
+        if column in df.columns and df[column].dtype != dtype:
+            values = pd.to_numeric(df[column], errors='coerce')
+            limits = np.iinfo(dtype)
+            if values.notna().all() and (not len(values) or limits.min <= values.min() <= values.max() <= limits.max):
+                values = values.astype(dtype)
+            df[column] = values
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+def memory_report(df):
+    """Bytes held by each column, largest first
+
+    Counts string contents (deep), and for categoricals splits out the
+    lookup table of distinct values from the per-row codes.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    lookup = pd.Series({
+        column: int(df[column].cat.categories.memory_usage(deep=True))
+        if isinstance(df[column].dtype, pd.CategoricalDtype) else 0
+        for column in df.columns
+    }, dtype='int64')
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'bytes': usage,
+        'lookup_bytes': lookup,
+        'bytes_per_row': usage / max(len(df), 1),
+        'share': usage / max(usage.sum(), 1),
+    })
+    return report.rename_axis('column').sort_values('bytes', ascending=False)
+
 def save_to_cache(df):
     """Save DataFrame to cache with metadata"""
     ensure_cache_dir()
 
     # Save the DataFrame
-    df.to_csv(CACHE_FILE, index=False)
+    cache_format = write_frame(df, PARQUET_CACHE_FILE, CACHE_FILE)
 
     # Save metadata
     metadata = {
         'last_updated': datetime.now().isoformat(),
+        'format': cache_format,
         'record_count': len(df),
-        'unique_restaurants': len(df['camis'].unique())
+        'unique_restaurants': len(df['camis'].unique()),
+        'watermark': compute_watermark(df)
     }
 
-    with open(CACHE_META_FILE, 'w') as f:
-        json.dump(metadata, f)
+    write_atomic(CACHE_META_FILE, json.dumps(metadata))
+
+def write_frame(df, parquet_path, csv_path):
+    """Write df as parquet when possible, else as CSV; returns the format written
 
-def load_from_cache():
-    """Load DataFrame from cache if it exists"""
-    if not os.path.exists(CACHE_FILE):
+    Each file is written beside its target and renamed over it, so concurrent
+    writers never interleave and readers never see a partial file.
+    """
+    cache_format = get_cache_format()
+    if cache_format == "parquet":
+        try:
+            with span('cache.save.parquet', rows=len(df)):
+                replace_file(parquet_path, lambda tmp_path: apply_cache_dtypes(df.copy()).to_parquet(
+                    tmp_path, index=False, compression='zstd'
+                ))
+        except Exception:
+            # Mixed-type object columns can't be written as parquet; keep the CSV path
+            cache_format = "csv"
+    if cache_format == "csv":
+        with span('cache.save.csv', rows=len(df)):
+            replace_file(csv_path, lambda tmp_path: df.to_csv(tmp_path, index=False))
+    return cache_format
+
+class FrameWriter:
+    """Append DataFrame chunks to one file, parquet when possible, else CSV
+
+    The parquet schema is fixed by the first chunk (categoricals widened so
+    later chunks with more categories still fit). If a later chunk can't be
+    cast to it, what was written moves over to CSV and writing carries on
+    there. close() returns the format written.
+    """
+
+    def __init__(self, parquet_path, csv_path):
+        self.parquet_path = parquet_path
+        self.csv_path = csv_path
+        self.format = get_cache_format()
+        self._writer = None
+        self._schema = None
+        self._csv_header = True
+
+    def write(self, df):
+        if self.format == "parquet":
+            try:
+                with span('cache.save.parquet', rows=len(df)):
+                    self._write_parquet(df)
+            except Exception:
+                self._fall_back_to_csv()
+        if self.format == "csv":
+            with span('cache.save.csv', rows=len(df)):
+                self._write_csv(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.format
+
+    def abort(self):
+        self.close()
+        for path in (self.parquet_path, self.csv_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(apply_cache_dtypes(df.copy()), preserve_index=False)
+        if self._writer is None:
+            self._schema = pa.schema([widen_field(field) for field in table.schema], metadata=table.schema.metadata)
+            self._writer = pq.ParquetWriter(self.parquet_path, self._schema, compression='zstd')
+        self._writer.write_table(table.cast(self._schema))
+
+    def _write_csv(self, df):
+        df.to_csv(self.csv_path, mode='a', header=self._csv_header, index=False)
+        self._csv_header = False
+
+    def _fall_back_to_csv(self):
+        self.format = "csv"
+        if self._writer is None:
+            return
+        import pyarrow.parquet as pq
+
+        self.close()
+        for batch in pq.ParquetFile(self.parquet_path).iter_batches():
+            self._write_csv(batch.to_pandas())
+        os.unlink(self.parquet_path)
+
+def widen_field(field):
+    """Parquet schema field loose enough for every chunk: int32 dictionary indices, text for all-null columns"""
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(field.type):
+        value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+        return field.with_type(pa.dictionary(pa.int32(), value_type))
+    if pa.types.is_null(field.type):
+        return field.with_type(pa.string())
+    return field
+
+def replace_file(path, write):
+    """Call write(tmp_path) for a temp file next to path, then rename it over path"""
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path) or ".")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp files are owner-only; give the result the usual permissions
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def compute_watermark(df):
+    """High-water mark for delta sync: newest inspection_date and the camis seen at it"""
+    dates = pd.to_datetime(df['inspection_date'], errors='coerce')
+    if dates.isna().all():
+        return None
+
+    latest = dates.max()
+    return {
+        'inspection_date': latest.isoformat(),
+        'camis': sorted(df.loc[dates == latest, 'camis'].astype(str).unique().tolist())
+    }
+
+def merge_watermarks(a, b):
+    """Watermark covering the rows of both (either may be None)"""
+    if a is None or b is None:
+        return a or b
+    if a['inspection_date'] != b['inspection_date']:
+        return max(a, b, key=lambda mark: pd.Timestamp(mark['inspection_date']))
+    return {'inspection_date': a['inspection_date'], 'camis': sorted(set(a['camis']) | set(b['camis']))}
+
+def get_watermark():
+    """Return (inspection_date, camis set) from cache metadata, or None"""
+    metadata = get_cache_metadata()
+    if not metadata or not metadata.get('watermark'):
+        return None
+
+    try:
+        watermark = metadata['watermark']
+        return pd.Timestamp(watermark['inspection_date']), set(watermark['camis'])
+    except Exception:
+        return None
+
+def load_from_cache(columns=None):
+    """Load DataFrame from cache if it exists, optionally only the given columns"""
+    metadata = get_cache_metadata() or {}
+
+    # Read the format the cache was written in; older caches are CSV
+    if metadata.get('format', 'csv') == "parquet" and HAS_PYARROW:
+        df = load_parquet_cache(columns)
+        if df is not None:
+            return df
+
+    return load_csv_cache(columns)
+
+def load_parquet_cache(columns=None, path=None):
+    """Load the typed parquet cache; dtypes round-trip, older files are narrowed on load"""
+    path = PARQUET_CACHE_FILE if path is None else path
+    if not os.path.exists(path):
         return None
 
     try:
-        df = pd.read_csv(CACHE_FILE)
+        with span('cache.load.parquet') as stage:
+            df = pd.read_parquet(path, columns=columns)
+            stage.rows = len(df)
 
-        # Convert date columns back to datetime
-        df['inspection_date'] = pd.to_datetime(df['inspection_date'])
+            # Files written before a column joined the compact schema still load compact
+            return apply_cache_dtypes(df)
+    except Exception:
+        return None
+
+def load_csv_cache(columns=None, path=None):
+    """Load the CSV cache and restore the typed schema"""
+    path = CACHE_FILE if path is None else path
+    if not os.path.exists(path):
+        return None
 
-        # Ensure numeric columns are properly typed
-        df['score'] = pd.to_numeric(df['score'], errors='coerce')
-        df['year'] = pd.to_numeric(df['year'], errors='coerce')
+    try:
+        with span('cache.load.csv') as stage:
+            # Text columns read as text, so a file where a column is all blank
+            # or all digits ('0' boroughs) gets the same categories as any other
+            df = pd.read_csv(path, usecols=columns, dtype={column: str for column in CATEGORICAL_COLUMNS})
+            stage.rows = len(df)
 
-        return df
+            # Convert dates, numerics and categoricals back to their cached types
+            return apply_cache_dtypes(df)
     except Exception:
         return None
 
@@ -0,0 +1,292 @@
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.history import InspectionHistory
+from utils.cache_manager import get_refresh_status
+from utils.ingest import build_artifacts, refresh_snapshot
+from utils.instrumentation import span
+from utils.metrics import violation_days
+from utils.search_index import SearchEngine
+from utils.snapshots import load_snapshot, load_summary, read_manifest, snapshot_age, snapshot_state
+
+# How often sessions may check for a newer published snapshot
+STALE_CHECK_INTERVAL = 60
+
+# Whether the app revalidates stale snapshots itself on a background thread
+# (the default, as the deployment has no separate worker). Across processes
+# the refresh lock lets only one of them ingest at a time.
+INGEST_IN_APP = os.environ.get("NYC_INGEST_IN_APP", "1") != "0"
+# Minimum gap between in-app ingest attempts, so a failing API isn't hammered
+INGEST_RETRY_INTERVAL = 60
+
+# Sessions not seen for this long drop out of the per-session memory figure
+SESSION_TTL = 30 * 60
+
+# One published dataset and everything derived from it
+Snapshot = namedtuple(
+    'Snapshot', ['data', 'version', 'dataset_bytes', 'search_index', 'metrics', 'history', 'spatial_index', 'manifest']
+)
+# The citywide figures of a published dataset, enough for the landing page without any rows
+Summary = namedtuple('Summary', ['version', 'metrics', 'violation_days', 'manifest'])
+
+class DataStore:
+    """Process-wide, read-only restaurant dataset shared by every session
+
+    Only reads published snapshots. Fetching happens in the ingest worker, or
+    on a background thread here, so no session ever waits on it. Pages render
+    from summary(); the rows and their indexes load on the first snapshot()
+    call, when a session actually needs them, and a search scoped to some
+    boroughs reads only their partitions through borough_snapshot().
+    """
+
+    def __init__(self, loader=load_snapshot, ingest=refresh_snapshot, ingest_in_app=INGEST_IN_APP,
+                 summary_loader=load_summary):
+        self._loader = loader
+        self._summary_loader = summary_loader
+        self._ingest = ingest
+        self._ingest_in_app = ingest_in_app
+        self._load_lock = threading.Lock()
+        # Separate locks, so first paint never waits behind a rows or partition load
+        self._summary_lock = threading.Lock()
+        self._partition_lock = threading.Lock()
+        self._refresh_thread = None
+        self._last_stale_check = 0.0
+        self._last_ingest = None
+
+        # Swapped as one tuple so readers never pair data with another version's index
+        self._snapshot = Snapshot(None, None, 0, None, None, None, None, None)
+        self._summary = None
+        # (version, boroughs) -> Snapshot of just those boroughs, until the citywide rows load
+        self._partitions = {}
+        self._session_bytes = {}
+
+    @property
+    def version(self):
+        """Version sessions are shown: the summary's, or the rows' for snapshots without one"""
+        summary = self._summary
+        return summary.version if summary is not None else self._snapshot.version
+
+    @property
+    def rows_loaded(self):
+        return self._snapshot.data is not None
+
+    def summary(self):
+        """Return the current Summary, or None until a snapshot has been published
+
+        Reads one small file, so first paint takes the same time however many
+        rows the snapshot holds.
+        """
+        if self._summary is None:
+            with self._summary_lock:
+                if self._summary is None:
+                    with span('store.summary'):
+                        self._summary = self._load_summary()
+            if self._summary is None:
+                # Nothing published yet (this starts the ingest), or a snapshot
+                # from before summaries existed, which is summarised from its rows
+                self.snapshot()
+        else:
+            self.refresh_if_stale()
+        return self._summary
+
+    def _load_summary(self):
+        published = self._summary_loader()
+        if published is None:
+            return None
+        return Summary(published.manifest['version'], published.metrics, published.violation_days, published.manifest)
+
+    def _set_summary(self, summary):
+        # Never step back to an older version than sessions have already seen
+        if summary is not None and (self._summary is None or summary.version > self._summary.version):
+            self._summary = summary
+
+    def snapshot(self):
+        """Return the current Snapshot; data is None until a snapshot has been published"""
+        if self._snapshot.data is None:
+            with self._load_lock:
+                # Another session may have finished the load while we waited
+                if self._snapshot.data is None:
+                    with span('store.load'):
+                        self._swap(self._loader())
+            if self._snapshot.data is None and self._ingest_in_app:
+                self.refresh_in_background(ingest=True)
+        else:
+            self.refresh_if_stale()
+        return self._snapshot
+
+    def borough_snapshot(self, boroughs):
+        """Snapshot of the given boroughs' rows with their own search index
+
+        Reads only those boroughs' partitions of the version sessions are
+        shown. Once the citywide rows are loaded they are returned instead, as
+        a search's boro: filter narrows them just as well. metrics and
+        spatial_index are None.
+        """
+        if self.rows_loaded:
+            return self.snapshot()
+        version = self.version
+        key = (version, tuple(sorted(boroughs)))
+        snapshot = self._partitions.get(key)
+        if snapshot is None:
+            with self._partition_lock:
+                snapshot = self._partitions.get(key)
+                if snapshot is None:
+                    with span('store.partitions'):
+                        snapshot = self._partial(self._loader(version, artifacts=False, boroughs=list(key[1])))
+                    # Partitions of older versions are no longer shown
+                    self._partitions = {
+                        loaded: partial for loaded, partial in self._partitions.items() if loaded[0] == version
+                    }
+                    if snapshot.data is not None:
+                        self._partitions[key] = snapshot
+        self.refresh_if_stale()
+        return snapshot
+
+    def _partial(self, published):
+        if published is None:
+            return Snapshot(None, None, 0, None, None, None, None, None)
+        with span('history.build', rows=len(published.rows)):
+            history = InspectionHistory(published.rows)
+        with span('history.latest', rows=len(history)):
+            data = history.latest()
+        with span('index.search', rows=len(data)):
+            search_index = SearchEngine(data)
+        dataset_bytes = int(history.rows.memory_usage(deep=True).sum() + data.memory_usage(deep=True).sum())
+        return Snapshot(
+            data, published.manifest['version'], dataset_bytes, search_index, None, history, None, published.manifest
+        )
+
+    def get(self):
+        """Return the shared DataFrame, or None before the first publish"""
+        return self.snapshot().data
+
+    def refresh_if_stale(self):
+        """Pick up a newer published snapshot, or revalidate a stale one in the background"""
+        now = time.monotonic()
+        if now - self._last_stale_check < STALE_CHECK_INTERVAL:
+            return
+        self._last_stale_check = now
+
+        manifest = read_manifest()
+        if manifest is None:
+            return
+        # Revalidated without a new version: keep serving it, with the new age
+        version, validated = manifest['version'], manifest.get('validated')
+        summary, snapshot = self._summary, self._snapshot
+        if summary is not None and version == summary.version and validated != summary.manifest.get('validated'):
+            self._summary = summary._replace(manifest=manifest)
+        if version == snapshot.version and validated != snapshot.manifest.get('validated'):
+            self._snapshot = snapshot._replace(manifest=manifest)
+
+        if version != self.version or (self.rows_loaded and snapshot.version != self.version):
+            self.refresh_in_background()
+        elif self._ingest_in_app and snapshot_state(manifest) != "fresh":
+            self.refresh_in_background(ingest=True)
+
+    def refresh_in_background(self, ingest=False):
+        """Load the published snapshot (ingesting a new one first if asked) on a worker thread"""
+        with self._load_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            if ingest:
+                now = time.monotonic()
+                if self._last_ingest is not None and now - self._last_ingest < INGEST_RETRY_INTERVAL:
+                    return
+                self._last_ingest = now
+            self._refresh_thread = threading.Thread(target=self._refresh, args=(ingest,), daemon=True)
+            self._refresh_thread.start()
+
+    def _refresh(self, ingest=False):
+        try:
+            if ingest:
+                self._ingest()
+            with span('store.refresh'):
+                summary = self._load_summary()
+            self._set_summary(summary)
+            # Rows are reloaded only in processes where a session has needed them
+            if summary is not None and not self.rows_loaded:
+                return
+            with span('store.refresh'):
+                published = self._loader()
+        except Exception:
+            return
+        self._swap(published)
+
+    def _swap(self, published):
+        if published is None or published.manifest['version'] == self._snapshot.version:
+            return
+        with span('history.build', rows=len(published.rows)):
+            history = InspectionHistory(published.rows)
+        if not len(history):
+            return
+        # Sessions read the latest-per-restaurant view; timelines come from the history
+        with span('history.latest', rows=len(history)):
+            data = history.latest()
+        dataset_bytes = int(history.rows.memory_usage(deep=True).sum() + data.memory_usage(deep=True).sum())
+        version = published.manifest['version']
+
+        # Indexes come prebuilt with the snapshot unless it predates the artifact format
+        artifacts = published.artifacts
+        if artifacts is None or artifacts['search_index'].size != len(data):
+            artifacts = build_artifacts(data, version)
+        self._snapshot = Snapshot(
+            data, version, dataset_bytes,
+            artifacts['search_index'], artifacts['metrics'], history, artifacts['spatial_index'],
+            published.manifest
+        )
+        # Every borough's rows are now in memory citywide
+        self._partitions = {}
+        if self._summary is None or self._summary.version < version:
+            # Published without a summary file; the rows give the same figures
+            with span('summary.violations', rows=len(history)):
+                self._set_summary(Summary(version, artifacts['metrics'], violation_days(history.rows), published.manifest))
+
+    def track_session(self, session_state):
+        """Record how much memory one session holds on top of the shared dataset"""
+        ctx = get_script_run_ctx()
+        if ctx is None:
+            return
+        nbytes = sum(value_nbytes(session_state[key]) for key in list(session_state.keys()))
+        self._session_bytes[ctx.session_id] = (nbytes, time.monotonic())
+
+    def stats(self):
+        """Memory figures for the shared dataset and its sessions, plus snapshot freshness"""
+        summary = self._summary
+        version, dataset_bytes = self.version, self._snapshot.dataset_bytes
+        manifest = summary.manifest if summary is not None else self._snapshot.manifest
+
+        cutoff = time.monotonic() - SESSION_TTL
+        for session_id, (_, last_seen) in list(self._session_bytes.items()):
+            if last_seen < cutoff:
+                self._session_bytes.pop(session_id, None)
+
+        session_bytes = [nbytes for nbytes, _ in self._session_bytes.values()]
+        return {
+            'version': version,
+            'rows_version': self._snapshot.version,
+            'partitions_loaded': [list(boroughs) for _, boroughs in self._partitions],
+            'dataset_bytes': dataset_bytes,
+            'sessions': len(session_bytes),
+            'bytes_per_session': sum(session_bytes) / len(session_bytes) if session_bytes else 0,
+            'snapshot_age': snapshot_age(manifest) if manifest else None,
+            'snapshot_state': snapshot_state(manifest) if manifest else None,
+            'refresh': get_refresh_status(),
+        }
+
+def value_nbytes(value):
+    """Approximate memory held by one session state value"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return sys.getsizeof(value)
+
+@st.cache_resource
+def get_data_store():
+    """The single DataStore for this process"""
+    return DataStore()
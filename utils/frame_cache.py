@@ -0,0 +1,102 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+
+# Figure payloads kept across sessions before least-recently-used ones are evicted
+FRAME_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FRAME_CACHE_MAX_ENTRIES = 256
+PREFETCH_WORKERS = 2
+
+class FrameCache:
+    """LRU cache of ready-to-render payloads with a byte cap and hit/miss counters
+
+    Keys should start with the data version, e.g. (version, borough, year), so a
+    refresh never serves a frame built from older data.
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_MAX_BYTES, max_entries=FRAME_CACHE_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="frame-prefetch")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, payload):
+        nbytes = self._size(payload)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._size(self._entries.pop(key))
+            self._entries[key] = payload
+            self._bytes += nbytes
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(evicted)
+                self.evictions += 1
+
+    @staticmethod
+    def _size(payload):
+        return len(payload) if isinstance(payload, (str, bytes)) else sys.getsizeof(payload)
+
+    def get_or_build(self, key, build):
+        """Cached payload for key, building (and caching) it on a miss"""
+        payload = self.get(key)
+        if payload is None:
+            payload = build()
+            self.put(key, payload)
+        return payload
+
+    def prefetch(self, key, build):
+        """Build key on a background thread unless it is cached or already queued"""
+        with self._lock:
+            if key in self._entries or key in self._pending:
+                return
+            self._pending.add(key)
+        self._pool.submit(self._prefetch, key, build)
+
+    def _prefetch(self, key, build):
+        try:
+            self.put(key, build())
+            with self._lock:
+                self.prefetched += 1
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'prefetched': self.prefetched,
+            }
+
+@st.cache_resource
+def get_frame_cache():
+    """The single FrameCache for this process"""
+    return FrameCache()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+class InspectionHistory:
+    """Every inspection and violation row, grouped by restaurant in date order
+
+    Rows are sorted by (camis, inspection_date). offsets[i]:offsets[i + 1] is
+    the row range of restaurant camis[i], so a timeline is a positional slice
+    of the one stored frame rather than a filtered copy.
+    """
+
+    def __init__(self, rows):
+        rows = rows.sort_values(['camis', 'inspection_date'], kind='stable').reset_index(drop=True)
+        self.rows = rows
+
+        # Start of each camis run, plus the end of the last one
+        camis = rows['camis'].to_numpy()
+        starts = np.flatnonzero(np.r_[True, camis[1:] != camis[:-1]]) if len(camis) else np.empty(0, dtype=np.int64)
+        self.camis = camis[starts]
+        self.offsets = np.append(starts, len(camis)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def restaurant_count(self):
+        return len(self.camis)
+
+    def timeline(self, camis):
+        """All rows for one restaurant, oldest first (empty if unknown)"""
+        slot = np.searchsorted(self.camis, camis)
+        if slot == len(self.camis) or self.camis[slot] != camis:
+            return self.rows.iloc[0:0]
+        return self.rows.iloc[self.offsets[slot]:self.offsets[slot + 1]]
+
+    def latest(self):
+        """One row per restaurant, its most recent inspection, newest first"""
+        if not len(self.rows):
+            return self.rows
+        latest = self.rows.iloc[self.offsets[1:] - 1]
+        return latest.sort_values('inspection_date', ascending=False, kind='stable')
+
+    def merge(self, new_rows):
+        """A new history with new_rows added"""
+        return InspectionHistory(pd.concat([self.rows, new_rows], ignore_index=True))
@@ -0,0 +1,596 @@
+import io
+import os
+import re
+import csv
+import time
+import logging
+import argparse
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from utils import transport
+from utils.cache_manager import (
+    RefreshLock,
+    apply_cache_dtypes,
+    get_watermark,
+    load_from_cache,
+    update_refresh_status
+)
+from utils.history import InspectionHistory
+from utils.instrumentation import span
+from utils.metrics import MetricsCube, merge_violation_days, violation_days
+from utils.search_index import SearchEngine
+from utils.soql import projection, select_clause
+from utils.snapshots import (
+    SnapshotWriter,
+    load_snapshot,
+    mark_validated,
+    new_version,
+    publish_snapshot,
+    read_manifest,
+    snapshot_age,
+    snapshot_state
+)
+from utils.spatial_index import SpatialIndex
+from utils.violations import classify_violations, reclassify_stale
+
+# Headless fetch, clean and publish; nothing here may import streamlit.
+# Run `python -m utils.ingest` from cron or as a long-running worker.
+
+API_URL = "https://data.cityofnewyork.us/resource/43nn-pn8j.csv"
+PAGE_SIZE = 1000
+FETCH_CONCURRENCY = 8
+BASE_WHERE = 'inspection_date IS NOT NULL'
+# Pages are $offset windows over this order, so it must be unique: rows tied
+# on the date could otherwise swap across a page boundary between requests,
+# skipping one row and repeating another. :id is the API's row identifier.
+PAGE_ORDER = 'inspection_date DESC, :id'
+# Only the columns some view reads are downloaded (see utils/soql.py)
+SELECT_COLUMNS = projection()
+# Added by clean_inspection_rows
+DERIVED_COLUMNS = ['year', 'violation_flags']
+
+# A full fetch is cleaned and written out this many rows at a time
+INGEST_BATCH_ROWS = 50000
+
+# Whether full fetches stream the one-shot bulk CSV export instead of paging
+# the API. One sequential read of a single server-side copy: no deep offsets,
+# and no rows skipped or repeated when the data changes mid-crawl.
+FULL_EXPORT = os.environ.get("NYC_INGEST_EXPORT", "0") != "0"
+# Decompressed bytes the CSV parser reads from the export stream at a time
+EXPORT_READ_BYTES = 1024 * 1024
+# Resource URL -> its bulk export, e.g. .../resource/43nn-pn8j.csv -> .../api/views/43nn-pn8j/rows.csv
+RESOURCE_URL = re.compile(r'^(?P<site>.+)/resource/(?P<id>[^/.]+)\.csv$')
+
+# Parse types fixed per column so every page has the same schema: codes that
+# look numeric stay text, and optional numbers are floats even in pages without gaps
+PAGE_DTYPES = {
+    **{column: str for column in [
+        'dba', 'boro', 'building', 'street', 'zipcode', 'phone', 'cuisine_description', 'action',
+        'violation_code', 'violation_description', 'critical_flag', 'grade', 'grade_date',
+        'record_date', 'inspection_type', 'nta'
+    ]},
+    **{column: 'float64' for column in ['community_board', 'council_district', 'census_tract', 'bin', 'bbl']},
+}
+
+logger = logging.getLogger(__name__)
+
+def run_ingest(url=API_URL, parallel=True, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY, delta=True,
+               validators=None, export=FULL_EXPORT):
+    """Fetch, clean and index the dataset, then publish it; returns the manifest or None
+
+    validators (from probe_dataset) are stored in the manifest so the next
+    refresh can revalidate the dataset with one conditional request. With
+    export, a full fetch streams the bulk export and pages only if that fails.
+    """
+    extra = {'validators': validators} if validators else None
+
+    # Only pull rows past the watermark of the last published (or legacy cached) data
+    if delta:
+        history = fetch_delta(url, page_size, concurrency)
+        if history is not None:
+            return publish_history(history, extra)
+
+    # A full fetch must bring back at least this many rows to be published
+    total = fetch_row_count(url)
+
+    if export:
+        try:
+            manifest = publish_pages(iter_export(export_url(url)), extra=extra, expected=total)
+            if manifest is not None:
+                return manifest
+        except Exception as e:
+            logger.warning("Bulk export failed, paging the API instead: %s", e)
+
+    # Otherwise stream every page, in parallel windows when the row count is known
+    if parallel:
+        try:
+            manifest = publish_pages(iter_pages_concurrently(url, page_size, concurrency, total=total), extra=extra,
+                                     expected=total)
+            if manifest is not None:
+                return manifest
+        except Exception as e:
+            logger.warning("Parallel fetch failed, retrying sequentially: %s", e)
+
+    manifest = publish_pages(iter_pages_sequentially(url, page_size), extra=extra, expected=total)
+    if manifest is None:
+        logger.error("No data received from the API")
+    return manifest
+
+def refresh_snapshot(url=API_URL, parallel=True, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY, delta=True, force=False,
+                     export=FULL_EXPORT, max_age=None):
+    """Run one ingest unless the snapshot is fresh or another process is already refreshing
+
+    Fresh means younger than max_age seconds, or than the soft TTL by default.
+
+    Holds the cross-process refresh lock for the whole ingest and records its
+    progress in the cache metadata. Returns the current manifest afterwards
+    (None if nothing is published) and the outcome: 'refreshed', 'fresh',
+    'unchanged' (the server answered 304, so the snapshot was only marked
+    revalidated), 'busy' (another process holds the lock) or 'failed'.
+    """
+    with RefreshLock() as lock:
+        if not lock.acquired:
+            logger.info("Another process is refreshing the snapshot")
+            return read_manifest(), "busy"
+
+        # It may have been published while we waited for our turn
+        manifest = read_manifest()
+        if manifest is not None and not force and snapshot_fresh(manifest, max_age):
+            return manifest, "fresh"
+
+        started = datetime.now().isoformat()
+        update_refresh_status("refreshing", started=started, error=None)
+        try:
+            # An unchanged dataset costs one 304 instead of a sync
+            known = manifest.get('validators') if manifest is not None and not force else None
+            unchanged, validators = probe_dataset(url, known)
+            if unchanged:
+                mark_validated(manifest['version'])
+                update_refresh_status(
+                    "unchanged", started=started, finished=datetime.now().isoformat(), version=manifest['version']
+                )
+                return read_manifest(), "unchanged"
+
+            published = run_ingest(url, parallel, page_size, concurrency, delta, validators, export)
+        except Exception as e:
+            logger.exception("Ingest failed")
+            update_refresh_status("failed", started=started, finished=datetime.now().isoformat(), error=str(e))
+            return manifest, "failed"
+
+        if published is None:
+            update_refresh_status(
+                "failed", started=started, finished=datetime.now().isoformat(), error="No data received from the API"
+            )
+            return manifest, "failed"
+        update_refresh_status("ok", started=started, finished=datetime.now().isoformat(), version=published['version'])
+        return published, "refreshed"
+
+def snapshot_fresh(manifest, max_age=None):
+    """Whether a snapshot is younger than max_age seconds, or than the soft TTL by default"""
+    if max_age is None:
+        return snapshot_state(manifest) == "fresh"
+    return snapshot_age(manifest) < max_age
+
+def fetch_delta(url=API_URL, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY):
+    """The published history with newer rows merged in, or None when a full fetch is needed"""
+    base = delta_base()
+    if base is None:
+        return None
+    history, watermark = base
+    with span('sync.delta'):
+        synced = sync_delta(url, history, watermark, page_size, concurrency)
+    if synced is None:
+        logger.warning("Delta sync failed, fetching the full dataset")
+    return synced
+
+def publish_pages(pages, batch_rows=INGEST_BATCH_ROWS, extra=None, expected=None):
+    """Clean and write pages into a new snapshot as they arrive, then publish it
+
+    Only the latest inspection per restaurant is held in memory, so peak memory
+    tracks that table and one batch rather than the whole history. Returns the
+    manifest, or None if no rows came through. Raises, discarding the staged
+    snapshot, when a page fails or fewer than expected raw rows arrive.
+    """
+    writer = None
+    latest = None
+    days = None
+    scores = None
+    fetched = 0
+    try:
+        for batch in batch_pages(pages, batch_rows):
+            fetched += len(batch)
+            with span('clean', rows=len(batch)):
+                rows = clean_inspection_rows(batch, fill_scores=False)
+            if rows.empty:
+                continue
+            scores = merge_score_counts(scores, rows['score'].value_counts())
+            with span('history.latest', rows=len(rows)):
+                latest = merge_latest(latest, rows)
+            with span('summary.violations', rows=len(rows)):
+                days = merge_violation_days(days, violation_days(rows))
+            if writer is None:
+                writer = SnapshotWriter()
+            with span('snapshot.write', rows=len(rows)):
+                writer.write(apply_cache_dtypes(rows))
+
+        # A short fetch would publish fine, but its watermark is the newest
+        # date, so no later delta sync would go back for the missing rows
+        if writer is not None and expected is not None and fetched < expected:
+            raise RuntimeError(f"Fetched {fetched} of {expected} rows")
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is None:
+        return None
+
+    # Same order and dtypes as InspectionHistory.latest() on the published rows
+    latest = apply_cache_dtypes(latest.sort_values('inspection_date', ascending=False, kind='stable'))
+    median = score_median(scores)
+    fill_scores(latest, median)
+    artifacts = build_artifacts(latest, writer.version)
+    summary = {'metrics': artifacts['metrics'], 'violation_days': days}
+    with span('snapshot.publish', rows=writer.record_count):
+        manifest = writer.publish(artifacts, {**(extra or {}), 'score_median': median}, summary)
+    logger.info("Published snapshot %s with %s rows", writer.version, manifest['record_count'])
+    return manifest
+
+def batch_pages(pages, batch_rows=INGEST_BATCH_ROWS):
+    """Concatenate consecutive pages into frames of at least batch_rows rows (the last may be short)"""
+    batch, size = [], 0
+    for page in pages:
+        batch.append(page)
+        size += len(page)
+        if size >= batch_rows:
+            yield pd.concat(batch, ignore_index=True)
+            batch, size = [], 0
+    if batch:
+        yield pd.concat(batch, ignore_index=True)
+
+def merge_latest(latest, rows):
+    """Latest row per camis across a running latest table and new rows, in camis order
+
+    Date ties keep the row seen last, as InspectionHistory.latest() does.
+    """
+    combined = rows if latest is None else pd.concat([latest, rows], ignore_index=True)
+    combined = combined.sort_values(['camis', 'inspection_date'], kind='stable')
+    camis = combined['camis'].to_numpy()
+    last = np.r_[camis[1:] != camis[:-1], True]
+    return combined[last].reset_index(drop=True)
+
+def merge_score_counts(counts, more):
+    """Occurrences of each score across two value_counts() tables (either may be None)"""
+    if counts is None:
+        return more
+    return counts.add(more, fill_value=0)
+
+def score_median(counts):
+    """Median score from a value_counts() table, as Series.median() gives on the rows; None without scores"""
+    if counts is None or not counts.sum():
+        return None
+    counts = counts.sort_index()
+    cumulative = counts.cumsum().to_numpy()
+    total = cumulative[-1]
+    # The middle row, or the two either side of the middle
+    middle = np.searchsorted(cumulative, [(total - 1) // 2, total // 2], side='right')
+    return float(counts.index.to_numpy(dtype=np.float64)[middle].mean())
+
+def fill_scores(rows, median):
+    """Fill missing scores with the dataset's median score, in place"""
+    if median is not None:
+        rows['score'] = rows['score'].fillna(median)
+
+def delta_base():
+    """(InspectionHistory, watermark) to sync from, or None when a full fetch is needed"""
+    # Missing scores stay missing, so the merged history can take its own median
+    published = load_snapshot(artifacts=False, fill_scores=False)
+    if published is not None and published.manifest.get('watermark'):
+        rows, mark = published.rows, published.manifest['watermark']
+        watermark = pd.Timestamp(mark['inspection_date']), set(mark['camis'])
+    else:
+        # Caches written before snapshots existed can seed the first delta sync
+        rows, watermark = load_from_cache(), get_watermark()
+        if rows is None or watermark is None:
+            return None
+        # Flat caches don't record which categories their flags were made with
+        reclassify_stale(rows, None)
+
+    # Older snapshots carry every API column; new pages only the projected ones
+    rows = rows[[column for column in rows.columns if column in SELECT_COLUMNS or column in DERIVED_COLUMNS]]
+    with span('history.build', rows=len(rows)):
+        return InspectionHistory(rows), watermark
+
+def build_artifacts(latest, version):
+    """Indexes derived from the latest-per-restaurant view, keyed as the Snapshot fields"""
+    with span('index.search', rows=len(latest)):
+        search_index = SearchEngine(latest)
+    with span('index.metrics', rows=len(latest)):
+        metrics = MetricsCube(latest, version)
+    with span('index.spatial', rows=len(latest)):
+        spatial_index = SpatialIndex(latest['latitude'], latest['longitude'])
+    return {'search_index': search_index, 'metrics': metrics, 'spatial_index': spatial_index}
+
+def publish_history(history, extra=None):
+    """Publish the history and its prebuilt indexes as the new current snapshot"""
+    # Index the frame with the dtypes readers will load, so row positions line up
+    apply_cache_dtypes(history.rows)
+    version = new_version()
+    median = history.rows['score'].median()
+    median = None if pd.isna(median) else float(median)
+    with span('history.latest', rows=len(history)):
+        latest = history.latest()
+    fill_scores(latest, median)
+    artifacts = build_artifacts(latest, version)
+    with span('summary.violations', rows=len(history)):
+        summary = {'metrics': artifacts['metrics'], 'violation_days': violation_days(history.rows)}
+    with span('snapshot.publish', rows=len(history)):
+        manifest = publish_snapshot(
+            history.rows, artifacts, version=version, extra={**(extra or {}), 'score_median': median}, summary=summary
+        )
+    logger.info("Published snapshot %s with %s rows", version, manifest['record_count'])
+    return manifest
+
+def clean_inspection_rows(df, fill_scores=True):
+    """Clean raw API rows, keeping every inspection and violation
+
+    Missing scores are filled with the median of df, unless fill_scores is
+    False: a batch's median is not the dataset's, so batched ingests keep
+    them missing and fill from score_median once every row is in.
+    """
+    df['inspection_date'] = pd.to_datetime(df['inspection_date'], errors='coerce')
+    df = df.dropna(subset=['latitude', 'longitude']).copy()  # Only drop rows missing coordinates
+
+    # Convert score to numeric, handling missing values
+    df['score'] = pd.to_numeric(df['score'], errors='coerce')
+    if fill_scores:
+        df['score'] = df['score'].fillna(df['score'].median())
+
+    # Add year column for time-lapse
+    df['year'] = df['inspection_date'].dt.year
+
+    # Fill NA values in string columns with empty strings
+    string_columns = ['dba', 'building', 'street', 'grade']
+    df[string_columns] = df[string_columns].fillna('')
+
+    # Tag each violation with its taxonomy categories once, at ingest
+    df['violation_flags'] = classify_violations(df['violation_description'])
+    return df
+
+def clean_restaurant_data(df):
+    """Clean raw API rows and keep the latest inspection for each restaurant"""
+    return InspectionHistory(clean_inspection_rows(df)).latest()
+
+def sync_delta(url, history, watermark, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY):
+    """Merge rows newer than the watermark into the cached history, or None on failure"""
+    since, boundary_camis = watermark
+
+    # >= rather than > so late additions on the boundary date are not missed
+    where = f"{BASE_WHERE} AND inspection_date >= '{soql_timestamp(since)}'"
+    total = fetch_row_count(url, where)
+    if total is None:
+        return None
+    if total == 0:
+        return history
+
+    try:
+        pages = fetch_pages_concurrently(url, page_size, concurrency, where, total=total)
+    except Exception:
+        return None
+    if not pages:
+        return None
+    fetched = sum(len(page) for page in pages)
+    if fetched < total:
+        logger.warning("Delta sync fetched %s of %s rows", fetched, total)
+        return None
+
+    new_rows = clean_inspection_rows(pd.concat(pages, ignore_index=True), fill_scores=False)
+
+    # Skip boundary rows that were already merged on the previous sync
+    seen = (new_rows['inspection_date'] == since) & new_rows['camis'].astype(str).isin(boundary_camis)
+    new_rows = new_rows[~seen]
+    if new_rows.empty:
+        return history
+
+    return history.merge(new_rows)
+
+def soql_timestamp(ts):
+    """Format a timestamp as a SoQL floating timestamp literal"""
+    return pd.Timestamp(ts).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+def page_params(offset, page_size, where=BASE_WHERE, columns=SELECT_COLUMNS):
+    """Build SODA query parameters for one page of results"""
+    return {
+        '$select': select_clause(columns),
+        '$limit': page_size,
+        '$offset': offset,
+        '$order': PAGE_ORDER,
+        '$where': where
+    }
+
+def fetch_pages_sequentially(url, page_size=PAGE_SIZE, where=BASE_WHERE, offset=0):
+    """Fetch pages one at a time until a short or empty page is returned"""
+    return list(iter_pages_sequentially(url, page_size, where, offset))
+
+def iter_pages_sequentially(url, page_size=PAGE_SIZE, where=BASE_WHERE, offset=0):
+    """Yield pages one at a time until a short or empty page is returned, raising if one fails"""
+    while True:
+        try:
+            df_page = read_page(url, page_params(offset, page_size, where))
+        except Exception as e:
+            # The transport has already retried; stopping here would look like the last page
+            logger.error("Error fetching page at offset %s: %s", offset, e)
+            raise
+
+        # If page is empty, break the loop
+        if df_page.empty:
+            break
+
+        yield df_page
+
+        # If we got less than page_size records, we've reached the end
+        if len(df_page) < page_size:
+            break
+
+        # Increment offset for next page
+        offset += page_size
+
+def fetch_pages_concurrently(url, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY, where=BASE_WHERE, total=None):
+    """Fetch all pages through a bounded thread pool, returned in offset order"""
+    return list(iter_pages_concurrently(url, page_size, concurrency, where, total))
+
+def iter_pages_concurrently(url, page_size=PAGE_SIZE, concurrency=FETCH_CONCURRENCY, where=BASE_WHERE, total=None):
+    """Yield non-empty pages in offset order, fetched through a bounded thread pool
+
+    At most two pages per worker are in flight or waiting, so pages never pile
+    up in memory when the consumer is slower than the network.
+    """
+    if total is None:
+        total = fetch_row_count(url, where)
+    if total is None:
+        return
+
+    # Plan one $offset window per page up front so workers never wait on each other
+    planned = range(0, total, page_size)
+    if not planned:
+        return
+
+    workers = max(1, concurrency)
+    offsets = iter(planned)
+    fetched, last_size = 0, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def fetch(offset):
+            return pool.submit(read_page, url, page_params(offset, page_size, where))
+
+        pending = deque(fetch(offset) for offset in islice(offsets, 2 * workers))
+        try:
+            while pending:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(fetch(offset))
+                if not page.empty:
+                    fetched, last_size = fetched + 1, len(page)
+                    yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+    # Rows added after the count was taken spill past the planned windows
+    if fetched == len(planned) and last_size == page_size:
+        yield from iter_pages_sequentially(url, page_size, where, offset=planned[-1] + page_size)
+
+def probe_dataset(url=API_URL, validators=None):
+    """(unchanged, validators) from one conditional request for the row count
+
+    unchanged is True only when the server answers 304 to the given
+    validators. Otherwise the validators describe the dataset as it is now
+    (empty when the server sends none or can't be reached), to be recorded
+    with the snapshot fetched next.
+    """
+    try:
+        with span('fetch.probe'):
+            response = transport.get(url, {'$select': 'count(*)', '$where': BASE_WHERE}, validators=validators)
+    except Exception as e:
+        logger.warning("Could not revalidate the dataset: %s", e)
+        return False, {}
+    if response.status_code == 304:
+        return True, validators
+    return False, transport.validators(response)
+
+def fetch_row_count(url, where=BASE_WHERE):
+    """Ask the API how many rows match the filter, or None if it can't say"""
+    try:
+        df = read_page(url, {'$select': 'count(*)', '$where': where})
+        return int(df.iloc[0, 0])
+    except Exception:
+        return None
+
+def read_page(url, query_params=None):
+    """Fetch and parse one CSV response, raising on any error"""
+    with span('fetch.http'):
+        response = transport.get(url, query_params)
+    with span('fetch.parse') as stage:
+        # Parse the (already decompressed) bytes; no decoded text copy
+        page = pd.read_csv(io.BytesIO(response.content), dtype=PAGE_DTYPES)
+        stage.rows = len(page)
+    return page
+
+def export_url(url):
+    """Bulk CSV export of a SODA resource URL"""
+    match = RESOURCE_URL.match(url)
+    if match is None:
+        raise ValueError(f"Not a SODA resource URL: {url}")
+    return f"{match['site']}/api/views/{match['id']}/rows.csv?accessType=DOWNLOAD"
+
+def export_column(name):
+    """API field name of an export header, e.g. 'CUISINE DESCRIPTION' -> 'cuisine_description'"""
+    return re.sub(r'\W+', '_', name.strip().lower()).strip('_')
+
+def iter_export(url, chunk_rows=INGEST_BATCH_ROWS, read_bytes=EXPORT_READ_BYTES):
+    """Yield the bulk export as frames of chunk_rows rows, shaped like API pages
+
+    The body is decompressed and parsed as it arrives, so memory holds one
+    read buffer and one chunk however large the export is. Only the projected
+    columns are kept, and rows without an inspection date are dropped as the
+    paged queries' $where does.
+    """
+    with span('fetch.http'):
+        response = transport.get(url, stream=True)
+    with response:
+        # urllib3 inflates gzip incrementally as the parser reads; it would also
+        # close itself at the end of the body, under the buffer's last read
+        response.raw.decode_content = True
+        response.raw.auto_close = False
+        body = io.BufferedReader(response.raw, buffer_size=read_bytes)
+        header = next(csv.reader([body.readline().decode('utf-8-sig')]))
+        names = [export_column(name) for name in header]
+        chunks = pd.read_csv(
+            body, header=None, names=names, usecols=lambda name: name in SELECT_COLUMNS,
+            dtype=PAGE_DTYPES, chunksize=chunk_rows
+        )
+        while True:
+            with span('fetch.parse') as stage:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                stage.rows = len(chunk)
+            # Columns in $select order, so snapshots match paged ones column for column
+            chunk = chunk[[column for column in SELECT_COLUMNS if column in chunk.columns]]
+            yield chunk.dropna(subset=['inspection_date']).reset_index(drop=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch NYC inspection data and publish a snapshot for the app")
+    parser.add_argument('--url', default=API_URL, help="SODA resource URL")
+    parser.add_argument('--full', action='store_true', help="refetch everything instead of syncing from the watermark")
+    parser.add_argument('--sequential', action='store_true', help="fetch pages one at a time")
+    parser.add_argument('--export', action='store_true', default=FULL_EXPORT,
+                        help="stream the bulk CSV export for full fetches instead of paging the API")
+    parser.add_argument('--force', action='store_true', help="ingest even when the snapshot is still fresh")
+    parser.add_argument('--max-age', type=float,
+                        help="skip when the published snapshot is younger than this many seconds (default: the soft TTL)")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="keep running, checking every this many seconds")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    while True:
+        manifest, outcome = refresh_snapshot(
+            args.url, parallel=not args.sequential, delta=not args.full, force=args.force, export=args.export,
+            max_age=args.max_age
+        )
+        if outcome == "fresh":
+            logger.info("Snapshot %s is still fresh", manifest['version'])
+        elif outcome == "unchanged":
+            logger.info("Dataset unchanged; revalidated snapshot %s", manifest['version'])
+
+        if not args.interval:
+            # Another process holding the lock is not a failure; it publishes for us
+            return 1 if outcome == "failed" else 0
+        time.sleep(args.interval)
+
+if __name__ == '__main__':
+    raise SystemExit(main())
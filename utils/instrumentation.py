@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Off unless NYC_INSTRUMENT is set; NYC_INSTRUMENT_LOG appends every span as a JSON line
+ENABLED = os.environ.get("NYC_INSTRUMENT", "") not in ("", "0")
+LOG_FILE = os.environ.get("NYC_INSTRUMENT_LOG")
+
+# Individual spans kept for export; per-stage totals are kept for every span
+MAX_SPANS = 1000
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def peak_rss():
+    """Process high-water mark resident set size in bytes, or None if unknown"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+class NullSpan:
+    """Stands in for a Span when instrumentation is off"""
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    """Wall time, rows processed and peak memory of one stage
+
+    Set span.rows inside the block when the row count is only known there.
+    Python-level allocation peaks are recorded too while tracemalloc is on.
+    """
+
+    def __init__(self, recorder, stage, rows=None):
+        self.recorder = recorder
+        self.stage = stage
+        self.rows = rows
+        self.child_peak = 0
+
+    def __enter__(self):
+        self.parent = self.recorder.current()
+        self.recorder.push(self)
+        self.rss_before = peak_rss()
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            # Resetting the peak hides the outer span's peak so far; hand it back on exit
+            self.traced_start, self.outer_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        record = {
+            'stage': self.stage,
+            'parent': self.parent.stage if self.parent is not None else None,
+            'started': time.time() - seconds,
+            'seconds': seconds,
+            'rows': self.rows,
+            'peak_rss_bytes': peak_rss(),
+            'error': exc_type.__name__ if exc_type is not None else None,
+        }
+        if self.rss_before is not None:
+            record['rss_growth_bytes'] = record['peak_rss_bytes'] - self.rss_before
+        if self.tracing and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            record['traced_peak_bytes'] = peak - self.traced_start
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, self.outer_peak, peak)
+        self.recorder.pop()
+        self.recorder.record(record)
+        return False
+
+class SpanRecorder:
+    """Per-stage totals and a bounded log of recent spans, safe across threads"""
+
+    def __init__(self, max_spans=MAX_SPANS, log_file=LOG_FILE):
+        self.spans = deque(maxlen=max_spans)
+        self.stages = {}
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current(self):
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def push(self, span):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        self._local.stack.append(span)
+
+    def pop(self):
+        self._local.stack.pop()
+
+    def record(self, record):
+        with self._lock:
+            self.spans.append(record)
+            stage = self.stages.setdefault(record['stage'], {
+                'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                'rows': 0, 'last_seconds': 0.0, 'peak_rss_bytes': 0, 'traced_peak_bytes': 0,
+            })
+            stage['calls'] += 1
+            stage['errors'] += record['error'] is not None
+            stage['seconds'] += record['seconds']
+            stage['max_seconds'] = max(stage['max_seconds'], record['seconds'])
+            stage['last_seconds'] = record['seconds']
+            stage['rows'] += record['rows'] or 0
+            stage['peak_rss_bytes'] = max(stage['peak_rss_bytes'], record['peak_rss_bytes'] or 0)
+            stage['traced_peak_bytes'] = max(stage['traced_peak_bytes'], record.get('traced_peak_bytes', 0))
+
+            if self.log_file:
+                try:
+                    with open(self.log_file, 'a') as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError:
+                    pass
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self.stages.clear()
+
+    def snapshot(self):
+        """Per-stage totals and the recent spans as plain data"""
+        with self._lock:
+            return {
+                'enabled': ENABLED,
+                'stages': {name: dict(stats) for name, stats in self.stages.items()},
+                'spans': list(self.spans),
+            }
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix='nyc_food_safety'):
+        """Per-stage totals in the Prometheus text exposition format"""
+        metrics = [
+            ('stage_calls_total', 'counter', 'Spans recorded per stage', 'calls'),
+            ('stage_errors_total', 'counter', 'Spans that raised per stage', 'errors'),
+            ('stage_seconds_total', 'counter', 'Wall time spent per stage', 'seconds'),
+            ('stage_seconds_max', 'gauge', 'Slowest span per stage', 'max_seconds'),
+            ('stage_seconds_last', 'gauge', 'Most recent span per stage', 'last_seconds'),
+            ('stage_rows_total', 'counter', 'Rows processed per stage', 'rows'),
+            ('stage_peak_rss_bytes', 'gauge', 'Process peak RSS seen at the end of a stage', 'peak_rss_bytes'),
+            ('stage_traced_peak_bytes', 'gauge', 'Peak Python allocations within a stage (tracemalloc)', 'traced_peak_bytes'),
+        ]
+        stages = self.snapshot()['stages']
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for stage, stats in sorted(stages.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{prefix}_{name}{{stage="{label}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+RECORDER = SpanRecorder()
+
+def span(stage, rows=None):
+    """Context manager timing one stage; a shared no-op when instrumentation is off"""
+    if not ENABLED:
+        return NULL_SPAN
+    return Span(RECORDER, stage, rows)
@@ -1,52 +1,120 @@
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 
-def create_heatmap(df):
-    """Create a heatmap of restaurant safety scores with neighborhood-specific scaling"""
+NYC_CENTER = dict(lat=40.7128, lon=-74.0060)
+DEFAULT_ZOOM = 10
+
+# Aggregated heatmaps: grid cells per 256px map tile, and a hard cap on cells sent
+CELLS_PER_TILE = 32
+MAX_HEATMAP_CELLS = 4000
+
+# The heatmap as laid out on the page, in pixels (height as set below, width a wide column)
+MAP_WIDTH_PX = 800
+MAP_HEIGHT_PX = 600
+TILE_PX = 256
+MAX_ZOOM = 15
+# Share of points left outside a fitted view at each edge, so stray coordinates don't widen it
+FIT_QUANTILE = 0.001
+
+def fit_view(df, width=MAP_WIDTH_PX, height=MAP_HEIGHT_PX):
+    """(bounds, zoom) of the closest map view showing df's points, or (None, DEFAULT_ZOOM) without any
+
+    Streamlit doesn't report the zoom a user pans to, so heatmaps are drawn
+    at the view that fits the selected area and their cells sized for it.
+    """
+    points = df[['latitude', 'longitude']].astype(np.float64).dropna()
+    if points.empty:
+        return None, DEFAULT_ZOOM
+    low = points.quantile(FIT_QUANTILE)
+    high = points.quantile(1 - FIT_QUANTILE)
+    bounds = (low['latitude'], low['longitude'], high['latitude'], high['longitude'])
+
+    # Degrees per pixel at zoom z is 360 / (TILE_PX * 2**z) across, about cos(lat) times that down
+    lat_scale = np.cos(np.radians((bounds[0] + bounds[2]) / 2))
+    lon_span = max(bounds[3] - bounds[1], 1e-6)
+    lat_span = max(bounds[2] - bounds[0], 1e-6) / lat_scale
+    zoom = np.log2(min(width / lon_span, height / lat_span) * 360 / TILE_PX)
+    return bounds, int(np.clip(np.floor(zoom), 1, MAX_ZOOM))
+
+def create_heatmap(df, aggregate=True, zoom=DEFAULT_ZOOM, max_cells=MAX_HEATMAP_CELLS, bounds=None, spatial_index=None):
+    """Create a heatmap of restaurant safety scores with neighborhood-specific scaling
+
+    With aggregate=True points are binned server-side into grid cells sized for
+    the zoom level, so at most max_cells cells are sent however many rows there are.
+    bounds=(min_lat, min_lon, max_lat, max_lon) culls points outside the viewport,
+    through spatial_index when it was built over df.
+    """
+    center = NYC_CENTER
+    if bounds is not None:
+        df = viewport_rows(df, bounds, spatial_index)
+        center = dict(lat=(bounds[0] + bounds[2]) / 2, lon=(bounds[1] + bounds[3]) / 2)
+
     if df.empty:
         return go.Figure()
 
     # Create base figure
     fig = go.Figure()
 
-    # Process each neighborhood separately
-    for neighborhood in df['boro'].unique():
-        neighborhood_data = df[df['boro'] == neighborhood]
+    if aggregate:
+        cells = aggregate_heatmap_cells(df, zoom, max_cells)
+        for neighborhood, neighborhood_cells in cells.groupby('boro', sort=False):
+            hovertext = (
+                neighborhood + "<br>" + neighborhood_cells['count'].astype(str) + " restaurants"
+                + "<br>Avg score: " + neighborhood_cells['mean_score'].round(1).astype(str)
+            )
+            fig.add_trace(
+                go.Densitymapbox(
+                    lat=neighborhood_cells['latitude'],
+                    lon=neighborhood_cells['longitude'],
+                    z=neighborhood_cells['z'],  # Sum of normalized scores in the cell
+                    radius=20,
+                    colorscale="Reds",
+                    showscale=False,
+                    name=neighborhood,
+                    hoverinfo="text",
+                    hovertext=hovertext,
+                )
+            )
+    else:
+        # Process each neighborhood separately
+        for neighborhood in df['boro'].unique():
+            neighborhood_data = df[df['boro'] == neighborhood]
 
-        # Skip if no data for this neighborhood
-        if neighborhood_data.empty:
-            continue
+            # Skip if no data for this neighborhood
+            if neighborhood_data.empty:
+                continue
 
-        # Normalize scores within this neighborhood
-        min_score = neighborhood_data['score'].min()
-        max_score = neighborhood_data['score'].max()
-        normalized_scores = (neighborhood_data['score'] - min_score) / (max_score - min_score)
+            # Normalize scores within this neighborhood
+            min_score = neighborhood_data['score'].min()
+            max_score = neighborhood_data['score'].max()
+            normalized_scores = (neighborhood_data['score'] - min_score) / (max_score - min_score)
 
-        # Add trace for this neighborhood
-        fig.add_trace(
-            go.Densitymapbox(
-                lat=neighborhood_data['latitude'],
-                lon=neighborhood_data['longitude'],
-                z=normalized_scores,  # Use normalized scores for coloring
-                radius=20,
-                colorscale="Reds",
-                showscale=False,  # Hide individual scales
-                name=neighborhood,
-                hoverinfo="text",  # Show only custom text on hover
-                hovertext=[
-                    f"{name}<br>Score: {score}" 
-                    for name, score in zip(neighborhood_data['dba'], neighborhood_data['score'])
-                ],
+            # Add trace for this neighborhood
+            fig.add_trace(
+                go.Densitymapbox(
+                    lat=neighborhood_data['latitude'],
+                    lon=neighborhood_data['longitude'],
+                    z=normalized_scores,  # Use normalized scores for coloring
+                    radius=20,
+                    colorscale="Reds",
+                    showscale=False,  # Hide individual scales
+                    name=neighborhood,
+                    hoverinfo="text",  # Show only custom text on hover
+                    hovertext=[
+                        f"{name}<br>Score: {score}" 
+                        for name, score in zip(neighborhood_data['dba'], neighborhood_data['score'])
+                    ],
+                )
             )
-        )
 
     # Update layout
     fig.update_layout(
         mapbox=dict(
             style="carto-positron",
-            center=dict(lat=40.7128, lon=-74.0060),
-            zoom=10
+            center=center,
+            zoom=zoom
         ),
         showlegend=True,
         legend_title_text="Neighborhoods",
@@ -56,15 +124,79 @@ def create_heatmap(df):
 
     return fig
 
-def create_restaurant_map(row):
-    """Create a map for a single restaurant"""
-    fig = go.Figure(
+def viewport_rows(df, bounds, spatial_index=None):
+    """Rows of df inside bounds=(min_lat, min_lon, max_lat, max_lon)"""
+    if spatial_index is not None and spatial_index.size == len(df):
+        return df.iloc[spatial_index.bbox(*bounds)]
+    min_lat, min_lon, max_lat, max_lon = bounds
+    return df[df['latitude'].between(min_lat, max_lat) & df['longitude'].between(min_lon, max_lon)]
+
+def aggregate_heatmap_cells(df, zoom=DEFAULT_ZOOM, max_cells=MAX_HEATMAP_CELLS):
+    """Bin points into (boro, grid cell) aggregates with per-borough normalized scores"""
+    boro_codes, boros = pd.factorize(df['boro'].astype(object).fillna(''))
+    lat = df['latitude'].to_numpy(dtype=np.float64)
+    lon = df['longitude'].to_numpy(dtype=np.float64)
+    score = df['score'].to_numpy(dtype=np.float64)
+
+    # Per-borough min/max in one grouped pass; a flat borough normalizes to 0
+    n_boros = len(boros)
+    low = np.full(n_boros, np.inf)
+    high = np.full(n_boros, -np.inf)
+    np.minimum.at(low, boro_codes, score)
+    np.maximum.at(high, boro_codes, score)
+    spread = (high - low)[boro_codes]
+    normalized = np.where(spread > 0, (score - low[boro_codes]) / np.where(spread > 0, spread, 1), 0.0)
+
+    # A tile spans 360 / 2**zoom degrees of longitude; cells are a fixed fraction of it
+    cell = 360.0 / (2 ** zoom) / CELLS_PER_TILE
+    lat_scale = np.cos(np.radians(NYC_CENTER['lat']))
+    # Every borough keeps at least one cell, however coarse they get
+    max_cells = max(max_cells, n_boros)
+    while True:
+        ix = np.floor(lon / cell).astype(np.int64)
+        iy = np.floor(lat / (cell * lat_scale)).astype(np.int64)
+        # Pack (boro, x, y) into one key; 20 bits per axis covers the globe at this precision
+        keys = (boro_codes.astype(np.int64) << 42) | ((ix & 0xFFFFF) << 21) | (iy & 0xFFFFF)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        if len(unique_keys) <= max_cells:
+            break
+        cell *= 2  # Coarsen until the payload fits the cap
+
+    count = np.bincount(inverse)
+    cell_boro = boro_codes[np.unique(inverse, return_index=True)[1]]
+    return pd.DataFrame({
+        'boro': np.asarray(boros, dtype=object)[cell_boro],
+        'latitude': np.bincount(inverse, weights=lat) / count,
+        'longitude': np.bincount(inverse, weights=lon) / count,
+        'z': np.bincount(inverse, weights=normalized),
+        'count': count,
+        'mean_score': np.bincount(inverse, weights=score) / count,
+    })
+
+def create_restaurant_map(row, nearby=None):
+    """Create a map for a single restaurant, optionally with nearby places around it"""
+    fig = go.Figure()
+
+    if nearby is not None and not nearby.empty:
+        fig.add_trace(
+            go.Scattermapbox(
+                lat=nearby['latitude'],
+                lon=nearby['longitude'],
+                mode='markers',
+                marker=go.scattermapbox.Marker(size=9, color='#7F8C8D'),
+                text=nearby['dba'].astype(str) + " (Grade " + nearby['grade'].astype(str).replace('', 'N/A') + ")",
+                name="Nearby",
+            )
+        )
+
+    fig.add_trace(
         go.Scattermapbox(
             lat=[row['latitude']],
             lon=[row['longitude']],
             mode='markers',
             marker=go.scattermapbox.Marker(size=14, color='#D73502'),
             text=[row['dba']],
+            name=row['dba'],
         )
     )
 
@@ -75,6 +207,7 @@ def create_restaurant_map(row):
             zoom=15
         ),
         margin={"r":0,"t":0,"l":0,"b":0},
+        showlegend=False,
         height=400
     )
 
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from utils.violations import VIOLATION_CATEGORIES, category_bits, violation_flags
+
+ALL_AREAS = "All NYC"
+
+class MetricsCube:
+    """Counts and score sums keyed by (boro, grade), built once per data version"""
+
+    def __init__(self, df, version=None):
+        self.version = version
+        boro = df['boro'].astype(object).fillna('').astype(str)
+        grade = df['grade'].astype(object).fillna('').astype(str)
+        dates = pd.to_datetime(df['inspection_date']).to_numpy(dtype='datetime64[ns]')
+        flags = violation_flags(df).to_numpy()
+
+        # One grouped pass gives every cell; areas are sums of their cells
+        self.cells = pd.DataFrame({'boro': boro, 'grade': grade, 'score': df['score']}).groupby(
+            ['boro', 'grade']
+        )['score'].agg(['size', 'sum', 'count'])
+
+        self.boroughs = sorted(b for b in boro.unique() if b)
+        restaurants = df['camis'].groupby(boro).nunique()
+
+        self.areas = {ALL_AREAS: self._area(self.cells, df['camis'].nunique(), dates, flags)}
+        for name in self.boroughs:
+            in_boro = (boro == name).to_numpy()
+            self.areas[name] = self._area(
+                self.cells.xs(name, level='boro', drop_level=False), restaurants[name], dates[in_boro], flags[in_boro]
+            )
+
+    @staticmethod
+    def _area(cells, restaurants, dates, flags):
+        grade_counts = cells['size'].groupby(level='grade').sum()
+        # Sorted so a trailing date window is one binary search; flags follow the same order
+        dated = ~np.isnat(dates)
+        order = np.argsort(dates[dated], kind='stable')
+        return {
+            'rows': int(cells['size'].sum()),
+            'restaurants': int(restaurants),
+            'grade_counts': grade_counts,
+            'score_sum': float(cells['sum'].sum()),
+            'score_count': int(cells['count'].sum()),
+            'dates': dates[dated][order],
+            'violation_flags': flags[dated][order],
+        }
+
+    def area(self, name):
+        return self.areas.get(name, self.areas[ALL_AREAS])
+
+    def active_restaurants(self, name=ALL_AREAS):
+        return self.area(name)['restaurants']
+
+    def grade_percent(self, grade, name=ALL_AREAS):
+        area = self.area(name)
+        return area['grade_counts'].get(grade, 0) / area['rows'] * 100 if area['rows'] else 0.0
+
+    def average_score(self, name=ALL_AREAS):
+        area = self.area(name)
+        return area['score_sum'] / area['score_count'] if area['score_count'] else float('nan')
+
+    def _window_start(self, area, days, now):
+        now = pd.Timestamp.now() if now is None else now
+        since = np.datetime64(now - pd.Timedelta(days=days), 'ns')
+        return np.searchsorted(area['dates'], since, side='left')
+
+    def recent_inspections(self, days=30, name=ALL_AREAS, now=None):
+        """Inspections on or after `days` before now"""
+        area = self.area(name)
+        return int(len(area['dates']) - self._window_start(area, days, now))
+
+    def violation_counts(self, days=365, name=ALL_AREAS, now=None, categories=VIOLATION_CATEGORIES):
+        """Rows per violation category over the trailing window, one bit test each"""
+        area = self.area(name)
+        flags = area['violation_flags'][self._window_start(area, days, now):]
+        return {
+            category: int(np.count_nonzero(flags & bit))
+            for category, bit in category_bits(categories).items()
+        }
+
+    def grade_distribution(self, name=ALL_AREAS, grades=('A', 'B', 'C')):
+        """Counts of the given grades, largest first, like value_counts()"""
+        counts = self.area(name)['grade_counts']
+        counts = counts[counts.index.isin(grades) & (counts > 0)]
+        return counts.sort_values(ascending=False)
+
+def violation_days(rows):
+    """Rows counted per (boro, day, violation_flags): every violation row's figures, a few thousand lines"""
+    table = pd.DataFrame({
+        'boro': rows['boro'].astype(object).fillna('').astype(str),
+        'day': pd.to_datetime(rows['inspection_date']).dt.normalize(),
+        'violation_flags': violation_flags(rows).to_numpy(),
+    })
+    return table.groupby(['boro', 'day', 'violation_flags']).size().rename('count').reset_index()
+
+def merge_violation_days(table, more):
+    """Sum of two violation_days tables"""
+    if table is None:
+        return more
+    combined = pd.concat([table, more], ignore_index=True)
+    return combined.groupby(['boro', 'day', 'violation_flags'])['count'].sum().reset_index()
+
+def violation_day_counts(table, since, name=ALL_AREAS, categories=VIOLATION_CATEGORIES):
+    """Violation rows per category on or after since, from a violation_days table"""
+    mask = (table['day'] >= since).to_numpy()
+    if name != ALL_AREAS:
+        mask &= (table['boro'] == name).to_numpy()
+    flags = table['violation_flags'].to_numpy()[mask]
+    counts = table['count'].to_numpy()[mask]
+    return {
+        category: int(counts[(flags & bit) != 0].sum())
+        for category, bit in category_bits(categories).items()
+    }
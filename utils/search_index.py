@@ -0,0 +1,392 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Rows encoded per chunk while building, to bound the temporary code matrix
+BUILD_CHUNK_ROWS = 50000
+
+# Share of the query's trigrams a name must contain to count as a fuzzy match
+FUZZY_THRESHOLD = 0.5
+
+PUNCTUATION = re.compile(r'[^\w\s]|_')
+APOSTROPHES = re.compile("['\u2019`]")
+WHITESPACE = re.compile(r'\s+')
+
+def normalize_name(name):
+    """Fold case, diacritics, "&" and punctuation so name variants compare equal"""
+    name = unicodedata.normalize('NFKD', name.lower())
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    name = APOSTROPHES.sub('', name.replace('&', ' and '))  # joe's -> joes
+    return WHITESPACE.sub(' ', PUNCTUATION.sub(' ', name)).strip()
+
+def normalize_names(values):
+    """normalize_name over a Series, once per distinct name"""
+    codes, uniques = pd.factorize(values.astype(object).fillna('').astype(str))
+    normalized = np.array([normalize_name(name) for name in uniques], dtype=object)
+    return pd.Series(normalized[codes] if len(codes) else [], index=values.index, dtype=object)
+
+def intersect_sorted(result, postings):
+    """Values of sorted `result` also present in sorted `postings`"""
+    if not len(result) or not len(postings):
+        return result[:0]
+    # A binary search per survivor beats a merge when result is the shorter list
+    slots = np.minimum(np.searchsorted(postings, result), len(postings) - 1)
+    return result[postings[slots] == result]
+
+def trigram_codes(chars):
+    """Pack each run of three code points in a (rows, width) uint32 matrix into one int64"""
+    chars = chars.astype(np.int64)
+    codes = (chars[:, :-2] << 42) | (chars[:, 1:-1] << 21) | chars[:, 2:]
+    # Trigrams that reach into the zero padding past the end of a string are not real
+    return codes, chars[:, 2:] != 0
+
+def word_start_codes(chars):
+    """One- and two-character keys for every word start in a (rows, width) uint32 matrix
+
+    Returns (codes, valid, first): keys at each position, whether that
+    position starts a word, and whether it starts the whole string. A word
+    starts after anything that isn't an ASCII letter or digit, as in
+    TrigramIndex.match_tiers.
+    """
+    chars = chars.astype(np.int64)
+    alnum = ((chars >= ord('a')) & (chars <= ord('z'))) | ((chars >= ord('0')) & (chars <= ord('9')))
+    starts = np.ones(chars.shape, dtype=bool)
+    starts[:, 1:] = ~alnum[:, :-1]
+    starts &= (chars != 0) & (chars != ord(' '))
+    first = np.zeros(chars.shape, dtype=bool)
+    first[:, 0] = True
+
+    following = np.zeros_like(chars)
+    following[:, :-1] = chars[:, 1:]
+    pairs = starts & (following != 0) & (following != ord(' '))
+    codes = np.concatenate([chars << 21, (chars << 21) | following], axis=1)
+    valid = np.concatenate([starts, pairs], axis=1)
+    return codes, valid, np.concatenate([first, first], axis=1)
+
+def short_code(query):
+    """Key of a one- or two-character query in the word start postings"""
+    chars = [ord(char) for char in query]
+    return (chars[0] << 21) | (chars[1] if len(chars) > 1 else 0)
+
+def encode_strings(values):
+    """Fixed-width UTF-32 code point matrix for a list of strings"""
+    width = max(3, max((len(value) for value in values), default=0))
+    return np.array(values, dtype=f'<U{width}').view(np.uint32).reshape(len(values), width)
+
+class TrigramIndex:
+    """Trigram inverted index over one text column, with postings stored as row positions
+
+    Queries too short for a trigram use a second, smaller index of the first
+    one and two characters of every word.
+    """
+
+    def __init__(self, values, order_by=None):
+        self.text = normalize_names(values).to_numpy(dtype=object)
+        self.size = len(self.text)
+
+        # Arrow strings let candidate checks run as vectorized kernels instead of Python loops
+        self.arrow_text = pa.array(self.text, type=pa.string()) if HAS_PYARROW else None
+
+        # Ordinal of each row by recency (0 = newest) to break relevance ties
+        if order_by is not None:
+            dates = pd.to_datetime(order_by).to_numpy(dtype='datetime64[ns]')
+            # Undated rows sort after everything else
+            keys = np.where(np.isnat(dates), np.iinfo(np.int64).min, dates.astype(np.int64))
+            self.recency = np.empty(self.size, dtype=np.int64)
+            self.recency[np.argsort(-keys, kind='stable')] = np.arange(self.size)
+        else:
+            self.recency = np.arange(self.size, dtype=np.int64)
+
+        self.lengths = np.fromiter((len(text) for text in self.text), dtype=np.int32, count=self.size)
+
+        # Collect (trigram, row) pairs chunk by chunk, then sort them into CSR postings
+        gram_chunks, row_chunks = [], []
+        short_chunks, short_row_chunks, first_chunks = [], [], []
+        for start in range(0, self.size, BUILD_CHUNK_ROWS):
+            chunk = self.text[start:start + BUILD_CHUNK_ROWS].tolist()
+            chars = encode_strings(chunk)
+            codes, valid = trigram_codes(chars)
+            rows = np.broadcast_to(np.arange(start, start + len(chunk), dtype=np.int32)[:, None], codes.shape)
+            gram_chunks.append(codes[valid])
+            row_chunks.append(rows[valid])
+
+            codes, valid, first = word_start_codes(chars)
+            rows = np.broadcast_to(np.arange(start, start + len(chunk), dtype=np.int32)[:, None], codes.shape)
+            short_chunks.append(codes[valid])
+            short_row_chunks.append(rows[valid])
+            first_chunks.append(first[valid])
+
+        grams = np.concatenate(gram_chunks) if gram_chunks else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(row_chunks) if row_chunks else np.empty(0, dtype=np.int32)
+
+        order = np.lexsort((rows, grams))
+        grams, rows = grams[order], rows[order]
+
+        # A trigram repeated inside one name only needs one posting
+        keep = np.ones(len(grams), dtype=bool)
+        keep[1:] = (grams[1:] != grams[:-1]) | (rows[1:] != rows[:-1])
+        grams, rows = grams[keep], rows[keep]
+
+        self.keys, self.starts = np.unique(grams, return_index=True)
+        self.starts = np.append(self.starts, len(grams))
+        self.postings = rows
+
+        # Distinct trigrams per name, the denominator for fuzzy tie-breaking
+        self.gram_counts = np.bincount(rows, minlength=self.size).astype(np.int32)
+
+        # Word start postings, with whether the key also starts the name (the prefix tier)
+        codes = np.concatenate(short_chunks) if short_chunks else np.empty(0, dtype=np.int64)
+        rows = np.concatenate(short_row_chunks) if short_row_chunks else np.empty(0, dtype=np.int32)
+        first = np.concatenate(first_chunks) if first_chunks else np.empty(0, dtype=bool)
+
+        # One posting per (key, row), the name start one when there is one
+        order = np.lexsort((~first, rows, codes))
+        codes, rows, first = codes[order], rows[order], first[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+        codes, rows, first = codes[keep], rows[keep], first[keep]
+
+        self.short_keys, self.short_starts = np.unique(codes, return_index=True)
+        self.short_starts = np.append(self.short_starts, len(codes))
+        self.short_postings = rows
+        self.short_first = first
+
+    def postings_for(self, gram):
+        """Sorted row positions of every name containing one trigram code"""
+        slot = np.searchsorted(self.keys, gram)
+        if slot == len(self.keys) or self.keys[slot] != gram:
+            return np.empty(0, dtype=np.int32)
+        return self.postings[self.starts[slot]:self.starts[slot + 1]]
+
+    def short_matches(self, query, within=None):
+        """Rows with a word starting with a one- or two-character query, and their match tiers"""
+        code = short_code(query)
+        slot = np.searchsorted(self.short_keys, code)
+        if slot == len(self.short_keys) or self.short_keys[slot] != code:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        rows = self.short_postings[self.short_starts[slot]:self.short_starts[slot + 1]]
+        first = self.short_first[self.short_starts[slot]:self.short_starts[slot + 1]]
+        if within is not None:
+            slots = np.minimum(np.searchsorted(within, rows), max(len(within) - 1, 0))
+            found = within[slots] == rows if len(within) else np.zeros(len(rows), dtype=bool)
+            rows, first = rows[found], first[found]
+
+        # Tiers as match_tiers gives them: name equal to the query, starting with it, a later word starting with it
+        exact = first & (self.lengths[rows] == len(query))
+        return rows, np.where(exact, 0, np.where(first, 1, 2))
+
+    def query_grams(self, query):
+        codes, valid = trigram_codes(encode_strings([query]))
+        return np.unique(codes[valid])
+
+    def candidates(self, query):
+        """Rows whose names contain every trigram of the query (a superset of the matches)"""
+        grams = self.query_grams(query)
+
+        # Intersect the shortest lists first so the working set shrinks fastest
+        lists = sorted((self.postings_for(gram) for gram in grams), key=len)
+        result = lists[0]
+        for postings in lists[1:]:
+            result = intersect_sorted(result, postings)
+        return result
+
+    def match_tiers(self, candidates, query):
+        """Relevance tier per candidate: 0 exact, 1 prefix, 2 word start, 3 anywhere, -1 no match"""
+        # A word starts after anything that isn't an ASCII letter or digit
+        word_pattern = '(?:^|[^a-z0-9])' + re.escape(query)
+
+        if self.arrow_text is not None:
+            texts = self.arrow_text.take(pa.array(candidates, type=pa.int64()))
+            contains = pc.match_substring(texts, query).to_numpy(zero_copy_only=False)
+            word = pc.match_substring_regex(texts, word_pattern).to_numpy(zero_copy_only=False)
+            prefix = pc.starts_with(texts, query).to_numpy(zero_copy_only=False)
+            exact = pc.equal(texts, query).to_numpy(zero_copy_only=False)
+        else:
+            texts = self.text[candidates]
+            word_regex = re.compile(word_pattern)
+            contains = np.fromiter((query in text for text in texts), dtype=bool, count=len(texts))
+            word = np.fromiter((word_regex.search(text) is not None for text in texts), dtype=bool, count=len(texts))
+            prefix = np.fromiter((text.startswith(query) for text in texts), dtype=bool, count=len(texts))
+            exact = np.fromiter((text == query for text in texts), dtype=bool, count=len(texts))
+
+        tiers = np.where(exact, 0, np.where(prefix, 1, np.where(word, 2, 3)))
+        return np.where(contains, tiers, -1)
+
+    def search(self, query, limit=1000, within=None):
+        """Row positions of names containing query, best matches first
+
+        Queries shorter than three characters only match at the start of a
+        word. within optionally restricts the search to a sorted array of row
+        positions.
+        """
+        query = normalize_name(query)
+        if not query:
+            return np.empty(0, dtype=np.int64)
+
+        if len(query) < 3:
+            # Too short to have a trigram; one lookup in the word start postings
+            candidates, tiers = self.short_matches(query, within)
+        else:
+            candidates = self.candidates(query)
+            if within is not None:
+                candidates = intersect_sorted(candidates, within)
+
+            # Trigram hits can be false positives, so the tiering also confirms the substring
+            tiers = self.match_tiers(candidates, query)
+            found = tiers >= 0
+            candidates, tiers = candidates[found], tiers[found]
+
+        # Rank by tier, then newest first; only the top `limit` keys are fully sorted
+        keys = tiers.astype(np.int64) * self.size + self.recency[candidates]
+        if limit is not None and len(keys) > limit:
+            top = np.argpartition(keys, limit)[:limit]
+            candidates, keys = candidates[top], keys[top]
+        return candidates[np.argsort(keys, kind='stable')]
+
+    def fuzzy_search(self, query, threshold=FUZZY_THRESHOLD, limit=1000, within=None):
+        """Row positions of names sharing enough trigrams with query, most similar first"""
+        query = normalize_name(query)
+        grams = self.query_grams(query) if len(query) >= 3 else np.empty(0, dtype=np.int64)
+        if not len(grams):
+            return np.empty(0, dtype=np.int64)
+
+        # Count shared trigrams for every name in one pass over the query's posting lists
+        postings = [self.postings_for(gram) for gram in grams]
+        shared = np.bincount(np.concatenate(postings), minlength=self.size)
+
+        # Coverage of the query decides the match; Jaccard prefers names without extra words
+        coverage = shared / len(grams)
+        candidates = np.flatnonzero(coverage >= threshold)
+        if within is not None:
+            candidates = intersect_sorted(candidates, within)
+        if not len(candidates):
+            return candidates
+
+        common = shared[candidates]
+        jaccard = common / (len(grams) + self.gram_counts[candidates] - common)
+        order = np.lexsort((self.recency[candidates], -jaccard, -coverage[candidates]))
+        return candidates[order[:limit]]
+
+class FieldIndex:
+    """Value-to-rows postings for a low-cardinality column such as boro or cuisine"""
+
+    def __init__(self, values):
+        codes, uniques = pd.factorize(normalize_names(values))
+        self.values = np.asarray(uniques, dtype=object)
+
+        # Group row positions by value code: CSR layout like the trigram postings
+        order = np.argsort(codes, kind='stable')
+        self.postings = order.astype(np.int32)
+        self.starts = np.searchsorted(codes[order], np.arange(len(self.values) + 1))
+
+    def lookup(self, term):
+        """Sorted row positions whose value contains term"""
+        term = normalize_name(term)
+        slots = [slot for slot, value in enumerate(self.values) if term and term in value]
+        if not slots:
+            return np.empty(0, dtype=np.int32)
+        postings = [self.postings[self.starts[slot]:self.starts[slot + 1]] for slot in slots]
+        return postings[0] if len(postings) == 1 else np.sort(np.concatenate(postings))
+
+# Query prefixes accepted in field-qualified searches such as `cuisine:thai boro:queens`
+FIELD_ALIASES = {
+    'name': 'name', 'dba': 'name',
+    'address': 'address', 'addr': 'address', 'street': 'address',
+    'zip': 'zipcode', 'zipcode': 'zipcode',
+    'boro': 'boro', 'borough': 'boro',
+    'cuisine': 'cuisine',
+}
+FIELD_TERM = re.compile(r'(\w+):("[^"]*"|\S+)')
+
+def parse_query(query):
+    """Split a query into free text and a list of (field, value) filters"""
+    filters = []
+
+    def take(match):
+        field = FIELD_ALIASES.get(match.group(1).lower())
+        if field is None:
+            return match.group(0)  # not a known field, keep it as text
+        filters.append((field, match.group(2).strip('"')))
+        return ' '
+
+    text = FIELD_TERM.sub(take, query)
+    return ' '.join(text.split()), filters
+
+def query_boroughs(query, boroughs):
+    """The boroughs a query's boro: filters allow, or None when it has none
+
+    Matches as FieldIndex.lookup does, so a search over just these boroughs'
+    rows finds what it would over every row.
+    """
+    terms = [normalize_name(value) for field, value in parse_query(query)[1] if field == 'boro']
+    if not terms:
+        return None
+    return [boro for boro in boroughs if all(term and term in normalize_name(boro) for term in terms)]
+
+class SearchEngine:
+    """Per-field indexes over the restaurant frame, combined by intersecting postings"""
+
+    def __init__(self, df):
+        self.size = len(df)
+        self.name = TrigramIndex(df['dba'], order_by=df['inspection_date'])
+        address = df['building'].astype(object).fillna('').astype(str) + ' ' + df['street'].astype(object).fillna('').astype(str)
+        self.address = TrigramIndex(address, order_by=df['inspection_date'])
+        self.fields = {
+            # Missing zipcodes index as '', which no lookup matches, rather than as 'nan'
+            'zipcode': FieldIndex(
+                df['zipcode'].astype(str).str.replace(r'\.0$', '', regex=True).where(df['zipcode'].notna(), '')
+            ),
+            'boro': FieldIndex(df['boro']),
+            'cuisine': FieldIndex(df['cuisine_description']),
+        }
+
+    def field_rows(self, field, value, within=None):
+        """Sorted row positions matching one field filter"""
+        if field == 'name':
+            return np.sort(self.name.search(value, limit=None, within=within))
+        if field == 'address':
+            return np.sort(self.address.search(value, limit=None, within=within))
+        rows = self.fields[field].lookup(value)
+        return rows if within is None else intersect_sorted(rows, within)
+
+    def search(self, query, limit=1000, mode='auto'):
+        """Row positions for a possibly field-qualified query, best matches first"""
+        text, filters = parse_query(query)
+
+        # Filters narrow a sorted position set; value lookups go first as they are cheapest
+        within = None
+        for field, value in sorted(filters, key=lambda item: item[0] in ('name', 'address')):
+            within = self.field_rows(field, value, within)
+            if not len(within):
+                return within
+
+        if not text:
+            if within is None:
+                return np.empty(0, dtype=np.int64)
+            # Filters alone: newest inspections first
+            return within[np.argsort(self.name.recency[within], kind='stable')[:limit]]
+
+        # Free text tries names, then addresses, then borough/cuisine/zip values
+        if mode != 'fuzzy':
+            for index in (self.name, self.address):
+                positions = index.search(text, limit, within)
+                if len(positions):
+                    return positions
+            for field_index in self.fields.values():
+                rows = field_index.lookup(text)
+                if within is not None:
+                    rows = intersect_sorted(rows, within)
+                if len(rows):
+                    return rows[np.argsort(self.name.recency[rows], kind='stable')[:limit]]
+
+        if mode == 'exact':
+            return np.empty(0, dtype=np.int64)
+        return self.name.fuzzy_search(text, limit=limit, within=within)
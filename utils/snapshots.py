@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import pickle
+import shutil
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+import pandas as pd
+from pandas.api.types import union_categoricals
+from utils.cache_manager import (
+    CACHE_DIR,
+    HAS_PYARROW,
+    FrameWriter,
+    cache_state,
+    compute_watermark,
+    load_csv_cache,
+    load_parquet_cache,
+    merge_watermarks,
+    write_atomic
+)
+from utils.violations import category_bits, reclassify_stale
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+# Holds the name of the published snapshot directory; replaced atomically on publish
+CURRENT_FILE = os.path.join(SNAPSHOT_DIR, "CURRENT")
+MANIFEST_FILE = "manifest.json"
+ROWS_PARQUET_FILE = "rows.parquet"
+ROWS_CSV_FILE = "rows.csv"
+# Rows are written one file per borough, so a reader can load just the boroughs it needs
+PARTITIONS_DIR = "partitions"
+ARTIFACTS_FILE = "artifacts.pickle"
+# Citywide figures the landing page renders from, a fixed size however many rows there are
+SUMMARY_FILE = "summary.pickle"
+# Written when the server confirms (304) that a published snapshot is still current
+VALIDATED_FILE = "validated"
+
+# Bump when SearchEngine, MetricsCube or SpatialIndex change shape; readers
+# rebuild indexes instead of unpickling artifacts from another format
+ARTIFACTS_FORMAT = 2
+
+# Older snapshots kept so a reader that just resolved CURRENT can still open its files
+KEEP_SNAPSHOTS = 3
+
+# One published snapshot as read back from disk; artifacts is None when it must be rebuilt
+Published = namedtuple('Published', ['manifest', 'rows', 'artifacts'])
+# The summary of a published snapshot: its MetricsCube and violation_days table
+PublishedSummary = namedtuple('PublishedSummary', ['manifest', 'metrics', 'violation_days'])
+
+def new_version():
+    """Sortable snapshot name"""
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+def snapshot_path(version, *parts):
+    return os.path.join(SNAPSHOT_DIR, version, *parts)
+
+def partition_name(boro):
+    """File name stem for one borough's rows, e.g. 'Staten Island' -> 'staten-island'"""
+    return re.sub(r'[^a-z0-9]+', '-', boro.lower()).strip('-') or '_unknown'
+
+def partition_keys(rows):
+    """Borough of each row as the partition key ('' when missing)"""
+    return rows['boro'].astype(object).fillna('').astype(str)
+
+class SnapshotWriter:
+    """Build a snapshot chunk by chunk in a staging directory, then publish it
+
+    Rows go to disk as they are written, split into one file per borough;
+    only the counts and the delta sync watermark are kept. The staging
+    directory is renamed into place before CURRENT is swapped, so readers
+    only ever open complete snapshots.
+    """
+
+    def __init__(self, version=None):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        self.version = new_version() if version is None else version
+        self.staging = tempfile.mkdtemp(prefix=".staging-", dir=SNAPSHOT_DIR)
+        os.makedirs(os.path.join(self.staging, PARTITIONS_DIR))
+        self.partitions = {}
+        self.record_count = 0
+        self.camis = set()
+        self.watermark = None
+
+    def write(self, rows):
+        for boro, part in rows.groupby(partition_keys(rows).to_numpy(), sort=False):
+            self._partition(boro).write(part)
+        self.record_count += len(rows)
+        self.camis.update(rows['camis'].unique().tolist())
+        self.watermark = merge_watermarks(self.watermark, compute_watermark(rows))
+
+    def _partition(self, boro):
+        if boro not in self.partitions:
+            stem = os.path.join(self.staging, PARTITIONS_DIR, partition_name(boro))
+            self.partitions[boro] = FrameWriter(stem + ".parquet", stem + ".csv")
+        return self.partitions[boro]
+
+    def publish(self, artifacts=None, extra=None, summary=None):
+        """Finish the files, make this the current snapshot and return its manifest
+
+        summary, if given, is the PublishedSummary fields other than the
+        manifest, as a dict: {'metrics': ..., 'violation_days': ...}.
+        """
+        try:
+            partitions = {
+                boro: {'file': partition_name(boro), 'format': writer.close()}
+                for boro, writer in self.partitions.items()
+            }
+            formats = {partition['format'] for partition in partitions.values()}
+            for name, payload in ((ARTIFACTS_FILE, artifacts), (SUMMARY_FILE, summary)):
+                if payload is not None:
+                    with open(os.path.join(self.staging, name), 'wb') as f:
+                        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            manifest = {
+                'version': self.version,
+                'created': datetime.now().isoformat(),
+                'format': formats.pop() if len(formats) == 1 else "mixed",
+                'partitions': partitions,
+                'record_count': self.record_count,
+                'unique_restaurants': len(self.camis),
+                'watermark': self.watermark,
+                'artifacts_format': ARTIFACTS_FORMAT if artifacts is not None else None,
+                'summary_format': ARTIFACTS_FORMAT if summary is not None else None,
+                'violation_categories': category_bits(),
+                **(extra or {}),
+            }
+            with open(os.path.join(self.staging, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f)
+
+            os.rename(self.staging, snapshot_path(self.version))
+        except Exception:
+            self.abort()
+            raise
+
+        write_atomic(CURRENT_FILE, self.version)
+        prune_snapshots(keep=KEEP_SNAPSHOTS)
+        return manifest
+
+    def abort(self):
+        """Discard everything staged so far"""
+        for writer in self.partitions.values():
+            writer.abort()
+        shutil.rmtree(self.staging, ignore_errors=True)
+
+def publish_snapshot(rows, artifacts=None, version=None, extra=None, summary=None):
+    """Write rows (and pickled artifacts) as a new snapshot, point CURRENT at it and return the manifest"""
+    writer = SnapshotWriter(version)
+    try:
+        writer.write(rows)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.publish(artifacts, extra, summary)
+
+def published_versions():
+    """Complete snapshot directories, oldest first"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(SNAPSHOT_DIR)
+        if not name.startswith('.') and os.path.exists(snapshot_path(name, MANIFEST_FILE))
+    )
+
+def prune_snapshots(keep=KEEP_SNAPSHOTS):
+    """Delete all but the newest `keep` snapshots, never the current one"""
+    current = current_version()
+    for version in published_versions()[:-keep]:
+        if version != current:
+            shutil.rmtree(snapshot_path(version), ignore_errors=True)
+
+def current_version():
+    """Name of the published snapshot, or None before the first publish"""
+    try:
+        with open(CURRENT_FILE) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def read_manifest(version=None):
+    """Manifest of a snapshot (the current one by default), or None"""
+    version = current_version() if version is None else version
+    if version is None:
+        return None
+    try:
+        with open(snapshot_path(version, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except Exception:
+        return None
+
+    try:
+        with open(snapshot_path(version, VALIDATED_FILE)) as f:
+            manifest['validated'] = f.read().strip() or None
+    except OSError:
+        pass
+    return manifest
+
+def mark_validated(version):
+    """Record that the server confirmed a snapshot is still current, restarting its TTLs"""
+    write_atomic(snapshot_path(version, VALIDATED_FILE), datetime.now().isoformat())
+
+def snapshot_age(manifest):
+    """Seconds since a snapshot was published or last revalidated"""
+    checked = manifest.get('validated') or manifest['created']
+    return (datetime.now() - datetime.fromisoformat(checked)).total_seconds()
+
+def current_taxonomy(manifest):
+    """Whether a snapshot's violation_flags were made with today's violation categories
+
+    When they weren't, load_snapshot reclassifies the rows and skips the
+    artifacts, and load_summary returns None, so both are rebuilt.
+    """
+    return manifest.get('violation_categories') == category_bits()
+
+def snapshot_state(manifest):
+    """'fresh', 'stale' or 'expired' against the cache TTLs"""
+    return cache_state(snapshot_age(manifest))
+
+def load_snapshot(version=None, columns=None, artifacts=True, boroughs=None, fill_scores=True):
+    """Read a published snapshot (the current one by default) as Published, or None
+
+    With boroughs, only those partitions are read (and no artifacts, which
+    index the citywide rows). Missing scores are stored as missing and filled
+    with the snapshot's score_median unless fill_scores is False.
+    """
+    manifest = read_manifest(version)
+    if manifest is None:
+        return None
+    version = manifest['version']
+
+    if manifest.get('partitions') is not None:
+        rows = load_partitions(version, manifest['partitions'], columns, boroughs)
+    else:
+        # Snapshots from before partitioning keep every row in one file
+        rows = None
+        if manifest.get('format') == "parquet" and HAS_PYARROW:
+            rows = load_parquet_cache(columns, path=snapshot_path(version, ROWS_PARQUET_FILE))
+        if rows is None:
+            rows = load_csv_cache(columns, path=snapshot_path(version, ROWS_CSV_FILE))
+        if rows is not None and boroughs is not None:
+            rows = rows[partition_keys(rows).isin(boroughs).to_numpy()].reset_index(drop=True)
+    if rows is None:
+        return None
+    reclassify_stale(rows, manifest.get('violation_categories'))
+    if fill_scores and manifest.get('score_median') is not None and 'score' in rows.columns:
+        rows['score'] = rows['score'].fillna(manifest['score_median'])
+
+    loaded = None
+    if (artifacts and columns is None and boroughs is None and manifest.get('artifacts_format') == ARTIFACTS_FORMAT
+            and current_taxonomy(manifest)):
+        loaded = load_pickle(version, ARTIFACTS_FILE)
+
+    return Published(manifest, rows, loaded)
+
+def load_partitions(version, partitions, columns=None, boroughs=None):
+    """Rows of the given boroughs (all by default) in one frame, or None if a file can't be read"""
+    frames = []
+    for boro, partition in partitions.items():
+        if boroughs is not None and boro not in boroughs:
+            continue
+        stem = snapshot_path(version, PARTITIONS_DIR, partition['file'])
+        rows = None
+        if partition['format'] == "parquet" and HAS_PYARROW:
+            rows = load_parquet_cache(columns, path=stem + ".parquet")
+        if rows is None:
+            rows = load_csv_cache(columns, path=stem + ".csv")
+        if rows is None:
+            return None
+        frames.append(rows)
+    return concat_partitions(frames)
+
+def concat_partitions(frames):
+    """Stack partitions, merging their categoricals instead of falling back to object columns"""
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[column] = pd.Series(union_categoricals(parts), name=column)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def load_summary(version=None):
+    """PublishedSummary of a snapshot (the current one by default), or None if it has none"""
+    manifest = read_manifest(version)
+    if manifest is None or manifest.get('summary_format') != ARTIFACTS_FORMAT or not current_taxonomy(manifest):
+        return None
+    summary = load_pickle(manifest['version'], SUMMARY_FILE)
+    if summary is None:
+        return None
+    return PublishedSummary(manifest, summary['metrics'], summary['violation_days'])
+
+def load_pickle(version, name):
+    try:
+        with open(snapshot_path(version, name), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return None
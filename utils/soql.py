@@ -0,0 +1,67 @@
+import re
+
+# SoQL query planning: every view declares the raw API columns it reads, the
+# ingest downloads only their union, and count-only panels are answered with
+# grouped queries instead of rows.
+
+# Raw columns read by each part of the app. Derived columns (year,
+# violation_flags) are computed at ingest from these.
+VIEW_COLUMNS = {
+    'ingest': [
+        'camis', 'inspection_date', 'latitude', 'longitude', 'score', 'grade', 'dba', 'building', 'street',
+        'violation_description',
+    ],
+    'search': [
+        'dba', 'building', 'street', 'zipcode', 'boro', 'cuisine_description', 'grade', 'score', 'inspection_date',
+        'critical_flag', 'violation_description',
+    ],
+    'details': [
+        'camis', 'dba', 'building', 'street', 'boro', 'cuisine_description', 'grade', 'score', 'inspection_date',
+        'latitude', 'longitude', 'critical_flag', 'violation_code', 'violation_description', 'action',
+    ],
+    'metrics': ['camis', 'boro', 'grade', 'score', 'inspection_date', 'violation_description'],
+    'maps': [
+        'camis', 'dba', 'boro', 'grade', 'score', 'inspection_date', 'latitude', 'longitude', 'violation_code',
+        'violation_description',
+    ],
+}
+
+# Grouped results are small; this caps them well above any real group count
+AGGREGATE_LIMIT = 50000
+
+IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+def projection(views=None):
+    """Columns read by the given views (all by default), in first-seen order"""
+    columns = []
+    for view in (VIEW_COLUMNS if views is None else views):
+        for column in VIEW_COLUMNS[view]:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def select_clause(columns):
+    """$select value for a column projection"""
+    for column in columns:
+        if not IDENTIFIER.match(column):
+            raise ValueError(f"Not a column name: {column!r}")
+    return ','.join(columns)
+
+def quote(text):
+    """SoQL string literal"""
+    return "'" + text.replace("'", "''") + "'"
+
+def contains_any(column, keywords):
+    """Condition matching rows whose column contains any keyword, ignoring case"""
+    select_clause([column])
+    return '(' + ' OR '.join(f"lower({column}) like {quote('%' + keyword.lower() + '%')}" for keyword in keywords) + ')'
+
+def aggregate_query(group_by, where, count_as='count'):
+    """Query parameters counting the rows matching where, grouped by the given columns"""
+    group = select_clause(group_by)
+    return {
+        '$select': f"{group},count(*) AS {count_as}",
+        '$group': group,
+        '$where': where,
+        '$limit': AGGREGATE_LIMIT,
+    }
@@ -0,0 +1,105 @@
+import numpy as np
+
+# Equirectangular approximation; accurate to well under 1% across a city
+METERS_PER_DEGREE_LAT = 110540.0
+METERS_PER_DEGREE_LON = 111320.0
+
+DEFAULT_CELL_METERS = 250
+
+class SpatialIndex:
+    """Uniform lat/lon grid with row positions bucketed per cell
+
+    Cells are keyed row-major (y * nx + x) and stored sorted, so every row of
+    cells a query box touches is one contiguous range found by binary search.
+    """
+
+    def __init__(self, latitude, longitude, cell_meters=DEFAULT_CELL_METERS):
+        self.lat = np.asarray(latitude, dtype=np.float64)
+        self.lon = np.asarray(longitude, dtype=np.float64)
+        self.size = len(self.lat)
+        self.cell_meters = cell_meters
+
+        valid = np.isfinite(self.lat) & np.isfinite(self.lon)
+        if not valid.any():
+            self.ref_lat, self.lat0, self.lon0, self.nx, self.ny = 0.0, 0.0, 0.0, 1, 1
+            self.lon_scale = METERS_PER_DEGREE_LON
+            self.cell_lat = self.cell_lon = 1.0
+            self.keys = np.empty(0, dtype=np.int64)
+            self.positions = np.empty(0, dtype=np.int64)
+            return
+
+        # Longitude degrees shrink with latitude; scale them at the data's center
+        self.ref_lat = float(np.median(self.lat[valid]))
+        self.lon_scale = METERS_PER_DEGREE_LON * np.cos(np.radians(self.ref_lat))
+        self.cell_lat = cell_meters / METERS_PER_DEGREE_LAT
+        self.cell_lon = cell_meters / self.lon_scale
+
+        self.lat0 = float(self.lat[valid].min())
+        self.lon0 = float(self.lon[valid].min())
+        iy = np.floor((self.lat[valid] - self.lat0) / self.cell_lat).astype(np.int64)
+        ix = np.floor((self.lon[valid] - self.lon0) / self.cell_lon).astype(np.int64)
+        self.ny, self.nx = int(iy.max()) + 1, int(ix.max()) + 1
+
+        keys = iy * self.nx + ix
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.positions = np.flatnonzero(valid)[order]
+
+    def _cell_range(self, low, high, origin, step, count):
+        first = int(np.clip(np.floor((low - origin) / step), 0, count - 1))
+        last = int(np.clip(np.floor((high - origin) / step), 0, count - 1))
+        return first, last
+
+    def _scan(self, min_lat, min_lon, max_lat, max_lon):
+        """Positions in every cell overlapping the box (a superset of the box)"""
+        if not len(self.keys):
+            return self.positions
+        y0, y1 = self._cell_range(min_lat, max_lat, self.lat0, self.cell_lat, self.ny)
+        x0, x1 = self._cell_range(min_lon, max_lon, self.lon0, self.cell_lon, self.nx)
+
+        rows = np.arange(y0, y1 + 1, dtype=np.int64) * self.nx
+        starts = np.searchsorted(self.keys, rows + x0, side='left')
+        ends = np.searchsorted(self.keys, rows + x1, side='right')
+        return np.concatenate([self.positions[start:end] for start, end in zip(starts, ends)])
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """Sorted row positions inside a latitude/longitude box"""
+        candidates = self._scan(min_lat, min_lon, max_lat, max_lon)
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(candidates[inside])
+
+    def distances(self, positions, lat, lon):
+        """Meters from (lat, lon) to each row position"""
+        dy = (self.lat[positions] - lat) * METERS_PER_DEGREE_LAT
+        dx = (self.lon[positions] - lon) * self.lon_scale
+        return np.hypot(dx, dy)
+
+    def radius(self, lat, lon, meters):
+        """Row positions within `meters` of (lat, lon), nearest first"""
+        dlat = meters / METERS_PER_DEGREE_LAT
+        dlon = meters / self.lon_scale
+        candidates = self._scan(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        distance = self.distances(candidates, lat, lon)
+        inside = distance <= meters
+        candidates, distance = candidates[inside], distance[inside]
+        return candidates[np.argsort(distance, kind='stable')]
+
+    def nearest(self, lat, lon, k=10):
+        """The k row positions closest to (lat, lon), nearest first"""
+        if not len(self.positions):
+            return self.positions
+
+        # Grow the search circle until it holds k points or covers the whole grid
+        corners_lat = np.array([self.lat0, self.lat0 + self.ny * self.cell_lat])
+        corners_lon = np.array([self.lon0, self.lon0 + self.nx * self.cell_lon])
+        farthest = np.hypot(
+            np.abs(corners_lat - lat).max() * METERS_PER_DEGREE_LAT,
+            np.abs(corners_lon - lon).max() * self.lon_scale,
+        )
+        meters = self.cell_meters
+        while True:
+            found = self.radius(lat, lon, meters)
+            if len(found) >= k or meters >= farthest:
+                return found[:k]
+            meters *= 2
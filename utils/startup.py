@@ -0,0 +1,38 @@
+import os
+import time
+
+# Cold-start figures for the app process: when it started and how long the
+# first script run took to finish. Only the standard library here, so main.py
+# can import it first and time the rest. benchmarks/startup.py profiles where
+# import time goes.
+
+IMPORTED_AT = time.time()
+
+_first_render = None
+
+def process_started():
+    """Wall-clock time this process started, or when this module was imported if that's unknown"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22, after the parenthesised command name: start time in clock ticks since boot
+            ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return IMPORTED_AT
+
+PROCESS_STARTED = process_started()
+
+def mark_first_render():
+    """Record the end of the process's first script run; later calls do nothing"""
+    global _first_render
+    if _first_render is None:
+        _first_render = time.time()
+
+def startup_stats():
+    """Seconds from process start to this module's import and to the end of the first render"""
+    return {
+        'to_import': IMPORTED_AT - PROCESS_STARTED,
+        'to_first_render': _first_render - PROCESS_STARTED if _first_render is not None else None,
+    }
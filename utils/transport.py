@@ -0,0 +1,86 @@
+import threading
+
+# One pooled HTTP session per process for every SODA request: connections are
+# reused across pages and workers, bodies travel gzipped, and transient
+# failures are retried with jittered exponential backoff. requests is imported
+# with the first session, so processes that never fetch don't pay for it.
+
+# Connections kept open per host; at least the fetch concurrency so no worker waits
+POOL_SIZE = 16
+# Attempts after the first for connection errors and retryable statuses
+RETRIES = 4
+# Sleep backoff * 2**(retry - 1) seconds plus up to BACKOFF_JITTER more, honouring Retry-After
+BACKOFF = 0.5
+BACKOFF_JITTER = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# (connect, read) seconds
+TIMEOUT = (10, 120)
+
+_session = None
+_session_lock = threading.Lock()
+
+def new_session(pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF, jitter=BACKOFF_JITTER):
+    """A requests session with a connection pool, gzip and retries"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        backoff_jitter=jitter,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=['GET'],
+        respect_retry_after_header=True,
+        # Hand back the last error response so raise_for_status reports its status
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+def get_session():
+    """The process-wide session, created on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = new_session()
+    return _session
+
+def get(url, params=None, validators=None, session=None, stream=False):
+    """GET through the pooled session, raising for error statuses
+
+    With validators from an earlier response the request is conditional, and
+    an unchanged resource comes back as a bodiless 304 response. With stream
+    the body is left unread; close the response (or use it in a with block)
+    to return its connection to the pool.
+    """
+    session = get_session() if session is None else session
+    response = session.get(
+        url, params=params, headers=conditional_headers(validators), timeout=TIMEOUT, stream=stream
+    )
+    if response.status_code != 304:
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+    return response
+
+def validators(response):
+    """ETag and Last-Modified of a response, to revalidate it later"""
+    found = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    return {name: value for name, value in found.items() if value}
+
+def conditional_headers(validators):
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+    return headers
@@ -0,0 +1,104 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# Category -> keywords matched (lowercase, as substrings) in violation_description.
+# Each category gets one bit of the violation_flags column, in this order.
+VIOLATION_CATEGORIES = {
+    'rats/mice': ['rat', 'mouse', 'mice', 'rodent'],
+    'cockroaches': ['roach', 'cockroach'],
+    'flies': ['flies', 'flying insects'],
+    'vermin': ['vermin', 'pest'],
+}
+
+def category_bits(categories=VIOLATION_CATEGORIES):
+    """Bit value for each category"""
+    return {category: 1 << position for position, category in enumerate(categories)}
+
+def flags_dtype(categories=VIOLATION_CATEGORIES):
+    """Smallest unsigned integer type with one bit per category"""
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if len(categories) <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError("At most 64 violation categories are supported")
+
+class KeywordMatcher:
+    """Aho-Corasick automaton mapping every keyword hit in one pass to category bits"""
+
+    def __init__(self, categories=VIOLATION_CATEGORIES):
+        bits = category_bits(categories)
+        self.goto = [{}]
+        self.output = [0]
+
+        # Trie of all keywords; a node's output is the bits of keywords ending there
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                node = 0
+                for char in keyword.lower():
+                    if char not in self.goto[node]:
+                        self.goto.append({})
+                        self.output.append(0)
+                        self.goto[node][char] = len(self.goto) - 1
+                    node = self.goto[node][char]
+                self.output[node] |= bits[category]
+
+        # Failure links, breadth first, folding in the outputs of suffix matches
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] |= self.output[self.fail[child]]
+
+    def match(self, text):
+        """OR of the bits of every category with a keyword in text"""
+        node, flags = 0, 0
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            flags |= self.output[node]
+        return flags
+
+def classify_violations(descriptions, categories=VIOLATION_CATEGORIES):
+    """Per-row category bitflags for a violation_description column"""
+    # Descriptions repeat a few hundred distinct texts, so match each one once
+    codes, uniques = pd.factorize(descriptions.astype(object).str.lower())
+    matcher = KeywordMatcher(categories)
+    dtype = flags_dtype(categories)
+
+    unique_flags = np.array([matcher.match(text) for text in uniques], dtype=dtype)
+    # NaN descriptions factorize to -1 and carry no flags
+    flags = np.zeros(len(codes), dtype=dtype)
+    present = codes >= 0
+    flags[present] = unique_flags[codes[present]]
+    return pd.Series(flags, index=descriptions.index, name='violation_flags')
+
+def reclassify_stale(df, known, categories=VIOLATION_CATEGORIES):
+    """Recompute df's violation_flags in place unless known (stored category_bits) matches categories
+
+    Bits follow the order of the categories, so flags made before a category
+    was added, removed or moved would decode to the wrong ones. Without the
+    descriptions to classify, the stale column is dropped instead.
+    """
+    if 'violation_flags' in df.columns and known != category_bits(categories):
+        if 'violation_description' in df.columns:
+            df['violation_flags'] = classify_violations(df['violation_description'], categories)
+        else:
+            del df['violation_flags']
+    return df
+
+def violation_flags(df, categories=VIOLATION_CATEGORIES):
+    """The violation_flags column, computed if the frame predates it
+
+    A present column is trusted: snapshots store the category_bits their
+    flags were made with and are reclassified on load when those differ.
+    """
+    if 'violation_flags' in df.columns:
+        return df['violation_flags'].fillna(0).astype(flags_dtype(categories))
+    return classify_violations(df['violation_description'], categories)